@@ -1,8 +1,9 @@
 """Main module for the package.
 
-This module is responsible for running the server script in the appropriate
-platform. It provides a bridge between the package and the user, allowing the
-user to run the server script from the command line.
+This module is responsible for running a whole simulation from the command
+line (see the `launcher` module for the available options):
+
+    python -m skymeshsim --drones 10 --control
 
 This module is not intended to be imported by other modules in the package.
 
@@ -11,20 +12,9 @@ Author:
 """
 
 
-import os
-import subprocess
 import sys
 
+from .launcher import main
+
 if __name__ == "__main__":
-    if sys.platform == "win32":
-        SCRIPT_PATH = os.path.join(os.path.dirname(
-            __file__), "scripts", "run_windows_server.ps1")
-        args = sys.argv[1:]
-        subprocess.run(
-            ["powershell", "-File", SCRIPT_PATH] + args,
-            shell=True,
-            check=True
-        )
-
-    else:
-        print(f"This module cannot be run in your platform ({sys.platform}).")
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""Import time profiling module.
+
+This module measures the cold import cost of the component entry points in
+fresh interpreters using `python -X importtime`, and reports the modules that
+contribute the most to it. With `--budget`, it exits with a non-zero status
+if any entry point exceeds the budget, so it can guard startup time in CI:
+
+    python -m skymeshsim.importtime --budget 250 server drone control_system
+
+Author:
+    Paulo Sanchez (@erlete)
+"""
+
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import NamedTuple, Optional, Sequence
+
+ENTRY_POINTS = {
+    "server": "skymeshsim.network.server",
+    "drone": "skymeshsim.network.drone",
+    "control_system": "skymeshsim.network.control_system",
+    "data_system": "skymeshsim.network.data_system",
+    "weather": "skymeshsim.services.weather"
+}
+
+
+class ImportEntry(NamedTuple):
+    """Import time of a module.
+
+    Attributes:
+        module (str): Module name.
+        self_time (float): Time spent in the module itself in milliseconds.
+        cumulative (float): Time including nested imports in milliseconds.
+    """
+
+    module: str
+    self_time: float
+    cumulative: float
+
+
+class ImportProfile(NamedTuple):
+    """Cold import profile of an entry point.
+
+    Attributes:
+        module (str): Entry point module name.
+        total (float): Cumulative import time of the entry point in
+            milliseconds.
+        entries (list[ImportEntry]): Import time of every imported module.
+    """
+
+    module: str
+    total: float
+    entries: list[ImportEntry]
+
+    def top(self, count: int) -> list[ImportEntry]:
+        """Get the modules with the largest self time.
+
+        Args:
+            count (int): Number of modules.
+
+        Returns:
+            list[ImportEntry]: Most expensive modules.
+        """
+        return sorted(
+            self.entries, key=lambda entry: entry.self_time, reverse=True
+        )[:count]
+
+
+def profile_import(module: str, repeats: int = 3) -> ImportProfile:
+    """Measure the cold import time of a module.
+
+    Args:
+        module (str): Module name.
+        repeats (int): Number of fresh interpreters. The fastest run is kept
+            to reduce noise.
+
+    Returns:
+        ImportProfile: Import profile of the fastest run.
+
+    Raises:
+        RuntimeError: If the module cannot be imported.
+    """
+    source_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, (source_dir, env.get("PYTHONPATH")))
+    )
+
+    best: Optional[ImportProfile] = None
+    for _ in range(max(repeats, 1)):
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True,
+            text=True,
+            env=env,
+            check=False
+        )
+        if process.returncode:
+            raise RuntimeError(
+                f"cannot import {module}:\n{process.stderr.strip()}"
+            )
+
+        entries = []
+        for line in process.stderr.splitlines():
+            if not line.startswith("import time:"):
+                continue
+
+            fields = line[len("import time:"):].split("|")
+            try:
+                self_time, cumulative = int(fields[0]), int(fields[1])
+            except ValueError:
+                continue  # Header line
+
+            entries.append(ImportEntry(
+                fields[2].strip(), self_time / 1000, cumulative / 1000
+            ))
+
+        total = max(
+            (entry.cumulative for entry in entries if entry.module == module),
+            default=0.0
+        )
+        if best is None or total < best.total:
+            best = ImportProfile(module, total, entries)
+
+    assert best is not None
+    return best
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run the import time profiler.
+
+    Args:
+        argv (Sequence[str] | None): Command line arguments.
+
+    Returns:
+        int: Exit status (1 if a budget was exceeded).
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m skymeshsim.importtime",
+        description="Measure the cold import time of component entry points."
+    )
+    parser.add_argument(
+        "modules",
+        nargs="*",
+        help="entry point names (" + ", ".join(ENTRY_POINTS)
+        + ") or module names; defaults to every entry point"
+    )
+    parser.add_argument(
+        "--budget",
+        type=float,
+        help="maximum cumulative import time per module in milliseconds"
+    )
+    parser.add_argument(
+        "--repeats",
+        type=int,
+        default=3,
+        help="fresh interpreters per module; the fastest is kept"
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=8,
+        help="number of most expensive imports to list per module"
+    )
+    args = parser.parse_args(argv)
+
+    exceeded = []
+    for name in args.modules or list(ENTRY_POINTS):
+        module = ENTRY_POINTS.get(name, name)
+        profile = profile_import(module, args.repeats)
+
+        over = args.budget is not None and profile.total > args.budget
+        if over:
+            exceeded.append(module)
+
+        status = " (over budget)" if over else ""
+        print(f"{module}: {profile.total:.1f} ms{status}")
+        for entry in profile.top(args.top):
+            print(f"    {entry.self_time:8.1f} ms self "
+                  + f"{entry.cumulative:8.1f} ms total  {entry.module}")
+
+    if exceeded:
+        print(f"Import budget of {args.budget:.0f} ms exceeded by: "
+              + ", ".join(exceeded))
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,720 @@
+"""Simulation launcher module.
+
+This module starts a whole simulation from a single command on any platform:
+one or more server shards, a number of drone host processes, optional
+DataSystem viewers and, optionally, the interactive ControlSystem.
+
+Drones are distributed across drone host processes, each of which runs its
+drones on a single shared event scheduler, so that a handful of processes
+(typically one per CPU core) can simulate many drones. Server shards are
+independent brokers listening on consecutive ports; drone hosts are
+assigned to them round-robin, while viewers and the ControlSystem connect to
+every shard to reach the whole fleet.
+
+The launcher supervises every process: crashed processes are restarted with
+an exponential backoff, and SIGINT or SIGTERM stop them all gracefully. On
+Linux, processes can be restricted to a set of CPUs or pinned to one CPU
+each.
+
+    python -m skymeshsim --drones 200 --workers 6 --pin
+
+Author:
+    Paulo Sanchez (@erlete)
+"""
+
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Callable, Coroutine, NamedTuple, Optional, Sequence
+
+from .network.logger import Logger
+
+
+class ProcessSpec(NamedTuple):
+    """Description of a supervised process.
+
+    Attributes:
+        name (str): Process name.
+        target (Callable[..., None]): Module-level entry point of the process.
+        args (tuple): Arguments of the entry point.
+        cpus (tuple[int, ...] | None): CPUs the process may run on. Any CPU
+            if None.
+    """
+
+    name: str
+    target: Callable[..., None]
+    args: tuple
+    cpus: Optional[tuple[int, ...]] = None
+
+
+class SupervisedProcess:
+    """Process restarted with an exponential backoff when it exits.
+
+    Attributes:
+        spec (ProcessSpec): Process description.
+        process (multiprocessing.Process | None): Current process.
+        restarts (int): Number of restarts since the process was last stable.
+        total_restarts (int): Total number of restarts.
+        failed (bool): Whether the process exceeded its restart limit.
+    """
+
+    STABLE_TIME = 60.0  # [s]
+    MAX_BACKOFF = 30.0  # [s]
+
+    def __init__(self, spec: ProcessSpec) -> None:
+        """Initialize a SupervisedProcess instance.
+
+        Args:
+            spec (ProcessSpec): Process description.
+        """
+        self.spec = spec
+        self.process: Optional[multiprocessing.process.BaseProcess] = None
+        self.restarts = 0
+        self.total_restarts = 0
+        self.failed = False
+
+        self._started = 0.0
+        self._restart_at: Optional[float] = None
+
+    @property
+    def alive(self) -> bool:
+        """Check whether the process is running.
+
+        Returns:
+            bool: True if the process is running, False otherwise.
+        """
+        return self.process is not None and self.process.is_alive()
+
+    def start(self) -> None:
+        """Start the process and apply its CPU affinity."""
+        # Spawned processes do not inherit the log thread or any other state
+        # of the launcher:
+        context = multiprocessing.get_context("spawn")
+        process = context.Process(
+            target=self.spec.target,
+            args=self.spec.args,
+            name=self.spec.name,
+            daemon=False
+        )
+        process.start()
+        self.process = process
+        self._started = time.monotonic()
+        self._restart_at = None
+
+        if (
+            self.spec.cpus is not None
+            and process.pid is not None
+            and hasattr(os, "sched_setaffinity")
+        ):
+            try:
+                os.sched_setaffinity(process.pid, self.spec.cpus)
+            except OSError:
+                pass  # The process already exited
+
+    def check(self, max_restarts: int) -> Optional[str]:
+        """Restart the process if needed.
+
+        Args:
+            max_restarts (int): Maximum number of consecutive restarts.
+
+        Returns:
+            str | None: Description of what happened, if anything.
+        """
+        if self.failed or self.process is None:
+            return None
+
+        now = time.monotonic()
+        if self.process.is_alive():
+            if now - self._started > self.STABLE_TIME:
+                self.restarts = 0
+            return None
+
+        if self._restart_at is None:
+            exitcode = self.process.exitcode
+            if self.restarts >= max_restarts:
+                self.failed = True
+                return (f"{self.spec.name} exited with code {exitcode}"
+                        + f" after {self.restarts} restarts; giving up")
+
+            delay = min(2.0 ** self.restarts, self.MAX_BACKOFF)
+            self._restart_at = now + delay
+            return (f"{self.spec.name} exited with code {exitcode};"
+                    + f" restarting in {delay:.0f} s")
+
+        if now >= self._restart_at:
+            self.restarts += 1
+            self.total_restarts += 1
+            self.start()
+            return f"{self.spec.name} restarted (pid {self.process.pid})"
+
+        return None
+
+    def terminate(self) -> None:
+        """Ask the process to stop."""
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+
+    def join(self, timeout: float) -> None:
+        """Wait for the process and kill it if it does not stop in time.
+
+        Args:
+            timeout (float): Maximum time to wait in seconds.
+        """
+        if self.process is None:
+            return
+
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+
+
+class Launcher:
+    """Simulation launcher and process supervisor.
+
+    Attributes:
+        host (str): Server host address.
+        port (int): Port of the first server shard. Shard `i` listens on
+            `port + i`.
+        drones (int): Number of drones.
+        workers (int): Number of drone host processes.
+        shards (int): Number of server shards.
+        viewers (int): Number of DataSystem viewers.
+        control (bool): Whether to run the ControlSystem in the foreground.
+        color_by (str | None): Drone attribute that viewers map to colors.
+        radio_range (float | None): Range in meters of the drone mesh links
+            drawn by viewers. No links are drawn if None.
+        mesh_delivery (bool): Whether the servers deliver messages between
+            drones and ground systems over the simulated mesh, with radio
+            range `radio_range`.
+        geofence (bool): Whether viewers check the drones against the
+            boundary of the country and the no-fly zones.
+        no_fly_zones (str | None): Vector file (GeoJSON, shapefile...) with
+            the no-fly zones of the geofence.
+        time_tick (float): Drone movement tick in seconds.
+        telemetry (bool): Whether drones send status messages over the UDP
+            telemetry channel of their server shard.
+        plan_routes (bool): Whether drones plan `moveto` routes around
+            populated areas.
+        cpus (tuple[int, ...]): CPUs available to the simulation.
+        pin (bool): Whether to pin every process to a single CPU.
+        max_restarts (int): Maximum number of consecutive restarts of a
+            process.
+        health_interval (float): Time between health checks in seconds.
+        startup_delay (float): Time given to the servers to start listening
+            before the clients are started, in seconds.
+    """
+
+    STATUS_INTERVAL = 30.0  # [s]
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8888,
+        drones: int = 1,
+        workers: Optional[int] = None,
+        shards: int = 1,
+        viewers: int = 1,
+        control: bool = False,
+        color_by: Optional[str] = None,
+        radio_range: Optional[float] = None,
+        mesh_delivery: bool = False,
+        geofence: bool = False,
+        no_fly_zones: Optional[str] = None,
+        time_tick: float = 0.1,
+        telemetry: bool = False,
+        plan_routes: bool = False,
+        cpus: Optional[Sequence[int]] = None,
+        pin: bool = False,
+        max_restarts: int = 5,
+        health_interval: float = 1.0,
+        startup_delay: float = 1.0
+    ) -> None:
+        """Initialize a Launcher instance.
+
+        Args:
+            host (str): Server host address.
+            port (int): Port of the first server shard.
+            drones (int): Number of drones.
+            workers (int | None): Number of drone host processes. Defaults to
+                the CPUs left by the servers and viewers.
+            shards (int): Number of server shards.
+            viewers (int): Number of DataSystem viewers.
+            control (bool): Whether to run the ControlSystem in the
+                foreground.
+            color_by (str | None): Drone attribute that viewers map to
+                colors (`speed`, `autonomy` or `altitude`).
+            radio_range (float | None): Range in meters of the mesh links
+                drawn by viewers.
+            mesh_delivery (bool): Whether servers deliver messages over the
+                simulated mesh. Requires a radio range.
+            geofence (bool): Whether viewers check the geofence.
+            no_fly_zones (str | None): Vector file with the no-fly zones.
+                Enables the geofence.
+            time_tick (float): Drone movement tick in seconds.
+            telemetry (bool): Whether drones send status messages over UDP.
+            plan_routes (bool): Whether drones plan `moveto` routes.
+            cpus (Sequence[int] | None): CPUs available to the simulation.
+                Defaults to the CPUs available to the launcher.
+            pin (bool): Whether to pin every process to a single CPU.
+            max_restarts (int): Maximum number of consecutive restarts.
+            health_interval (float): Time between health checks in seconds.
+            startup_delay (float): Server startup time in seconds.
+        """
+        if drones < 0 or shards < 1 or viewers < 0:
+            raise ValueError(
+                "expected non-negative drones and viewers and at least one"
+                + f" shard but got {drones}, {viewers} and {shards} instead"
+            )
+
+        if mesh_delivery and radio_range is None:
+            raise ValueError(
+                "expected a radio range for mesh delivery but got None"
+                + " instead"
+            )
+
+        self.host = host
+        self.port = port
+        self.drones = drones
+        self.shards = shards
+        self.viewers = viewers
+        self.control = control
+        self.color_by = color_by
+        self.radio_range = radio_range
+        self.mesh_delivery = mesh_delivery
+        self.geofence = geofence or no_fly_zones is not None
+        self.no_fly_zones = no_fly_zones
+        self.time_tick = time_tick
+        self.telemetry = telemetry
+        self.plan_routes = plan_routes
+        self.cpus = tuple(cpus) if cpus else available_cpus()
+        self.pin = pin
+        self.max_restarts = max_restarts
+        self.health_interval = health_interval
+        self.startup_delay = startup_delay
+
+        if workers is None:
+            workers = len(self.cpus) - shards - viewers
+        self.workers = max(min(workers, drones), 1 if drones else 0)
+
+        self.processes: list[SupervisedProcess] = []
+        self._control: Optional[subprocess.Popen] = None
+        self._stopping = threading.Event()
+        self._logger = Logger(1, "[Launcher]")
+
+    def plan(self) -> list[ProcessSpec]:
+        """Describe the processes of the simulation.
+
+        Returns:
+            list[ProcessSpec]: Servers, then drone hosts, then viewers.
+        """
+        specs = []
+        for shard in range(self.shards):
+            specs.append(ProcessSpec(
+                f"Server-{shard}",
+                _run_server,
+                (self.host, self.port + shard, self._telemetry(shard),
+                 self.radio_range if self.mesh_delivery else None)
+            ))
+
+        drone_ids = [str(index) for index in range(1, self.drones + 1)]
+        for worker, ids in enumerate(distribute(drone_ids, self.workers)):
+            shard = worker % self.shards
+            specs.append(ProcessSpec(
+                f"DroneHost-{worker}",
+                _run_drone_host,
+                (self.host, self.port + shard, ids, self.time_tick,
+                 self._telemetry(shard), self.plan_routes)
+            ))
+
+        for viewer in range(self.viewers):
+            specs.append(ProcessSpec(
+                f"DataSystem-{viewer}",
+                _run_viewer,
+                (self.host, self.port, self.shards, self.color_by,
+                 self.radio_range, self.geofence, self.no_fly_zones)
+            ))
+
+        if self.pin:
+            return [
+                spec._replace(cpus=(self.cpus[index % len(self.cpus)],))
+                for index, spec in enumerate(specs)
+            ]
+
+        if set(self.cpus) != set(available_cpus()):
+            return [spec._replace(cpus=self.cpus) for spec in specs]
+
+        return specs
+
+    def run(self) -> None:
+        """Start the simulation and supervise it until it is stopped."""
+        if (self.pin or set(self.cpus) != set(available_cpus())) and (
+            not hasattr(os, "sched_setaffinity")
+        ):
+            self._logger.log(
+                f"CPU affinity is not supported on {sys.platform}; ignoring"
+                + " CPU options.",
+                2
+            )
+
+        previous_handlers = {
+            signum: signal.signal(signum, self._handle_signal)
+            for signum in (signal.SIGINT, signal.SIGTERM)
+        }
+
+        try:
+            self._start()
+            self._supervise()
+
+        finally:
+            self._shutdown()
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+
+    def stop(self) -> None:
+        """Request the simulation to stop."""
+        self._stopping.set()
+
+    def _start(self) -> None:
+        specs = self.plan()
+        self._logger.log(
+            "Starting %d server shard(s), %d drone(s) on %d host(s) and %d"
+            + " viewer(s) on %d CPU(s).",
+            1, self.shards, self.drones, self.workers, self.viewers,
+            len(self.cpus)
+        )
+
+        self.processes = [SupervisedProcess(spec) for spec in specs]
+        for process in self.processes[:self.shards]:
+            process.start()
+
+        # Clients are started once the servers are listening:
+        if self._stopping.wait(self.startup_delay):
+            return
+
+        for process in self.processes[self.shards:]:
+            process.start()
+
+        if self.control:
+            self._control = subprocess.Popen([
+                sys.executable, "-m", "skymeshsim.network.control_system",
+                f"tcp://{self.host}:{self.port}", str(self.shards)
+            ])
+
+    def _supervise(self) -> None:
+        last_status = time.monotonic()
+
+        while not self._stopping.wait(self.health_interval):
+            for process in self.processes:
+                event = process.check(self.max_restarts)
+                if event is not None:
+                    self._logger.log(event, 3 if process.failed else 2)
+
+            if self._control is not None and self._control.poll() is not None:
+                self._logger.log("ControlSystem exited.", 1)
+                break
+
+            if time.monotonic() - last_status > self.STATUS_INTERVAL:
+                last_status = time.monotonic()
+                self._logger.log(
+                    "%d/%d processes alive, %d restart(s).",
+                    1,
+                    sum(process.alive for process in self.processes),
+                    len(self.processes),
+                    sum(process.total_restarts for process in self.processes)
+                )
+
+    def _shutdown(self, timeout: float = 5.0) -> None:
+        self._logger.log("Stopping simulation.", 1)
+
+        if self._control is not None and self._control.poll() is None:
+            self._control.terminate()
+
+        # Clients are stopped before the servers they are connected to:
+        for process in reversed(self.processes):
+            process.terminate()
+        for process in reversed(self.processes):
+            process.join(timeout)
+
+        if self._control is not None:
+            try:
+                self._control.wait(timeout)
+            except subprocess.TimeoutExpired:
+                self._control.kill()
+
+        Logger.flush()
+
+    def _handle_signal(self, *_: Any) -> None:
+        self.stop()
+
+    def _telemetry(self, shard: int) -> Optional[str]:
+        if not self.telemetry:
+            return None
+
+        return f"udp://{self.host}:{self.port + shard}"
+
+
+def available_cpus() -> tuple[int, ...]:
+    """Get the CPUs available to the current process.
+
+    Returns:
+        tuple[int, ...]: Sorted CPU indices.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return tuple(sorted(os.sched_getaffinity(0)))
+
+    return tuple(range(os.cpu_count() or 1))
+
+
+def parse_cpus(value: str) -> tuple[int, ...]:
+    """Parse a CPU list such as `0-3,6`.
+
+    Args:
+        value (str): Comma-separated CPU indices and inclusive ranges.
+
+    Returns:
+        tuple[int, ...]: Sorted CPU indices.
+    """
+    cpus: set[int] = set()
+    for part in filter(None, value.replace(" ", "").split(",")):
+        first, _, last = part.partition("-")
+        cpus.update(range(int(first), int(last or first) + 1))
+
+    if not cpus:
+        raise ValueError(f"expected a CPU list but got {value!r} instead")
+
+    return tuple(sorted(cpus))
+
+
+def distribute(items: Sequence[Any], groups: int) -> list[list[Any]]:
+    """Distribute items round-robin into groups of balanced size.
+
+    Args:
+        items (Sequence[Any]): Items to distribute.
+        groups (int): Number of groups.
+
+    Returns:
+        list[list[Any]]: Non-empty groups.
+    """
+    return [
+        list(items[group::groups])
+        for group in range(min(groups, len(items)))
+    ]
+
+
+def _run_until_terminated(main: Coroutine[Any, Any, None]) -> None:
+    # Ctrl+C reaches every process attached to the terminal, but only the
+    # launcher handles it, stopping its children in order:
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    async def runner() -> None:
+        task = asyncio.ensure_future(main)
+        if sys.platform != "win32":
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGTERM, task.cancel
+            )
+
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(runner())
+    Logger.flush()
+
+
+def _run_server(
+    host: str,
+    port: int,
+    telemetry: Optional[str],
+    radio_range: Optional[float]
+) -> None:
+    # pylint: disable=import-outside-toplevel
+    from .network.server import SocketServer
+
+    mesh_relay = None
+    if radio_range is not None:
+        from .modules.mesh.delivery import MeshRelay
+        mesh_relay = MeshRelay(radio_range)
+
+    _run_until_terminated(SocketServer(
+        host=host,
+        port=port,
+        telemetry=telemetry,
+        mesh_relay=mesh_relay
+    ).run())
+
+
+def _run_drone_host(
+    host: str,
+    port: int,
+    drone_ids: list[str],
+    time_tick: float,
+    telemetry: Optional[str],
+    plan_routes: bool
+) -> None:
+    # pylint: disable=import-outside-toplevel
+    from .modules.core.scheduler import EventScheduler
+    from .network.drone import IndependentComponent
+    from .services.routing import get_default_planner
+
+    async def main() -> None:
+        scheduler = EventScheduler()
+        planner = get_default_planner() if plan_routes else None
+        if planner is not None:
+            # Keep the first route from paying for the SciPy import:
+            planner.warm_up()
+        drones = [
+            IndependentComponent(
+                id_=drone_id,
+                host=host,
+                port=port,
+                time_tick=time_tick,
+                start_position=(
+                    -0.4 - 0.005 * int(drone_id),
+                    39.4628 + 0.001 * int(drone_id)
+                ),
+                telemetry=telemetry,
+                scheduler=scheduler,
+                planner=planner
+            )
+            for drone_id in drone_ids
+        ]
+
+        scheduler_task = asyncio.create_task(scheduler.run())
+        drones_task = asyncio.gather(*(drone.run() for drone in drones))
+        try:
+            done, _ = await asyncio.wait(
+                (scheduler_task, drones_task),
+                return_when=asyncio.FIRST_COMPLETED
+            )
+
+            # Drones do not move without their scheduler: exit the host so
+            # that the launcher restarts it.
+            for task in done:
+                task.result()
+            if scheduler_task in done:
+                raise RuntimeError("drone scheduler stopped unexpectedly")
+        finally:
+            scheduler_task.cancel()
+            drones_task.cancel()
+
+    _run_until_terminated(main())
+
+
+def _run_viewer(
+    host: str,
+    port: int,
+    shards: int,
+    color_by: Optional[str],
+    radio_range: Optional[float],
+    geofence: bool,
+    no_fly_zones: Optional[str]
+) -> None:
+    # pylint: disable=import-outside-toplevel
+    from .modules.mesh.connectivity import MeshGraph
+    from .network.data_system import DataSystem
+    from .services.geofence import Geofence
+
+    _run_until_terminated(DataSystem(
+        host=host,
+        port=port,
+        shards=shards,
+        color_by=color_by,
+        mesh=MeshGraph(radio_range) if radio_range is not None else None,
+        geofence=Geofence.from_country(zones=(
+            Geofence.read_zones(no_fly_zones) if no_fly_zones else ()
+        )) if geofence else None
+    ).run())
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run the launcher from the command line.
+
+    Args:
+        argv (Sequence[str] | None): Command line arguments.
+
+    Returns:
+        int: Exit status.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m skymeshsim",
+        description="Start and supervise a SkyMesh simulation."
+    )
+    parser.add_argument("--drones", type=int, default=1,
+                        help="number of drones")
+    parser.add_argument("--workers", type=int,
+                        help="number of drone host processes (defaults to"
+                        + " the CPUs left by the servers and viewers)")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="number of server shards on consecutive ports")
+    parser.add_argument("--viewers", type=int, default=1,
+                        help="number of DataSystem viewers")
+    parser.add_argument("--control", action="store_true",
+                        help="run the ControlSystem in the foreground")
+    parser.add_argument("--color-by",
+                        choices=("speed", "autonomy", "altitude"),
+                        help="drone attribute that viewers map to colors")
+    parser.add_argument("--radio-range", type=float,
+                        help="range in meters of the mesh links drawn by"
+                        + " viewers")
+    parser.add_argument("--mesh-delivery", action="store_true",
+                        help="deliver drone messages over the simulated"
+                        + " mesh (requires --radio-range)")
+    parser.add_argument("--geofence", action="store_true",
+                        help="check that drones stay within the country")
+    parser.add_argument("--no-fly-zones", metavar="PATH",
+                        help="vector file with no-fly zones to check (enables"
+                        + " --geofence)")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="server host address")
+    parser.add_argument("--port", type=int, default=8888,
+                        help="port of the first server shard")
+    parser.add_argument("--time-tick", type=float, default=0.1,
+                        help="drone movement tick in seconds")
+    parser.add_argument("--telemetry", action="store_true",
+                        help="send drone status over UDP datagrams")
+    parser.add_argument("--plan-routes", action="store_true",
+                        help="plan moveto routes around populated areas")
+    parser.add_argument("--cpus", type=parse_cpus,
+                        help="CPUs to run on, such as 0-3,6 (Linux only)")
+    parser.add_argument("--pin", action="store_true",
+                        help="pin every process to one CPU (Linux only)")
+    parser.add_argument("--max-restarts", type=int, default=5,
+                        help="consecutive restarts before giving up on a"
+                        + " process")
+    args = parser.parse_args(argv)
+    if args.mesh_delivery and args.radio_range is None:
+        parser.error("--mesh-delivery requires --radio-range")
+
+    Launcher(
+        host=args.host,
+        port=args.port,
+        drones=args.drones,
+        workers=args.workers,
+        shards=args.shards,
+        viewers=args.viewers,
+        control=args.control,
+        color_by=args.color_by,
+        radio_range=args.radio_range,
+        mesh_delivery=args.mesh_delivery,
+        geofence=args.geofence,
+        no_fly_zones=args.no_fly_zones,
+        time_tick=args.time_tick,
+        telemetry=args.telemetry,
+        plan_routes=args.plan_routes,
+        cpus=args.cpus,
+        pin=args.pin,
+        max_restarts=args.max_restarts
+    ).run()
+
+    return 0
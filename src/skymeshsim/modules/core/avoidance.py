@@ -0,0 +1,663 @@
+"""Collision avoidance module.
+
+This module keeps the drones of a fleet apart with reciprocal velocity
+obstacles (ORCA). Every drone takes half of the responsibility of avoiding
+each of its neighbors: the velocities that would bring two drones closer than
+the safety distance within the time horizon are cut off by a half-plane, and
+the new velocity of the drone is the one closest to its preferred velocity
+within the intersection of its half-planes and its maximum speed.
+
+Neighbor lists come from a k-d tree built once per tick, so the constraints
+of the whole fleet are computed with fixed-shape (neighbors, drones) arrays.
+The velocities are then found with the incremental linear programs of ORCA
+(as in RVO2), vectorized across drones: the 2-D program adds one neighbor
+constraint at a time and, when a constraint cannot be met, only the drones
+concerned fall back to the 3-D program, which finds the velocity that
+violates their constraints the least (dense crowds).
+
+Avoidance acts on the horizontal plane: neighbors are the closest drones in
+the horizontal plane, and drones further apart in altitude than the safety
+distance do not constrain each other.
+
+Author:
+    Paulo Sanchez (@erlete)
+"""
+
+
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Optional, Sequence
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from .scheduler import EventScheduler, ScheduledEvent
+
+if TYPE_CHECKING:
+    from .simulation import SimulationAPI
+
+# Lines are (point x, point y, direction x, direction y) arrays with shape
+# (lines, drones). The allowed side of a line is left of its direction.
+Lines = tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+EPSILON = 1e-5
+
+
+class CollisionAvoidance:
+    """Vectorized reciprocal collision avoidance of a fleet.
+
+    Drones are identified by their index in the arrays given to `adjust`.
+    Positions and velocities are in meters and m/s on a local plane (east,
+    north and, optionally, up).
+
+    Attributes:
+        safety_radius (float): Protected radius around every drone in
+            meters. Drones keep at least twice this distance between them.
+        time_horizon (float): Time in seconds over which velocities are
+            guaranteed to be collision-free.
+        max_speed (float): Highest speed of any drone in m/s.
+        max_neighbors (int): Number of closest neighbors of every drone
+            taken into account.
+        neighbor_radius (float): Distance in meters within which drones are
+            considered neighbors.
+        time_step (float): Simulation time step in seconds, used to resolve
+            drones that are already too close.
+    """
+
+    def __init__(
+        self,
+        safety_radius: float = 10.0,
+        time_horizon: float = 5.0,
+        max_speed: float = 50.0,
+        max_neighbors: int = 10,
+        neighbor_radius: Optional[float] = None,
+        time_step: float = 0.1
+    ) -> None:
+        """Initialize a CollisionAvoidance instance.
+
+        Args:
+            safety_radius (float): Protected radius around every drone in
+                meters.
+            time_horizon (float): Collision-free time horizon in seconds.
+            max_speed (float): Highest speed of any drone in m/s.
+            max_neighbors (int): Number of closest neighbors of every drone
+                taken into account.
+            neighbor_radius (float | None): Neighbor distance in meters.
+                Defaults to the distance two drones at full speed can close
+                within the time horizon.
+            time_step (float): Simulation time step in seconds.
+        """
+        if safety_radius <= 0:
+            raise ValueError(
+                "expected a positive safety radius but got"
+                + f" {safety_radius} instead"
+            )
+
+        if time_horizon <= 0:
+            raise ValueError(
+                "expected a positive time horizon but got"
+                + f" {time_horizon} instead"
+            )
+
+        self.safety_radius = safety_radius
+        self.time_horizon = time_horizon
+        self.max_speed = max_speed
+        self.max_neighbors = max_neighbors
+        self.neighbor_radius = (
+            2 * (safety_radius + max_speed * time_horizon)
+            if neighbor_radius is None else neighbor_radius
+        )
+        self.time_step = time_step
+
+    def neighbors(self, positions: np.ndarray) -> np.ndarray:
+        """Find the closest neighbors of every drone.
+
+        Neighbors are searched in the horizontal plane. With altitudes,
+        twice as many candidates are searched, and those further apart in
+        altitude than the safety distance are left out.
+
+        Args:
+            positions (np.ndarray): Drone positions with shape (N, 2) or
+                (N, 3).
+
+        Returns:
+            np.ndarray: Neighbor indices with shape (N, max_neighbors) at
+                most, closest first. Missing neighbors are set to N.
+        """
+        positions = np.asarray(positions, dtype=float)
+        count = len(positions)
+        stacked = positions.shape[1] > 2
+        k = min(self.max_neighbors * (2 if stacked else 1), count - 1)
+        if k < 1:
+            return np.full((count, 0), count, dtype=np.intp)
+
+        # The drone itself is among the closest k + 1 drones, although not
+        # necessarily first when others share its horizontal position:
+        horizontal = positions[:, :2]
+        _, indices = cKDTree(horizontal).query(
+            horizontal, k + 1, distance_upper_bound=self.neighbor_radius
+        )
+        valid = (indices < count) & (indices != np.arange(count)[:, None])
+        if stacked:
+            up = positions[:, 2]
+            valid &= np.abs(
+                up[np.where(valid, indices, 0)] - up[:, None]
+            ) < 2 * self.safety_radius
+
+        # Closest valid neighbors first:
+        order = np.argsort(~valid, axis=1, kind="stable")
+        order = order[:, :self.max_neighbors]
+
+        return np.where(
+            np.take_along_axis(valid, order, axis=1),
+            np.take_along_axis(indices, order, axis=1),
+            count
+        )
+
+    def half_planes(
+        self,
+        positions: np.ndarray,
+        velocities: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Compute the ORCA half-plane of every drone and neighbor.
+
+        The horizontal velocity `(vx, vy)` of drone `i` is allowed by its
+        constraint with neighbor `k` if
+        `(vx - x[k, i]) * nx[k, i] + (vy - y[k, i]) * ny[k, i] >= 0`.
+
+        Args:
+            positions (np.ndarray): Drone positions with shape (N, 2) or
+                (N, 3).
+            velocities (np.ndarray): Current drone velocities with shape
+                (N, 2) or (N, 3).
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: Point
+                coordinates `x`, `y` and unit normal coordinates `nx`, `ny`
+                of the half-planes, with shape (max_neighbors, N). Missing
+                neighbors have null normals.
+        """
+        positions = np.asarray(positions, dtype=float)
+        velocities = np.asarray(velocities, dtype=float)
+        count = len(positions)
+
+        # Neighbor-major layout, so that every neighbor column is
+        # contiguous:
+        indices = self.neighbors(positions).T
+        valid = indices < count
+        others = np.where(valid, indices, np.arange(count))
+
+        # Relative position and velocity of every neighbor, gathered from
+        # contiguous coordinates:
+        east, north = positions[:, 0].copy(), positions[:, 1].copy()
+        velocity_x = velocities[:, 0].copy()
+        velocity_y = velocities[:, 1].copy()
+        ux, uy, nx, ny = self._smallest_changes(
+            east[others] - east,
+            north[others] - north,
+            velocity_x - velocity_x[others],
+            velocity_y - velocity_y[others]
+        )
+        nx[~valid] = 0
+        ny[~valid] = 0
+
+        # Every drone takes half of the correction:
+        return velocity_x + 0.5 * ux, velocity_y + 0.5 * uy, nx, ny
+
+    def adjust(
+        self,
+        positions: np.ndarray,
+        velocities: np.ndarray,
+        preferred: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Adjust the velocities of the whole fleet to avoid collisions.
+
+        Args:
+            positions (np.ndarray): Drone positions with shape (N, 2) or
+                (N, 3).
+            velocities (np.ndarray): Current drone velocities with shape
+                (N, 2) or (N, 3).
+            preferred (np.ndarray | None): Preferred drone velocities (e.g.
+                toward their targets) with shape (N, 2) or (N, 3). Defaults
+                to the current velocities.
+
+        Returns:
+            np.ndarray: Collision-free velocities, with the vertical
+                component of the preferred velocities.
+        """
+        velocities = np.asarray(velocities, dtype=float)
+        preferred = np.array(
+            velocities if preferred is None else preferred, dtype=float
+        )
+        if (
+            velocities.ndim != 2
+            or len(velocities) != len(positions)
+            or velocities.shape[1] < 2
+        ):
+            raise ValueError(
+                f"expected velocities with shape ({len(positions)}, 2) or"
+                + f" ({len(positions)}, 3) but got {velocities.shape} instead"
+            )
+
+        if len(preferred) < 2:
+            return preferred
+
+        # Half-plane normals turned into line directions:
+        x, y, nx, ny = self.half_planes(positions, velocities)
+        lines = (x, y, ny, -nx)
+
+        vx, vy, failed = _linear_program_2(
+            lines, preferred[:, 0], preferred[:, 1], self.max_speed
+        )
+        if (failed < len(x)).any():
+            _linear_program_3(lines, vx, vy, failed, self.max_speed)
+
+        preferred[:, 0] = vx
+        preferred[:, 1] = vy
+
+        return preferred
+
+    def adjust_targets(
+        self,
+        positions: np.ndarray,
+        velocities: np.ndarray,
+        yaw: np.ndarray,
+        speed: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Adjust the target headings and speeds of the whole fleet.
+
+        Args:
+            positions (np.ndarray): Drone positions with shape (N, 2) or
+                (N, 3).
+            velocities (np.ndarray): Current drone velocities with shape
+                (N, 2) or (N, 3).
+            yaw (np.ndarray): Target yaw of every drone in radians, counted
+                from the first axis toward the second.
+            speed (np.ndarray): Target horizontal speed of every drone in
+                m/s.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Collision-free target yaw and
+                horizontal speed. Yaw angles are unwrapped around the given
+                ones, so that drones turn the short way.
+        """
+        yaw = np.asarray(yaw, dtype=float)
+        speed = np.asarray(speed, dtype=float)
+        velocities = np.asarray(velocities, dtype=float)[:, :2]
+        preferred = speed[:, None] * np.column_stack(
+            (np.cos(yaw), np.sin(yaw))
+        )
+
+        # Full positions, so that drones apart in altitude are ignored:
+        result = self.adjust(positions, velocities, preferred)
+        new_speed = np.hypot(result[:, 0], result[:, 1])
+        turn = np.arctan2(result[:, 1], result[:, 0]) - yaw
+        turn = (turn + np.pi) % (2 * np.pi) - np.pi
+
+        return np.where(new_speed > 1e-9, yaw + turn, yaw), new_speed
+
+    def apply(self, simulations: Sequence[SimulationAPI]) -> None:
+        """Adjust the motion of a fleet of simulated drones.
+
+        The target state of every simulation is its preferred motion, and
+        the collision-free one is set as its avoidance state. Climb angles
+        are preserved: only the yaw and the speed are changed.
+
+        Args:
+            simulations (Sequence[SimulationAPI]): Simulations of every
+                drone, sharing the same coordinates.
+        """
+        if len(simulations) < 2:
+            return
+
+        positions = np.array([
+            tuple(simulation.drone.position) for simulation in simulations
+        ], dtype=float)
+        yaw, pitch, speed, target_yaw, target_pitch, target_speed = np.array([
+            (simulation.drone.rotation.x, simulation.drone.rotation.y,
+             simulation.drone.speed, *simulation.target_state)
+            for simulation in simulations
+        ], dtype=float).T
+
+        velocities = np.column_stack((
+            speed * np.cos(pitch) * np.cos(yaw),
+            speed * np.cos(pitch) * np.sin(yaw),
+            speed * np.sin(pitch)
+        ))
+        new_yaw, new_speed = self.adjust_targets(
+            positions, velocities, target_yaw,
+            target_speed * np.cos(target_pitch)
+        )
+        climb = target_speed * np.sin(target_pitch)
+
+        for simulation, *state in zip(
+            simulations,
+            new_yaw.tolist(),
+            np.arctan2(climb, new_speed).tolist(),
+            np.hypot(new_speed, climb).tolist()
+        ):
+            simulation.avoidance_state = tuple(state)
+
+    def schedule(
+        self,
+        scheduler: EventScheduler,
+        simulations: Sequence[SimulationAPI],
+        interval: Optional[float] = None
+    ) -> ScheduledEvent:
+        """Register periodic fleet adjustments in a shared scheduler.
+
+        The event should be registered before the simulations, so that every
+        tick adjusts the targets before the drones move.
+
+        Args:
+            scheduler (EventScheduler): Scheduler driving the simulations.
+            simulations (Sequence[SimulationAPI]): Simulations of every
+                drone.
+            interval (float | None): Adjustment period in seconds. Defaults
+                to the time step.
+
+        Returns:
+            ScheduledEvent: Periodic adjustment event.
+        """
+        return scheduler.call_every(
+            self.time_step if interval is None else interval,
+            self.apply, simulations
+        )
+
+    def _smallest_changes(
+        self,
+        px: np.ndarray,
+        py: np.ndarray,
+        vx: np.ndarray,
+        vy: np.ndarray
+    ) -> tuple[np.ndarray, ...]:
+        # Smallest relative velocity changes out of the velocity obstacles
+        # and normals of their boundaries:
+        radius = 2 * self.safety_radius
+        colliding = px * px + py * py <= radius ** 2
+
+        # Velocity obstacle truncated at the time horizon, or at the time
+        # step for drones that are already too close:
+        inverse_time = np.where(
+            colliding, 1 / self.time_step, 1 / self.time_horizon
+        )
+        relative = (px, py, vx, vy)
+        on_circle, *circle = _cutoff_changes(relative, radius, inverse_time)
+        on_circle |= colliding
+        leg = _leg_changes(relative, radius)
+
+        return tuple(
+            np.where(on_circle, *changes) for changes in zip(circle, leg)
+        )
+
+
+def separation(positions: np.ndarray) -> float:
+    """Get the smallest distance between any two drones.
+
+    Args:
+        positions (np.ndarray): Drone positions with shape (N, 2) or (N, 3).
+
+    Returns:
+        float: Smallest distance in meters, inf for less than two drones.
+    """
+    if len(positions) < 2:
+        return np.inf
+
+    distances, _ = cKDTree(positions).query(positions, 2)
+    return float(distances[:, 1].min())
+
+
+def _cutoff_changes(
+    relative: tuple[np.ndarray, ...],
+    radius: float,
+    inverse_time: np.ndarray
+) -> tuple[np.ndarray, ...]:
+    # Closest points on the cutoff circles, along w, and whether they are
+    # closer than the legs of the cones:
+    px, py, vx, vy = relative
+    wx = vx - inverse_time * px
+    wy = vy - inverse_time * py
+    w_length = np.hypot(wx, wy)
+    w_dot_p = wx * px + wy * py
+    on_circle = (w_dot_p < 0) & (w_dot_p ** 2 > radius ** 2 * w_length ** 2)
+
+    nx, ny = np.array((wx, wy)) / np.where(w_length > 0, w_length, 1)
+    change = radius * inverse_time - w_length
+
+    return on_circle, change * nx, change * ny, nx, ny
+
+
+def _leg_changes(
+    relative: tuple[np.ndarray, ...],
+    radius: float
+) -> tuple[np.ndarray, ...]:
+    # Closest points on the left or right legs of the cones:
+    px, py, vx, vy = relative
+    distance_sq = px * px + py * py
+    leg = np.sqrt(np.maximum(distance_sq - radius ** 2, 0))
+    side = np.where(px * vy - py * vx > 0, 1.0, -1.0)
+    inverse_sq = 1 / np.where(distance_sq > 0, distance_sq, 1)
+    dx = (px * leg - side * py * radius) * inverse_sq
+    dy = (side * px * radius + py * leg) * inverse_sq
+    dot = vx * dx + vy * dy
+
+    return dot * dx - vx, dot * dy - vy, -side * dy, side * dx
+
+
+def _clamp(
+    vx: np.ndarray,
+    vy: np.ndarray,
+    radius: float
+) -> tuple[np.ndarray, np.ndarray]:
+    speed = np.hypot(vx, vy)
+    factor = np.minimum(1, radius / np.where(speed > 0, speed, 1))
+    return vx * factor, vy * factor
+
+
+def _violation(
+    lines: Lines,
+    line: int,
+    vx: np.ndarray,
+    vy: np.ndarray
+) -> np.ndarray:
+    # Distance of the velocities to the allowed side of a line, positive if
+    # they are outside of it:
+    x, y, dx, dy = lines
+    return dx[line] * (y[line] - vy) - dy[line] * (x[line] - vx)
+
+
+def _select(lines: Lines, line: int, drones: np.ndarray) -> Lines:
+    # Lines up to `line` of some drones:
+    x, y, dx, dy = (array[:line + 1, drones] for array in lines)
+    return x, y, dx, dy
+
+
+def _line_bounds(
+    lines: Lines,
+    radius: float
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Parameter range of the points of the last line within the speed
+    # circle and the previous lines, and whether it is empty (RVO2
+    # linearProgram1):
+    x, y, dx, dy = lines
+    dot = x[-1] * dx[-1] + y[-1] * dy[-1]
+    discriminant = dot ** 2 + radius ** 2 - x[-1] ** 2 - y[-1] ** 2
+    root = np.sqrt(np.maximum(discriminant, 0))
+
+    # Previous lines cut the line on the side they point away from:
+    denominator = dx[-1] * dy[:-1] - dy[-1] * dx[:-1]
+    numerator = dx[:-1] * (y[-1] - y[:-1]) - dy[:-1] * (x[-1] - x[:-1])
+    t = numerator / np.where(denominator != 0, denominator, 1)
+    t_left = np.maximum(-dot - root, np.max(
+        np.where(denominator < -EPSILON, t, -np.inf), axis=0, initial=-np.inf
+    ))
+    t_right = np.minimum(-dot + root, np.min(
+        np.where(denominator > EPSILON, t, np.inf), axis=0, initial=np.inf
+    ))
+
+    # Parallel lines either contain the line or leave no room on it:
+    parallel = np.abs(denominator) <= EPSILON
+    return t_left, t_right, (
+        (discriminant >= 0) & (t_left <= t_right)
+        & np.all(~parallel | (numerator >= 0), axis=0)
+    )
+
+
+def _line_optimum(
+    lines: Lines,
+    opt_x: np.ndarray,
+    opt_y: np.ndarray,
+    radius: float,
+    direction: bool
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Best velocities on the last line, and whether there are any:
+    t_left, t_right, feasible = _line_bounds(lines, radius)
+    x, y, dx, dy = (array[-1] for array in lines)
+    if direction:
+        t = np.where(opt_x * dx + opt_y * dy > 0, t_right, t_left)
+    else:
+        t = np.clip(dx * (opt_x - x) + dy * (opt_y - y), t_left, t_right)
+
+    return x + t * dx, y + t * dy, feasible
+
+
+def _linear_program_2(
+    lines: Lines,
+    opt_x: np.ndarray,
+    opt_y: np.ndarray,
+    radius: float,
+    direction: bool = False
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Velocities closest to the optimal ones (or furthest along them, if they
+    # are unit directions) within the lines and the speed circle (RVO2
+    # linearProgram2). Lines are added one at a time, and only the drones
+    # whose velocity is outside of a line look for a new one on it. The
+    # index of the first line that could not be met is returned for every
+    # drone, or the number of lines.
+    if direction:
+        vx, vy = opt_x * radius, opt_y * radius
+    else:
+        vx, vy = _clamp(opt_x, opt_y, radius)
+
+    failed = np.full(len(vx), len(lines[0]))
+    for line in range(len(lines[0])):
+        drones = np.flatnonzero(
+            (failed == len(lines[0])) & (_violation(lines, line, vx, vy) > 0)
+        )
+        if not drones.size:
+            continue
+
+        new_x, new_y, feasible = _line_optimum(
+            _select(lines, line, drones), opt_x[drones], opt_y[drones],
+            radius, direction
+        )
+        vx[drones[feasible]] = new_x[feasible]
+        vy[drones[feasible]] = new_y[feasible]
+        failed[drones[~feasible]] = line
+
+    return vx, vy, failed
+
+
+def _projected_lines(lines: Lines) -> Lines:
+    # Previous lines projected on the last one: the velocities allowed by
+    # each of them are those that violate it less than the last line.
+    x, y, dx, dy = lines
+    determinant = dx[-1] * dy[:-1] - dy[-1] * dx[:-1]
+    parallel = np.abs(determinant) <= EPSILON
+    t = (
+        dx[:-1] * (y[-1] - y[:-1]) - dy[:-1] * (x[-1] - x[:-1])
+    ) / np.where(parallel, 1, determinant)
+
+    # Intersections with the last line, or midpoints for opposite lines:
+    point_x = np.where(parallel, (x[-1] + x[:-1]) / 2, x[-1] + t * dx[-1])
+    point_y = np.where(parallel, (y[-1] + y[:-1]) / 2, y[-1] + t * dy[-1])
+    direction_x = dx[:-1] - dx[-1]
+    direction_y = dy[:-1] - dy[-1]
+    length = np.hypot(direction_x, direction_y)
+
+    # Missing lines and lines with the same direction add no constraint:
+    ignored = (length == 0) | (np.hypot(dx[:-1], dy[:-1]) == 0) | (
+        parallel & (dx[-1] * dx[:-1] + dy[-1] * dy[:-1] > 0)
+    )
+    scale = np.where(ignored, 0, 1 / np.where(length > 0, length, 1))
+
+    return point_x, point_y, direction_x * scale, direction_y * scale
+
+
+def _linear_program_3(
+    lines: Lines,
+    vx: np.ndarray,
+    vy: np.ndarray,
+    failed: np.ndarray,
+    radius: float
+) -> None:
+    # Velocities that minimize the largest violation of the lines, for the
+    # drones whose lines could not all be met from line `failed` on (RVO2
+    # linearProgram3). The velocities are updated in place.
+    distance = np.zeros(len(vx))
+    for line in range(len(lines[0])):
+        drones = np.flatnonzero(
+            (failed <= line) & (_violation(lines, line, vx, vy) > distance)
+        )
+        if not drones.size:
+            continue
+
+        # Furthest along the normal of the line, within the projections:
+        new_x, new_y, unmet = _linear_program_2(
+            _projected_lines(_select(lines, line, drones)),
+            -lines[3][line, drones], lines[2][line, drones], radius,
+            direction=True
+        )
+
+        # Failures only come from rounding errors, and keep the current
+        # velocities:
+        met = unmet == line
+        vx[drones[met]] = new_x[met]
+        vy[drones[met]] = new_y[met]
+        distance[drones] = _violation(lines, line, vx, vy)[drones]
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    tick = 0.1
+    cruise = 15.0
+    ticks = 300
+
+    for fleet_size in (1_000, 10_000):
+        # Jittered grid of drones ~60 m apart, flying to their mirrored
+        # position across the north axis: both halves of the fleet cross
+        # each other head-on along shared lanes.
+        columns = int(np.ceil(np.sqrt(fleet_size)))
+        grid = np.indices((columns, columns)).reshape(2, -1).T[:fleet_size]
+        start_positions = (
+            (grid - columns / 2) * 60.0 + rng.uniform(-20, 20, grid.shape)
+        )
+        goals = start_positions * (-1, 1)
+
+        for avoidance in (None, CollisionAvoidance(5.0, 5.0, cruise)):
+            fleet = start_positions.copy()
+            fleet_velocities = np.zeros_like(fleet)
+            closest = np.inf
+            elapsed = 0.0
+            for _ in range(ticks):
+                to_goal = goals - fleet
+                goal_distance = np.hypot(*to_goal.T)[:, None]
+                wanted = to_goal * np.minimum(
+                    cruise, goal_distance / tick
+                ) / np.maximum(goal_distance, 1e-9)
+
+                start = time.perf_counter()
+                if avoidance is not None:
+                    wanted = avoidance.adjust(fleet, fleet_velocities,
+                                              wanted)
+                elapsed += time.perf_counter() - start
+
+                fleet_velocities = wanted
+                fleet = fleet + fleet_velocities * tick
+                closest = min(closest, separation(fleet))
+
+            label = "ORCA" if avoidance is not None else "none"
+            print(f"{fleet_size} drones, avoidance {label}: "
+                  + f"{elapsed / ticks * 1e3:.2f} ms per tick, "
+                  + f"closest approach {closest:.1f} m")
@@ -0,0 +1,421 @@
+"""Discrete-event scheduler module.
+
+This module contains a heap-based discrete-event scheduler shared by every
+time-driven element of a simulation (drones, plotting loops, simulation
+APIs). Elements register one-shot or periodic events instead of running
+their own `asyncio.sleep` loops.
+
+Two clock modes are available:
+
+- Real time: simulation time advances at `time_scale` times wall-clock time.
+  Deadlines are computed from absolute times on a fixed grid, so delays in a
+  callback do not accumulate as drift.
+- Virtual time: events are dispatched as fast as possible, jumping the clock
+  straight to the next deadline.
+
+Author:
+    Paulo Sanchez (@erlete)
+"""
+
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import inspect
+import itertools
+import math
+import time
+import traceback
+from typing import Any, Callable, Optional
+
+from ...network.logger import Logger
+
+
+class ScheduledEvent:
+    """Handle of a scheduled event.
+
+    Attributes:
+        time (float): Next simulation time at which the event is dispatched.
+        interval (float | None): Period in seconds for periodic events, None
+            for one-shot events.
+        callback (Callable): Function or coroutine function to call.
+        args (tuple): Positional arguments for the callback.
+        cancelled (bool): Whether the event was cancelled.
+        overruns (int): Number of periods skipped because the scheduler fell
+            behind wall-clock time (real-time mode only).
+    """
+
+    __slots__ = (
+        "time", "interval", "callback", "args", "cancelled", "overruns"
+    )
+
+    def __init__(
+        self,
+        time_: float,
+        interval: Optional[float],
+        callback: Callable,
+        args: tuple
+    ) -> None:
+        """Initialize a ScheduledEvent instance.
+
+        Args:
+            time_ (float): Simulation time of the first dispatch.
+            interval (float | None): Period in seconds, or None.
+            callback (Callable): Function or coroutine function to call.
+            args (tuple): Positional arguments for the callback.
+        """
+        self.time = time_
+        self.interval = interval
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self.overruns = 0
+
+    def cancel(self) -> None:
+        """Cancel the event. Cancelled events are discarded lazily."""
+        self.cancelled = True
+
+    def __repr__(self) -> str:
+        """Get short event representation.
+
+        Returns:
+            str: short event representation.
+        """
+        kind = "periodic" if self.interval is not None else "one-shot"
+        return f"<ScheduledEvent {kind} at t={self.time:.3f}>"
+
+
+class EventScheduler:
+    """Discrete-event scheduler.
+
+    Attributes:
+        realtime (bool): Whether simulation time is tied to wall-clock time.
+        time_scale (float): Simulation seconds per wall-clock second in
+            real-time mode.
+        yield_every (int): Number of events dispatched in virtual-time mode
+            between yields to the asyncio event loop.
+        dispatched (int): Number of events dispatched so far.
+        failed (int): Number of callbacks that raised an exception. Failing
+            events are logged and cancelled, and the other events keep
+            being dispatched.
+    """
+
+    def __init__(
+        self,
+        realtime: bool = True,
+        time_scale: float = 1.0,
+        yield_every: int = 64
+    ) -> None:
+        """Initialize an EventScheduler instance.
+
+        Args:
+            realtime (bool): Whether simulation time is tied to wall-clock
+                time. Events are dispatched as fast as possible otherwise.
+            time_scale (float): Simulation seconds per wall-clock second in
+                real-time mode (e.g. 50 runs 50 times faster than real time).
+            yield_every (int): Events dispatched in virtual-time mode between
+                yields to the asyncio event loop, so that I/O keeps flowing.
+        """
+        if time_scale <= 0:
+            raise ValueError(
+                f"time_scale must be positive but got {time_scale} instead"
+            )
+
+        self.realtime = realtime
+        self.time_scale = time_scale
+        self.yield_every = yield_every
+        self.dispatched = 0
+        self.failed = 0
+
+        self._now = 0.0
+        self._queue: list[tuple[float, int, ScheduledEvent]] = []
+        self._counter = itertools.count()
+        self._running = False
+        self._wall_origin = 0.0
+        self._sim_origin = 0.0
+        self._waiter: Optional[asyncio.Future] = None
+        self._logger = Logger(1, "[Scheduler]")
+
+    @property
+    def now(self) -> float:
+        """Get current simulation time in seconds.
+
+        Returns:
+            float: Time of the event being (or last) dispatched.
+        """
+        return self._now
+
+    @property
+    def clock(self) -> float:
+        """Get current simulation time, including time elapsed since the
+        last dispatched event while running in real-time mode.
+
+        Returns:
+            float: Current simulation time in seconds. Equal to `now` in
+                virtual-time mode and while the scheduler is not running.
+        """
+        if self.realtime and self._running:
+            return max(self._now, self._simulation_time())
+
+        return self._now
+
+    @property
+    def pending(self) -> int:
+        """Get number of queued events, including cancelled ones.
+
+        Returns:
+            int: Number of queued events.
+        """
+        return len(self._queue)
+
+    def call_at(
+        self,
+        time_: float,
+        callback: Callable,
+        *args: Any
+    ) -> ScheduledEvent:
+        """Schedule a one-shot event at an absolute simulation time.
+
+        Args:
+            time_ (float): Simulation time in seconds.
+            callback (Callable): Function or coroutine function to call.
+            *args: Positional arguments for the callback.
+
+        Returns:
+            ScheduledEvent: Event handle.
+        """
+        event = ScheduledEvent(max(time_, self._now), None, callback, args)
+        self._push(event)
+        return event
+
+    def call_later(
+        self,
+        delay: float,
+        callback: Callable,
+        *args: Any
+    ) -> ScheduledEvent:
+        """Schedule a one-shot event after a delay.
+
+        Args:
+            delay (float): Delay in simulation seconds.
+            callback (Callable): Function or coroutine function to call.
+            *args: Positional arguments for the callback.
+
+        Returns:
+            ScheduledEvent: Event handle.
+        """
+        return self.call_at(self._now + delay, callback, *args)
+
+    def call_every(
+        self,
+        interval: float,
+        callback: Callable,
+        *args: Any,
+        delay: float = 0.0
+    ) -> ScheduledEvent:
+        """Schedule a periodic event.
+
+        Args:
+            interval (float): Period in simulation seconds.
+            callback (Callable): Function or coroutine function to call.
+            *args: Positional arguments for the callback.
+            delay (float): Delay of the first dispatch in simulation seconds.
+
+        Returns:
+            ScheduledEvent: Event handle. Cancel it to stop the event.
+        """
+        if interval <= 0:
+            raise ValueError(
+                f"interval must be positive but got {interval} instead"
+            )
+
+        event = ScheduledEvent(self._now + delay, interval, callback, args)
+        self._push(event)
+        return event
+
+    def stop(self) -> None:
+        """Stop `run` after the event being dispatched, if any."""
+        self._running = False
+        self._wake()
+
+    def step(self) -> bool:
+        """Dispatch the next event synchronously, ignoring wall-clock time.
+
+        Coroutine callbacks are not supported by this method.
+
+        Returns:
+            bool: True if an event was dispatched, False if none is queued.
+        """
+        event = self._pop()
+        if event is None:
+            return False
+
+        result = self._dispatch(event)
+        if inspect.isawaitable(result):
+            if inspect.iscoroutine(result):
+                result.close()
+
+            raise TypeError(
+                "coroutine callbacks require EventScheduler.run"
+            )
+
+        return True
+
+    def run_until(self, time_: float) -> None:
+        """Dispatch every event up to a simulation time synchronously.
+
+        Args:
+            time_ (float): Final simulation time in seconds.
+        """
+        while self._queue and self._queue[0][0] <= time_:
+            self.step()
+
+        self._now = max(self._now, time_)
+
+    async def run(self, until: Optional[float] = None) -> None:
+        """Dispatch events until stopped or until a simulation time.
+
+        The scheduler idles (without busy-waiting) while its queue is empty.
+
+        Args:
+            until (float | None): Final simulation time in seconds. Runs until
+                `stop` is called if None.
+        """
+        self._running = True
+        self._sync_clock()
+        dispatched_since_yield = 0
+
+        try:
+            while self._running:
+                self._discard_cancelled()
+                head = self._queue[0][0] if self._queue else math.inf
+
+                if until is not None and head > until:
+                    if not self.realtime or self._simulation_time() >= until:
+                        self._now = max(self._now, until)
+                        break
+
+                    await self._sleep(
+                        self._wall_deadline(until) - time.monotonic()
+                    )
+                    continue
+
+                if self.realtime:
+                    delay = self._wall_deadline(head) - time.monotonic()
+                    if delay > 0:
+                        await self._sleep(delay)
+                        continue
+                elif head == math.inf:
+                    await self._sleep(None)
+                    continue
+
+                event = self._pop()
+                if event is None:
+                    continue
+
+                result = self._dispatch(event)
+                if inspect.isawaitable(result):
+                    try:
+                        await result
+                    except Exception as exc:  # pylint: disable=broad-except
+                        self._fail(event, exc)
+
+                    dispatched_since_yield = 0
+                    continue
+
+                dispatched_since_yield += 1
+                if dispatched_since_yield >= self.yield_every:
+                    dispatched_since_yield = 0
+                    await asyncio.sleep(0)
+
+        finally:
+            self._running = False
+
+    def _push(self, event: ScheduledEvent) -> None:
+        heapq.heappush(self._queue, (event.time, next(self._counter), event))
+
+        if self._queue[0][2] is event:
+            self._wake()
+
+    def _pop(self) -> Optional[ScheduledEvent]:
+        self._discard_cancelled()
+        if not self._queue:
+            return None
+
+        _, _, event = heapq.heappop(self._queue)
+        self._now = max(self._now, event.time)
+
+        if event.interval is not None:
+            event.time += event.interval
+
+            # Skip periods that are already late instead of bursting through
+            # them, keeping deadlines on the original grid:
+            if self.realtime and self._running:
+                lag = self._simulation_time() - event.time
+                if lag > 0:
+                    missed = math.ceil(lag / event.interval)
+                    event.time += missed * event.interval
+                    event.overruns += missed
+
+            self._push(event)
+
+        return event
+
+    def _dispatch(self, event: ScheduledEvent) -> Any:
+        self.dispatched += 1
+        try:
+            return event.callback(*event.args)
+        except Exception as exc:  # pylint: disable=broad-except
+            self._fail(event, exc)
+            return None
+
+    def _fail(self, event: ScheduledEvent, exc: Exception) -> None:
+        # One failing entity must not stop the scheduler shared by all of
+        # them: only its own event is cancelled.
+        self.failed += 1
+        event.cancel()
+        self._logger.log(
+            "%s event %s failed at t = %.3f s and was cancelled:\n%s", 3,
+            "periodic" if event.interval is not None else "one-shot",
+            getattr(event.callback, "__qualname__", event.callback),
+            self._now,
+            "".join(traceback.format_exception(exc)).rstrip()
+        )
+
+    def _discard_cancelled(self) -> None:
+        while self._queue and self._queue[0][2].cancelled:
+            heapq.heappop(self._queue)
+
+    def _sync_clock(self) -> None:
+        self._wall_origin = time.monotonic()
+        self._sim_origin = self._now
+
+    def _simulation_time(self) -> float:
+        return (
+            self._sim_origin
+            + (time.monotonic() - self._wall_origin) * self.time_scale
+        )
+
+    def _wall_deadline(self, time_: float) -> float:
+        return (
+            self._wall_origin + (time_ - self._sim_origin) / self.time_scale
+        )
+
+    async def _sleep(self, delay: Optional[float]) -> None:
+        loop = asyncio.get_running_loop()
+        self._waiter = loop.create_future()
+        handle = (
+            loop.call_later(delay, self._wake) if delay is not None else None
+        )
+
+        try:
+            await self._waiter
+        finally:
+            self._waiter = None
+            if handle is not None:
+                handle.cancel()
+
+    def _wake(self) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
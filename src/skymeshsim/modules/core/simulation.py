@@ -8,9 +8,15 @@ Author:
 """
 
 
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
 import numpy as np
 
+from ...services.wind import WindSampler
 from .drone import DroneAPI as Drone
+from .scheduler import EventScheduler, ScheduledEvent
 from .vector import Rotator3D, Vector3D
 
 
@@ -28,6 +34,14 @@ class SimulationAPI:
         next_waypoint (Vector3D | None): next waypoint data.
         remaining_waypoints (int): remaining waypoints in the track.
         is_simulation_finished (bool): whether the simulation is finished.
+        wind (WindSampler | None): wind sampler, in the coordinates of the
+            drone position (meters), whose drift is added to the position
+            update. Fleets should rather share a sampler through
+            `schedule_fleet`, which samples it once per tick for every
+            drone.
+        avoidance_state (tuple[float, float, float] | None): yaw and pitch
+            in radians and speed in m/s followed instead of the target state,
+            set by collision avoidance.
         DT (float): simulation time step in seconds.
         DV (float): simulation speed step in m/s.
         DR (float): simulation rotation step in rad/s.
@@ -40,13 +54,20 @@ class SimulationAPI:
     SUMMARY_FILE_PREFIX = "summary_"
     SUMMARY_DIR = "statistics"
 
-    def __init__(self, drone: Drone) -> None:
+    def __init__(
+        self,
+        drone: Drone,
+        wind: Optional[WindSampler] = None
+    ) -> None:
         """Initialize a SimulationAPI instance.
 
         Args:
             tracks (list[Track]): track list.
+            wind (WindSampler | None): wind sampler. No wind if None.
         """
         self._drone = drone
+        self.wind = wind
+        self.avoidance_state: Optional[tuple[float, float, float]] = None
         self._current_timer = 0.0
         self._timeout = 9999
 
@@ -72,6 +93,20 @@ class SimulationAPI:
         """
         return self._is_simulation_finished
 
+    @property
+    def target_state(self) -> tuple[float, float, float]:
+        """Returns the drone target state.
+
+        Returns:
+            tuple[float, float, float]: target yaw and pitch in radians and
+                target speed in m/s.
+        """
+        return (
+            float(self._target_rotation.x),
+            float(self._target_rotation.y),
+            float(self._target_speed)
+        )
+
     def set_drone_target_state(
         self,
         yaw: int | float,
@@ -113,6 +148,81 @@ class SimulationAPI:
         )
         self._target_speed = speed
 
+    def schedule(self, scheduler: EventScheduler) -> ScheduledEvent:
+        """Register periodic updates in a shared scheduler.
+
+        The simulation is updated every `DT` simulation seconds until it
+        finishes, at which point the periodic event cancels itself.
+
+        Args:
+            scheduler (EventScheduler): Scheduler driving the simulation.
+
+        Returns:
+            ScheduledEvent: Periodic update event.
+        """
+        def tick() -> None:
+            self.update()
+            if self._is_simulation_finished:
+                event.cancel()
+
+        event = scheduler.call_every(self.DT, tick)
+        return event
+
+    @classmethod
+    def schedule_fleet(
+        cls,
+        scheduler: EventScheduler,
+        simulations: Iterable[SimulationAPI],
+        wind: Optional[WindSampler] = None
+    ) -> ScheduledEvent:
+        """Register periodic updates of a whole fleet in a shared scheduler.
+
+        Every simulation is updated by a single event every `DT` simulation
+        seconds, after which the wind drift of the fleet is added with one
+        `advance_fleet` call. The event cancels itself once every simulation
+        finishes.
+
+        Args:
+            scheduler (EventScheduler): Scheduler driving the simulations.
+            simulations (Iterable[SimulationAPI]): Simulations of every
+                drone, sharing the same coordinates and without their own
+                wind sampler.
+            wind (WindSampler | None): Wind sampler shared by the fleet. No
+                wind if None.
+
+        Returns:
+            ScheduledEvent: Periodic update event.
+        """
+        fleet = list(simulations)
+
+        def tick() -> None:
+            nonlocal fleet
+            for simulation in fleet:
+                simulation.update()
+
+            fleet = [
+                simulation for simulation in fleet
+                if not simulation.is_simulation_finished
+            ]
+            if not fleet:
+                event.cancel()
+            elif wind is not None:
+                positions = advance_fleet(
+                    np.array([
+                        tuple(simulation.drone.position)
+                        for simulation in fleet
+                    ], dtype=float),
+                    np.zeros((len(fleet), 3)),
+                    cls.DT,
+                    wind,
+                    scheduler.now
+                )
+                for simulation, position in zip(fleet, positions.tolist()):
+                    simulation.drone.position = Vector3D(*position)
+
+        event = scheduler.call_every(cls.DT, tick)
+        return event
+
     def update(self) -> None:
         """Update drone state along the current track and plot environment.
 
@@ -131,6 +241,12 @@ class SimulationAPI:
 
             return
 
+        target_rotation = self._target_rotation
+        target_speed = self._target_speed
+        if self.avoidance_state is not None:
+            yaw, pitch, target_speed = self.avoidance_state
+            target_rotation = Rotator3D(np.rad2deg(yaw), np.rad2deg(pitch), 0)
+
         # Rotation update:
         self.drone.rotation = Rotator3D(
             *[
@@ -140,7 +256,7 @@ class SimulationAPI:
                     max(curr_rot - self.DR * self.DT, tg_rot)
                 ) for curr_rot, tg_rot in zip(
                     self.drone.rotation,
-                    self._target_rotation
+                    target_rotation
                 )
             ]
         )
@@ -148,9 +264,9 @@ class SimulationAPI:
         # Speed update:
         speed = self.drone.speed
         self.drone.speed = (
-            min(speed + self.DV * self.DT, self._target_speed)
-            if self._target_speed >= speed else
-            max(speed - self.DV * self.DT, self._target_speed)
+            min(speed + self.DV * self.DT, target_speed)
+            if target_speed >= speed else
+            max(speed - self.DV * self.DT, target_speed)
         )
 
         # Position update:
@@ -162,3 +278,48 @@ class SimulationAPI:
                 speed * self.DT * np.sin(rot.y)
             )
         )
+
+        # Wind drift:
+        if self.wind is not None:
+            position = self.drone.position
+            new_position = advance_fleet(
+                np.array([[position.x, position.y, position.z]]),
+                np.zeros((1, 3)),
+                self.DT,
+                self.wind,
+                self._current_timer
+            )[0]
+            self.drone.position = Vector3D(*map(float, new_position))
+
+
+def advance_fleet(
+    positions: np.ndarray,
+    velocities: np.ndarray,
+    dt: float,
+    wind: Optional[WindSampler] = None,
+    time_: float = 0.0
+) -> np.ndarray:
+    """Integrate the positions of a whole fleet over a time step.
+
+    The wind is interpolated for every drone in a single call.
+
+    Args:
+        positions (np.ndarray): Drone positions (east, north, up) in meters,
+            with shape (N, 3).
+        velocities (np.ndarray): Drone air velocities in m/s, with shape
+            (N, 3).
+        dt (float): Time step in seconds.
+        wind (WindSampler | None): Wind sampler in the same coordinates. No
+            wind if None.
+        time_ (float): Current time in seconds.
+
+    Returns:
+        np.ndarray: New drone positions.
+    """
+    ground_velocities = velocities
+    if wind is not None:
+        ground_velocities = velocities + wind.sample(
+            positions[:, 0], positions[:, 1], positions[:, 2], time_
+        )
+
+    return positions + ground_velocities * dt
@@ -1,40 +1,94 @@
-#!/usr/bin/env python
-# coding: utf-8
-# This script demonstrates generating gradients between two specified colors.
-# Users can define their start and end colors in HEX format, and the script will display the gradient transition.
-# Requirements: numpy, matplotlib
-# https://gist.github.com/setuc/c6f0491163ee4622cc03f181fa67c854
-# TODO: Update documentation
+"""Color gradient module.
+
+This module generates color gradients and maps arrays of values to colors
+through precomputed lookup tables (LUTs). A LUT samples a piecewise linear
+gradient with any number of stops once; mapping values then only normalizes
+and rounds them to table indices and gathers the RGBA rows, which colors a
+whole fleet in a single vectorized call. LUTs are cached per gradient spec, so
+every caller asking for the same gradient shares one table.
+
+Based on https://gist.github.com/setuc/c6f0491163ee4622cc03f181fa67c854
+
+Author:
+    Paulo Sanchez (@erlete)
+"""
+
+
+from __future__ import annotations
+
+import functools
+from typing import Optional, Sequence
+
 import numpy as np
 
+from ...network.utils import ArrayLike
+
 RGBTuple = tuple[int, int, int] | tuple[int, ...]
+ColorSpec = str | Sequence[float]
+
+# Preset gradients by attribute (low to high values):
+SPEED_GRADIENT = ("#2c7bb6", "#ffffbf", "#d7191c")
+AUTONOMY_GRADIENT = ("#d7191c", "#fdae61", "#1a9641")
+ALTITUDE_GRADIENT = ("#440154", "#21918c", "#fde725")
 
 
 def hex_to_rgb(hex_color: str) -> RGBTuple:
-    """
-    Convert hex to RGB.
+    """Convert a hexadecimal color code to RGB.
 
-    Parameters:
-    - hex_color: String representing the hexadecimal color code.
+    Args:
+        hex_color (str): Hexadecimal color code, such as `#ed685f`.
 
     Returns:
-    - A tuple of integers representing the RGB values.
+        RGBTuple: Red, green and blue values between 0 and 255.
     """
     hex_color = hex_color.lstrip('#')
     return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
 
 
-def interpolate_color(color_start_rgb: RGBTuple, color_end_rgb: RGBTuple, t):
+def to_rgba(color: ColorSpec) -> tuple[float, float, float, float]:
+    """Convert a color to normalized RGBA.
+
+    Args:
+        color (ColorSpec): Hexadecimal color code (`#rrggbb` or
+            `#rrggbbaa`), or RGB or RGBA values between 0 and 1.
+
+    Returns:
+        tuple[float, float, float, float]: Red, green, blue and alpha values
+            between 0 and 1.
     """
-    Interpolate between two RGB colors.
+    if isinstance(color, str):
+        code = color.lstrip('#')
+        if len(code) not in (6, 8):
+            raise ValueError(
+                f"expected #rrggbb or #rrggbbaa color but got {color!r}"
+                + " instead"
+            )
+
+        values = [int(code[i:i+2], 16) / 255 for i in range(0, len(code), 2)]
+    else:
+        values = [float(value) for value in color]
 
-    Parameters:
-    - color_start_rgb: Tuple of integers representing the starting RGB color.
-    - color_end_rgb: Tuple of integers representing the ending RGB color.
-    - t: Float representing the interpolation factor between 0 and 1.
+    if len(values) == 3:
+        values.append(1.0)
+
+    if len(values) != 4:
+        raise ValueError(
+            f"expected RGB or RGBA color but got {color!r} instead"
+        )
+
+    return values[0], values[1], values[2], values[3]
+
+
+def interpolate_color(color_start_rgb: RGBTuple, color_end_rgb: RGBTuple, t):
+    """Interpolate between two RGB colors.
+
+    Args:
+        color_start_rgb (RGBTuple): Starting RGB color (0 to 255).
+        color_end_rgb (RGBTuple): Ending RGB color (0 to 255).
+        t (float): Interpolation factor between 0 and 1.
 
     Returns:
-    - A tuple representing the interpolated RGB color.
+        tuple[float, ...]: Interpolated RGB color (0 to 1).
     """
     return tuple(
         int(start_val + (end_val - start_val) * t) / 255
@@ -42,15 +96,172 @@ def interpolate_color(color_start_rgb: RGBTuple, color_end_rgb: RGBTuple, t):
     )
 
 
-def get_color_gradient(color_start_hex: str, color_end_hex: str) -> list[RGBTuple]:
-    """Generate a color gradient between two specified colors."""
-    gradient = [
-        interpolate_color(
-            hex_to_rgb(color_start_hex),
-            hex_to_rgb(color_end_hex),
-            step
+def get_color_gradient(
+    color_start_hex: str,
+    color_end_hex: str,
+    steps: int = 100
+) -> list[RGBTuple]:
+    """Generate a color gradient between two colors.
+
+    Args:
+        color_start_hex (str): Hexadecimal starting color.
+        color_end_hex (str): Hexadecimal ending color.
+        steps (int): Number of colors. The ending color itself is excluded.
+
+    Returns:
+        list[RGBTuple]: RGB colors (0 to 1).
+    """
+    start = np.array(hex_to_rgb(color_start_hex), dtype=float)
+    end = np.array(hex_to_rgb(color_end_hex), dtype=float)
+    factors = np.arange(0, 1, 1 / steps)[:, np.newaxis]
+
+    gradient = np.trunc(start + (end - start) * factors) / 255
+
+    return [tuple(color) for color in gradient.tolist()]
+
+
+class ColorLUT:
+    """Color lookup table of a piecewise linear gradient.
+
+    Attributes:
+        table (np.ndarray): Read-only RGBA colors with shape (size, 4).
+        bad (np.ndarray): RGBA color of NaN values.
+    """
+
+    def __init__(
+        self,
+        colors: Sequence[ColorSpec],
+        positions: Optional[Sequence[float]] = None,
+        size: int = 256,
+        bad: ColorSpec = (0.0, 0.0, 0.0, 0.0)
+    ) -> None:
+        """Initialize a ColorLUT instance.
+
+        Args:
+            colors (Sequence[ColorSpec]): Gradient stop colors, from the
+                lowest to the highest value.
+            positions (Sequence[float] | None): Increasing stop positions
+                from 0 to 1. Defaults to evenly spaced stops.
+            size (int): Number of table entries.
+            bad (ColorSpec): Color of NaN values.
+        """
+        if len(colors) < 2 or size < 2:
+            raise ValueError(
+                "expected at least two colors and two entries but got"
+                + f" {len(colors)} and {size} instead"
+            )
+
+        stops = (
+            np.linspace(0.0, 1.0, len(colors)) if positions is None
+            else np.asarray(positions, dtype=float)
         )
-        for step in np.arange(0, 1, 1/100)
-    ]
+        if (
+            len(stops) != len(colors) or stops[0] != 0.0 or stops[-1] != 1.0
+            or np.any(np.diff(stops) < 0)
+        ):
+            raise ValueError(
+                "expected increasing positions from 0 to 1, one per color,"
+                + f" but got {list(stops)} instead"
+            )
+
+        rgba = np.array([to_rgba(color) for color in colors])
+        samples = np.linspace(0.0, 1.0, size)
+        self.table = np.column_stack([
+            np.interp(samples, stops, rgba[:, channel])
+            for channel in range(4)
+        ])
+        self.table.flags.writeable = False
+        self.bad = np.array(to_rgba(bad))
+
+    def __len__(self) -> int:
+        """Get the number of table entries.
+
+        Returns:
+            int: Number of table entries.
+        """
+        return len(self.table)
+
+    def __call__(
+        self,
+        values: ArrayLike,
+        vmin: float = 0.0,
+        vmax: float = 1.0,
+        out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Map values to colors.
+
+        Args:
+            values (ArrayLike): Values to map. Values outside of the range
+                are clamped to its ends.
+            vmin (float): Value mapped to the first color.
+            vmax (float): Value mapped to the last color.
+            out (np.ndarray | None): Output array with shape (N, 4), reused
+                between frames to avoid allocations.
+
+        Returns:
+            np.ndarray: RGBA colors with shape (N, 4).
+        """
+        values = np.asarray(values, dtype=float).reshape(-1)
+        scale = (len(self.table) - 1) / (vmax - vmin) if vmax > vmin else 0.0
+
+        positions = (values - vmin) * scale + 0.5
+        bad = np.isnan(positions)
+        positions[bad] = 0.0
+        indices = np.clip(positions, 0, len(self.table) - 1).astype(np.intp)
+
+        colors = self.table.take(indices, axis=0, out=out)
+        if bad.any():
+            colors[bad] = self.bad
+
+        return colors
+
+
+def get_color_lut(
+    colors: Sequence[ColorSpec],
+    positions: Optional[Sequence[float]] = None,
+    size: int = 256
+) -> ColorLUT:
+    """Get the shared lookup table of a gradient.
+
+    Args:
+        colors (Sequence[ColorSpec]): Gradient stop colors.
+        positions (Sequence[float] | None): Stop positions from 0 to 1.
+        size (int): Number of table entries.
+
+    Returns:
+        ColorLUT: Cached lookup table.
+    """
+    return _cached_lut(
+        tuple(color if isinstance(color, str) else tuple(color)
+              for color in colors),
+        None if positions is None else tuple(positions),
+        size
+    )
+
+
+@functools.lru_cache(maxsize=32)
+def _cached_lut(
+    colors: tuple[ColorSpec, ...],
+    positions: Optional[tuple[float, ...]],
+    size: int
+) -> ColorLUT:
+    return ColorLUT(colors, positions, size)
+
+
+if __name__ == "__main__":
+    import time
+
+    lut = get_color_lut(SPEED_GRADIENT)
+    assert get_color_lut(list(SPEED_GRADIENT)) is lut
+
+    rng = np.random.default_rng(0)
+    output = np.empty((10_000, 4))
+    speeds = rng.uniform(0, 50, len(output))
+
+    repeats = 1_000
+    start = time.perf_counter()
+    for _ in range(repeats):
+        lut(speeds, 0, 50, out=output)
+    elapsed = (time.perf_counter() - start) / repeats
 
-    return gradient
+    print(f"{len(output)} drones: {elapsed * 1e6:.0f} us per frame")
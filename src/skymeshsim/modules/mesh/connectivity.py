@@ -0,0 +1,517 @@
+"""Mesh connectivity module.
+
+This module maintains the radio range graph of the drone mesh: two drones are
+linked when they are within radio range of each other.
+
+Drones are indexed in a uniform grid of cells as large as the radio range, so
+every possible link joins drones in the same or in adjacent cells. These
+candidate pairs are kept between updates and only re-evaluated for the drones
+that moved to another cell, which are looked up in the grid sorted by cell;
+the distances of the candidate pairs are then checked in a single vectorized
+pass to find the current links. Every update returns the links that appeared
+and disappeared since the previous one.
+
+Graph queries (connected components, articulation points, i.e. drones whose
+loss splits the mesh, and hop-count routing tables) are computed on demand
+from a sparse adjacency matrix and cached until the links change.
+
+Author:
+    Paulo Sanchez (@erlete)
+"""
+
+
+from __future__ import annotations
+
+import time
+from typing import NamedTuple, Optional, cast
+
+import numpy as np
+from scipy.sparse import coo_matrix, csr_matrix
+from scipy.sparse.csgraph import connected_components, shortest_path
+
+from ...network.utils import (OPERATING_AREA_CENTER, ArrayLike,
+                              LocalProjection)
+
+# Cell coordinates are packed into a single integer key per cell:
+_CELL_OFFSET = 1 << 20
+_CELL_SPAN = 1 << 21
+_NEIGHBOUR_CELLS = np.array([
+    dy * _CELL_SPAN + dx for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+], dtype=np.int64)
+
+
+class LinkDiff(NamedTuple):
+    """Links that changed in a mesh update.
+
+    Attributes:
+        added (np.ndarray): New links with shape (N, 2).
+        removed (np.ndarray): Lost links with shape (N, 2).
+    """
+
+    added: np.ndarray
+    removed: np.ndarray
+
+    def __bool__(self) -> bool:
+        """Check whether any link changed.
+
+        Returns:
+            bool: True if links were added or removed.
+        """
+        return bool(len(self.added) or len(self.removed))
+
+
+class RoutingTable(NamedTuple):
+    """Hop-count routes from every drone to a set of destinations.
+
+    Attributes:
+        destinations (np.ndarray): Destination drone indices.
+        hops (np.ndarray): Number of hops from every drone to every
+            destination with shape (destinations, drones), -1 if
+            unreachable.
+        next_hop (np.ndarray): Neighbour to which every drone forwards
+            messages towards every destination, with the shape of `hops`, -1
+            at the destination itself and if unreachable.
+    """
+
+    destinations: np.ndarray
+    hops: np.ndarray
+    next_hop: np.ndarray
+
+    def route(self, source: int, destination: int) -> Optional[list[int]]:
+        """Get the drones along the route from a drone to a destination.
+
+        Args:
+            source (int): Source drone index.
+            destination (int): Destination drone index, which must be one of
+                `destinations`.
+
+        Returns:
+            list[int] | None: Drone indices from the source to the
+                destination, both included, or None if unreachable.
+        """
+        row = np.flatnonzero(self.destinations == destination)
+        if not len(row):
+            raise ValueError(
+                "expected one of the table destinations but got"
+                + f" {destination} instead"
+            )
+
+        next_hop = self.next_hop[row[0]]
+        if self.hops[row[0], source] < 0:
+            return None
+
+        route = [source]
+        while route[-1] != destination:
+            route.append(int(next_hop[route[-1]]))
+
+        return route
+
+
+class MeshGraph:
+    """Incremental radio range graph between drones.
+
+    Drones are identified by their index in the arrays given to `update`;
+    positions with NaN coordinates have no links. Changing the number of
+    drones rebuilds the graph.
+
+    Attributes:
+        radio_range (float): Maximum link distance in meters.
+        projection (LocalProjection): Local plane of geodetic updates.
+        count (int): Number of drones.
+        version (int): Counter incremented whenever the links change.
+        moved (int): Number of drones that changed cells in the last update.
+    """
+
+    def __init__(
+        self,
+        radio_range: float = 500.0,
+        projection: Optional[LocalProjection] = None
+    ) -> None:
+        """Initialize a MeshGraph instance.
+
+        Args:
+            radio_range (float): Maximum link distance in meters.
+            projection (LocalProjection | None): Local plane of geodetic
+                updates. Defaults to the plane of the operating area.
+        """
+        if radio_range <= 0:
+            raise ValueError(
+                f"expected positive radio range but got {radio_range}"
+                + " instead"
+            )
+
+        self.radio_range = float(radio_range)
+        self.projection = (
+            projection if projection is not None
+            else LocalProjection(*OPERATING_AREA_CENTER)
+        )
+        self.count = 0
+        self.version = 0
+        self.moved = 0
+
+        self._cells = np.empty(0, dtype=np.int64)
+        self._candidates = np.empty(0, dtype=np.int64)
+        self._links = np.empty(0, dtype=np.int64)
+        self._cache: dict[str, object] = {}
+
+    @property
+    def candidates(self) -> int:
+        """Get the number of candidate pairs in adjacent cells.
+
+        Returns:
+            int: Number of candidate pairs.
+        """
+        return len(self._candidates)
+
+    @property
+    def links(self) -> np.ndarray:
+        """Get current links.
+
+        Returns:
+            np.ndarray: Drone index pairs with shape (N, 2), lowest index
+                first and sorted.
+        """
+        return self._unpack(self._links)
+
+    @property
+    def adjacency(self) -> csr_matrix:
+        """Get the symmetric adjacency matrix of the mesh.
+
+        Returns:
+            csr_matrix: Boolean adjacency matrix with shape (count, count).
+        """
+        if "adjacency" not in self._cache:
+            links = self.links
+            rows = np.concatenate((links[:, 0], links[:, 1]))
+            columns = np.concatenate((links[:, 1], links[:, 0]))
+            self._cache["adjacency"] = coo_matrix(
+                (np.ones(len(rows), dtype=bool), (rows, columns)),
+                shape=(self.count, self.count)
+            ).tocsr()
+
+        return cast(csr_matrix, self._cache["adjacency"])
+
+    @property
+    def degrees(self) -> np.ndarray:
+        """Get the number of links of every drone.
+
+        Returns:
+            np.ndarray: Link counts.
+        """
+        return np.diff(self.adjacency.indptr)
+
+    def update(
+        self,
+        x: ArrayLike,
+        y: ArrayLike,
+        z: Optional[ArrayLike] = None
+    ) -> LinkDiff:
+        """Move the drones and update their links.
+
+        Args:
+            x (ArrayLike): East coordinates in meters.
+            y (ArrayLike): North coordinates in meters.
+            z (ArrayLike | None): Up coordinates in meters. Links are
+                horizontal if None.
+
+        Returns:
+            LinkDiff: Links added and removed by the update.
+        """
+        x = np.asarray(x, dtype=float).reshape(-1)
+        y = np.asarray(y, dtype=float).reshape(-1)
+        z = None if z is None else np.asarray(z, dtype=float).reshape(-1)
+
+        cells = self._cell_keys(x, y)
+        if len(x) != self.count:
+            self.count = len(x)
+            self._candidates = np.empty(0, dtype=np.int64)
+            self._links = np.empty(0, dtype=np.int64)
+            moved = np.arange(self.count)
+        else:
+            moved = np.flatnonzero(cells != self._cells)
+
+        self._cells = cells
+        self.moved = len(moved)
+        if len(moved):
+            self._update_candidates(moved)
+
+        links = self._candidates[self._in_range(self._candidates, x, y, z)]
+        diff = LinkDiff(
+            self._unpack(np.setdiff1d(links, self._links, True)),
+            self._unpack(np.setdiff1d(self._links, links, True))
+        )
+
+        self._links = links
+        if diff:
+            self.version += 1
+            self._cache.clear()
+
+        return diff
+
+    def update_geodetic(
+        self,
+        longitude: ArrayLike,
+        latitude: ArrayLike,
+        altitude: Optional[ArrayLike] = None
+    ) -> LinkDiff:
+        """Move the drones to geodetic positions and update their links.
+
+        Args:
+            longitude (ArrayLike): Drone longitudes.
+            latitude (ArrayLike): Drone latitudes.
+            altitude (ArrayLike | None): Drone altitudes in meters.
+
+        Returns:
+            LinkDiff: Links added and removed by the update.
+        """
+        if altitude is None:
+            return self.update(*self.projection.to_enu(longitude, latitude))
+
+        return self.update(
+            *self.projection.to_enu(longitude, latitude, altitude)
+        )
+
+    def components(self) -> tuple[int, np.ndarray]:
+        """Get the connected components of the mesh.
+
+        Returns:
+            tuple[int, np.ndarray]: Number of components and component label
+                of every drone.
+        """
+        if "components" not in self._cache:
+            self._cache["components"] = connected_components(
+                self.adjacency, directed=False
+            )
+
+        return cast(tuple[int, np.ndarray], self._cache["components"])
+
+    def articulation_points(self) -> np.ndarray:
+        """Get the drones whose loss would split their component.
+
+        Returns:
+            np.ndarray: Sorted drone indices.
+        """
+        if "articulation_points" not in self._cache:
+            self._cache["articulation_points"] = articulation_points(
+                self.adjacency
+            )
+
+        return cast(np.ndarray, self._cache["articulation_points"])
+
+    def routing_table(self, destinations: ArrayLike) -> RoutingTable:
+        """Compute hop-count routes from every drone to some destinations.
+
+        Args:
+            destinations (ArrayLike): Destination drone indices, e.g. the
+                drones linked to a ground station.
+
+        Returns:
+            RoutingTable: Routes to every destination.
+        """
+        destinations = np.atleast_1d(np.asarray(destinations, dtype=np.intp))
+        key = f"routing_table:{destinations.tobytes().hex()}"
+
+        if key not in self._cache:
+            distances, predecessors = shortest_path(
+                self.adjacency,
+                directed=False,
+                unweighted=True,
+                return_predecessors=True,
+                indices=destinations
+            )
+            distances = np.atleast_2d(distances)
+            reachable = np.isfinite(distances)
+
+            hops = np.full(distances.shape, -1, dtype=np.intp)
+            hops[reachable] = distances[reachable]
+
+            # Routes are symmetric, so the predecessor of a drone on the
+            # shortest path from a destination is its next hop towards it:
+            next_hop = np.atleast_2d(predecessors).astype(np.intp)
+            next_hop[next_hop < 0] = -1
+
+            self._cache[key] = RoutingTable(destinations, hops, next_hop)
+
+        return cast(RoutingTable, self._cache[key])
+
+    def _cell_keys(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        valid = np.isfinite(x) & np.isfinite(y)
+        columns = np.floor(np.where(valid, x, 0.0) / self.radio_range)
+        rows = np.floor(np.where(valid, y, 0.0) / self.radio_range)
+
+        keys = (
+            (rows.astype(np.int64) + _CELL_OFFSET) * _CELL_SPAN
+            + columns.astype(np.int64) + _CELL_OFFSET
+        )
+        keys[~valid] = -1
+
+        return keys
+
+    def _update_candidates(self, moved: np.ndarray) -> None:
+        is_moved = np.zeros(self.count, dtype=bool)
+        is_moved[moved] = True
+
+        # Candidates between drones that stayed in their cells are kept:
+        first, second = np.divmod(self._candidates, self.count)
+        kept = self._candidates[~(is_moved[first] | is_moved[second])]
+
+        moved = moved[self._cells[moved] >= 0]
+        order = np.argsort(self._cells, kind="stable")
+        sorted_cells = self._cells[order]
+
+        # Drones in the neighbourhood of every moved drone:
+        neighbourhood = (
+            self._cells[moved][:, np.newaxis] + _NEIGHBOUR_CELLS
+        ).reshape(-1)
+        starts = np.searchsorted(sorted_cells, neighbourhood, "left")
+        counts = np.searchsorted(sorted_cells, neighbourhood, "right") - starts
+
+        total = int(counts.sum())
+        offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        others = order[np.arange(total) + offsets]
+        sources = np.repeat(np.repeat(moved, len(_NEIGHBOUR_CELLS)), counts)
+
+        pairs = sources != others
+        low = np.minimum(sources[pairs], others[pairs]).astype(np.int64)
+        high = np.maximum(sources[pairs], others[pairs]).astype(np.int64)
+
+        # Pairs of two moved drones are found from both ends:
+        fresh = np.unique(low * self.count + high)
+        self._candidates = np.sort(np.concatenate((kept, fresh)))
+
+    def _in_range(
+        self,
+        pairs: np.ndarray,
+        x: np.ndarray,
+        y: np.ndarray,
+        z: Optional[np.ndarray]
+    ) -> np.ndarray:
+        first, second = np.divmod(pairs, self.count)
+
+        distance = (x[first] - x[second]) ** 2 + (y[first] - y[second]) ** 2
+        if z is not None:
+            distance += (z[first] - z[second]) ** 2
+
+        # NaN distances (drones without position) compare as out of range:
+        return distance <= self.radio_range ** 2
+
+    def _unpack(self, keys: np.ndarray) -> np.ndarray:
+        if not self.count:
+            return np.empty((0, 2), dtype=np.intp)
+
+        return np.column_stack(np.divmod(keys, self.count)).astype(np.intp)
+
+
+def articulation_points(adjacency: csr_matrix) -> np.ndarray:
+    """Find the articulation points of an undirected graph.
+
+    Uses an iterative version of Tarjan's depth-first search, so deep
+    graphs (e.g. long chains of drones) do not hit the recursion limit.
+
+    Args:
+        adjacency (csr_matrix): Symmetric adjacency matrix.
+
+    Returns:
+        np.ndarray: Sorted indices of the nodes whose removal increases the
+            number of connected components.
+    """
+    count = adjacency.shape[0]
+    indptr = adjacency.indptr.tolist()
+    indices = adjacency.indices.tolist()
+
+    order = [-1] * count
+    low = [0] * count
+    parent = [-1] * count
+    next_edge = indptr[:-1]
+    is_cut = np.zeros(count, dtype=bool)
+    visited = 0
+
+    for root in range(count):
+        # Isolated drones and visited components are skipped:
+        if order[root] >= 0 or indptr[root] == indptr[root + 1]:
+            continue
+
+        order[root] = low[root] = visited
+        visited += 1
+        children = 0
+        stack = [root]
+
+        while stack:
+            node = stack[-1]
+            edge = next_edge[node]
+
+            if edge < indptr[node + 1]:
+                next_edge[node] = edge + 1
+                neighbour = indices[edge]
+
+                if order[neighbour] < 0:
+                    parent[neighbour] = node
+                    order[neighbour] = low[neighbour] = visited
+                    visited += 1
+                    stack.append(neighbour)
+
+                elif neighbour != parent[node]:
+                    low[node] = min(low[node], order[neighbour])
+
+                continue
+
+            stack.pop()
+            if not stack:
+                break
+
+            up = stack[-1]
+            if low[node] < low[up]:
+                low[up] = low[node]
+
+            if up == root:
+                children += 1
+            elif low[node] >= order[up]:
+                is_cut[up] = True
+
+        if children > 1:
+            is_cut[root] = True
+
+    return np.flatnonzero(is_cut)
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+
+    # 10k drones over a 20 x 20 km area, flying at 15 m/s and 10 Hz:
+    fleet_size = 10_000
+    tick = 0.1
+    east = rng.uniform(-10_000, 10_000, fleet_size)
+    north = rng.uniform(-10_000, 10_000, fleet_size)
+    up = rng.uniform(50, 150, fleet_size)
+    heading = rng.uniform(0, 2 * np.pi, fleet_size)
+
+    mesh = MeshGraph(radio_range=300.0)
+    start = time.perf_counter()
+    mesh.update(east, north, up)
+    build = time.perf_counter() - start
+
+    ticks = 100
+    changes = 0
+    start = time.perf_counter()
+    for _ in range(ticks):
+        heading += rng.normal(0, 0.1, fleet_size)
+        east += 15 * tick * np.cos(heading)
+        north += 15 * tick * np.sin(heading)
+        changes += sum(map(len, mesh.update(east, north, up)))
+    elapsed = (time.perf_counter() - start) / ticks
+
+    start = time.perf_counter()
+    component_count, labels = mesh.components()
+    cuts = mesh.articulation_points()
+    table = mesh.routing_table(np.argsort(np.hypot(east, north))[:4])
+    queries = time.perf_counter() - start
+
+    print(f"{fleet_size} drones, {len(mesh.links)} links "
+          + f"({mesh.candidates} candidates):")
+    print(f"  build: {build * 1e3:.1f} ms")
+    print(f"  update: {elapsed * 1e3:.2f} ms per tick, "
+          + f"{changes / ticks:.0f} link changes per tick")
+    print(f"  queries: {queries * 1e3:.1f} ms for {component_count} "
+          + f"components, {len(cuts)} articulation points and routes to "
+          + f"{len(table.destinations)} destinations "
+          + f"({np.count_nonzero(table.hops >= 0)} reachable)")
@@ -0,0 +1,571 @@
+"""Mesh delivery module.
+
+This module simulates the delivery of messages hop by hop through the drone
+mesh, instead of the ideal single hop of the socket server.
+
+Messages follow the hop-count routes of a `MeshGraph` from their source to
+their destination. Every drone has a single radio, which transmits the
+messages queued at it one at a time at the link bandwidth; messages that
+find a full queue are dropped, and every transmission is lost with a fixed
+probability. Each hop is a single event in an `EventScheduler`: in virtual
+time, a simulation processes hop events as fast as the scheduler dispatches
+them, without sockets or sleeps. Delivery ratios and latency distributions
+are gathered per route.
+
+`MeshRelay` connects the simulation to named network components: it keeps
+the mesh of the drones and a ground station up to date with the drone
+positions, and delivers the messages relayed through it after their
+simulated delay, so the socket server can optionally route drone traffic
+over the simulated mesh.
+
+Author:
+    Paulo Sanchez (@erlete)
+"""
+
+
+from __future__ import annotations
+
+import collections
+import random
+import time
+from typing import Any, Callable, NamedTuple, Optional
+
+import numpy as np
+
+from ...network.utils import OPERATING_AREA_CENTER
+from ..core.scheduler import EventScheduler, ScheduledEvent
+from .connectivity import MeshGraph
+
+
+class LinkModel(NamedTuple):
+    """Radio link parameters shared by every hop.
+
+    Attributes:
+        latency (float): Propagation and processing delay per hop in
+            seconds.
+        bandwidth (float): Transmission rate of every radio in bytes per
+            second.
+        queue_size (int): Maximum number of messages queued at a radio,
+            including the one being transmitted.
+        loss_rate (float): Probability of losing a transmission.
+    """
+
+    latency: float = 0.002
+    bandwidth: float = 250_000.0
+    queue_size: int = 64
+    loss_rate: float = 0.01
+
+
+class RouteStats:
+    """Delivery counters of a route.
+
+    Attributes:
+        sent (int): Number of messages sent.
+        delivered (int): Number of messages delivered.
+        lost (int): Number of messages lost in a transmission.
+        overflowed (int): Number of messages dropped by a full queue.
+        unreachable (int): Number of messages dropped for lack of a route.
+        latencies (list[float]): Latency of every delivered message in
+            seconds.
+        hops (list[int]): Number of hops of every delivered message.
+    """
+
+    __slots__ = (
+        "sent", "delivered", "lost", "overflowed", "unreachable",
+        "latencies", "hops"
+    )
+
+    def __init__(self) -> None:
+        """Initialize a RouteStats instance."""
+        self.sent = 0
+        self.delivered = 0
+        self.lost = 0
+        self.overflowed = 0
+        self.unreachable = 0
+        self.latencies: list[float] = []
+        self.hops: list[int] = []
+
+    @property
+    def in_flight(self) -> int:
+        """Get the number of messages neither delivered nor dropped.
+
+        Returns:
+            int: Number of messages in flight.
+        """
+        return (
+            self.sent - self.delivered - self.lost - self.overflowed
+            - self.unreachable
+        )
+
+    def merge(self, other: RouteStats) -> None:
+        """Add the counters of another route.
+
+        Args:
+            other (RouteStats): Route to add.
+        """
+        for name in self.__slots__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+
+class RouteSummary(NamedTuple):
+    """Delivery summary of a route.
+
+    Attributes:
+        source (str | int): Source node, "*" for aggregated routes.
+        destination (str | int): Destination node, "*" for aggregated
+            routes.
+        sent (int): Number of messages sent.
+        delivery_ratio (float): Delivered fraction of the messages that
+            were delivered or dropped.
+        lost (int): Number of messages lost in a transmission.
+        overflowed (int): Number of messages dropped by a full queue.
+        unreachable (int): Number of messages dropped for lack of a route.
+        mean_latency (float): Mean latency in seconds, NaN if none was
+            delivered.
+        latency_percentiles (tuple[float, float, float]): 50th, 95th and
+            99th latency percentiles in seconds.
+        mean_hops (float): Mean number of hops of the delivered messages.
+    """
+
+    source: str | int
+    destination: str | int
+    sent: int
+    delivery_ratio: float
+    lost: int
+    overflowed: int
+    unreachable: int
+    mean_latency: float
+    latency_percentiles: tuple[float, float, float]
+    mean_hops: float
+
+    @classmethod
+    def from_stats(
+        cls,
+        source: str | int,
+        destination: str | int,
+        stats: RouteStats
+    ) -> RouteSummary:
+        """Summarize the counters of a route.
+
+        Args:
+            source (str | int): Source node.
+            destination (str | int): Destination node.
+            stats (RouteStats): Route counters.
+
+        Returns:
+            RouteSummary: Route summary.
+        """
+        finished = stats.sent - stats.in_flight
+        latencies = np.asarray(stats.latencies)
+        percentiles = (
+            tuple(np.percentile(latencies, (50, 95, 99)).tolist())
+            if len(latencies) else (np.nan, np.nan, np.nan)
+        )
+
+        return cls(
+            source,
+            destination,
+            stats.sent,
+            stats.delivered / finished if finished else np.nan,
+            stats.lost,
+            stats.overflowed,
+            stats.unreachable,
+            float(latencies.mean()) if len(latencies) else np.nan,
+            percentiles,
+            float(np.mean(stats.hops)) if stats.hops else np.nan
+        )
+
+    def __str__(self) -> str:
+        """Get readable route summary.
+
+        Returns:
+            str: Readable route summary.
+        """
+        p50, p95, p99 = (value * 1e3 for value in self.latency_percentiles)
+        return (
+            f"{self.source} -> {self.destination}: {self.sent} sent, "
+            + f"{self.delivery_ratio:.1%} delivered ({self.lost} lost, "
+            + f"{self.overflowed} overflowed, {self.unreachable} "
+            + f"unreachable), latency {self.mean_latency * 1e3:.1f} ms "
+            + f"mean, {p50:.1f}/{p95:.1f}/{p99:.1f} ms p50/p95/p99, "
+            + f"{self.mean_hops:.1f} hops"
+        )
+
+
+class _Message:
+    __slots__ = ("stats", "destination", "size", "sent", "hops", "callback",
+                 "args")
+
+    def __init__(
+        self,
+        stats: RouteStats,
+        destination: int,
+        size: int,
+        sent: float,
+        callback: Optional[Callable],
+        args: tuple
+    ) -> None:
+        self.stats = stats
+        self.destination = destination
+        self.size = size
+        self.sent = sent
+        self.hops = 0
+        self.callback = callback
+        self.args = args
+
+
+class MeshDelivery:
+    """Event-driven simulation of multi-hop message delivery.
+
+    Nodes are the drone indices of the mesh. Routes are looked up again at
+    every hop, so messages follow topology changes while in flight.
+
+    Attributes:
+        mesh (MeshGraph): Mesh whose links carry the messages.
+        link (LinkModel): Radio link parameters.
+        scheduler (EventScheduler): Scheduler of the hop events.
+        max_hops (int): Maximum number of hops of a message.
+        routes (dict[tuple[int, int], RouteStats]): Counters by source and
+            destination node.
+        hop_events (int): Number of hop events processed.
+    """
+
+    def __init__(
+        self,
+        mesh: MeshGraph,
+        link: LinkModel = LinkModel(),
+        scheduler: Optional[EventScheduler] = None,
+        max_hops: int = 64,
+        seed: Optional[int] = None
+    ) -> None:
+        """Initialize a MeshDelivery instance.
+
+        Args:
+            mesh (MeshGraph): Mesh whose links carry the messages.
+            link (LinkModel): Radio link parameters.
+            scheduler (EventScheduler | None): Scheduler of the hop events.
+                Defaults to a virtual-time scheduler.
+            max_hops (int): Maximum number of hops of a message, after which
+                it is dropped as unreachable.
+            seed (int | None): Seed of the transmission losses.
+        """
+        if link.bandwidth <= 0 or link.queue_size < 1:
+            raise ValueError(
+                "expected positive bandwidth and queue size but got"
+                + f" {link.bandwidth} and {link.queue_size} instead"
+            )
+
+        self.mesh = mesh
+        self.link = link
+        self.scheduler = (
+            scheduler if scheduler is not None
+            else EventScheduler(realtime=False)
+        )
+        self.max_hops = max_hops
+        self.routes: dict[tuple[int, int], RouteStats] = {}
+        self.hop_events = 0
+
+        self._random = random.Random(seed).random
+        self._queues: dict[int, collections.deque] = (
+            collections.defaultdict(collections.deque)
+        )
+        self._next_hops: dict[int, list[int]] = {}
+        self._mesh_version = -1
+
+    def send(
+        self,
+        source: int,
+        destination: int,
+        size: int = 256,
+        callback: Optional[Callable] = None,
+        args: tuple = ()
+    ) -> None:
+        """Send a message through the mesh.
+
+        Args:
+            source (int): Source node.
+            destination (int): Destination node.
+            size (int): Message size in bytes.
+            callback (Callable | None): Function or coroutine function called
+                with `args` when the message is delivered.
+            args (tuple): Positional arguments for the callback.
+        """
+        stats = self.routes.get((source, destination))
+        if stats is None:
+            stats = self.routes[source, destination] = RouteStats()
+
+        stats.sent += 1
+        self.scheduler.call_at(
+            self.scheduler.clock,
+            self._forward,
+            _Message(stats, destination, size, self.scheduler.clock,
+                     callback, args),
+            source
+        )
+
+    def summary(self) -> list[RouteSummary]:
+        """Summarize the delivery of every route.
+
+        Returns:
+            list[RouteSummary]: Route summaries.
+        """
+        return [
+            RouteSummary.from_stats(source, destination, stats)
+            for (source, destination), stats in self.routes.items()
+        ]
+
+    def total(self) -> RouteSummary:
+        """Summarize the delivery of every route together.
+
+        Returns:
+            RouteSummary: Aggregated summary.
+        """
+        total = RouteStats()
+        for stats in self.routes.values():
+            total.merge(stats)
+
+        return RouteSummary.from_stats("*", "*", total)
+
+    def _next_hop(self, node: int, destination: int) -> int:
+        if self._mesh_version != self.mesh.version:
+            self._mesh_version = self.mesh.version
+            self._next_hops.clear()
+
+        next_hops = self._next_hops.get(destination)
+        if next_hops is None:
+            next_hops = self._next_hops[destination] = (
+                self.mesh.routing_table(destination).next_hop[0].tolist()
+                if destination < self.mesh.count else []
+            )
+
+        return next_hops[node] if node < len(next_hops) else -1
+
+    def _forward(self, message: _Message, node: int) -> Any:
+        self.hop_events += 1
+        now = self.scheduler.clock
+
+        if node == message.destination:
+            stats = message.stats
+            stats.delivered += 1
+            stats.latencies.append(now - message.sent)
+            stats.hops.append(message.hops)
+
+            if message.callback is not None:
+                return message.callback(*message.args)
+
+            return None
+
+        next_hop = self._next_hop(node, message.destination)
+        if next_hop < 0 or message.hops >= self.max_hops:
+            message.stats.unreachable += 1
+            return None
+
+        # Transmission end times of the messages queued at the radio:
+        queue = self._queues[node]
+        while queue and queue[0] <= now:
+            queue.popleft()
+
+        if len(queue) >= self.link.queue_size:
+            message.stats.overflowed += 1
+            return None
+
+        start = queue[-1] if queue else now
+        end = start + message.size / self.link.bandwidth
+        queue.append(end)
+
+        if self._random() < self.link.loss_rate:
+            message.stats.lost += 1
+            return None
+
+        message.hops += 1
+        self.scheduler.call_at(
+            end + self.link.latency, self._forward, message, next_hop
+        )
+
+        return None
+
+
+class MeshRelay:
+    """Message relay over the simulated mesh of named components.
+
+    The ground station is the first node of the mesh, at a fixed position;
+    drones join it at the first mesh update after their position is known.
+
+    Attributes:
+        delivery (MeshDelivery): Delivery simulation.
+        update_interval (float): Mesh update period in seconds.
+        nodes (dict[str, int]): Mesh node of every component.
+    """
+
+    GROUND = "ground"
+
+    def __init__(
+        self,
+        radio_range: float = 500.0,
+        link: LinkModel = LinkModel(),
+        ground: tuple[float, float, float] = (*OPERATING_AREA_CENTER, 0.0),
+        scheduler: Optional[EventScheduler] = None,
+        update_interval: float = 1.0,
+        seed: Optional[int] = None
+    ) -> None:
+        """Initialize a MeshRelay instance.
+
+        Args:
+            radio_range (float): Maximum link distance in meters.
+            link (LinkModel): Radio link parameters.
+            ground (tuple[float, float, float]): Longitude, latitude and
+                altitude of the ground station.
+            scheduler (EventScheduler | None): Scheduler of the hop events
+                and mesh updates. Defaults to a real-time scheduler, which
+                must be run by the caller.
+            update_interval (float): Mesh update period in seconds.
+            seed (int | None): Seed of the transmission losses.
+        """
+        self.delivery = MeshDelivery(
+            MeshGraph(radio_range),
+            link,
+            scheduler if scheduler is not None else EventScheduler(),
+            seed=seed
+        )
+        self.update_interval = update_interval
+        self.nodes = {self.GROUND: 0}
+
+        self._positions = [ground]
+
+    @property
+    def scheduler(self) -> EventScheduler:
+        """Get the scheduler of the hop events.
+
+        Returns:
+            EventScheduler: Scheduler of the hop events.
+        """
+        return self.delivery.scheduler
+
+    def start(self) -> ScheduledEvent:
+        """Register the periodic mesh updates.
+
+        Returns:
+            ScheduledEvent: Periodic update event.
+        """
+        return self.scheduler.call_every(self.update_interval, self.update)
+
+    def update_position(
+        self,
+        name: str,
+        longitude: float,
+        latitude: float,
+        altitude: float = 0.0
+    ) -> None:
+        """Set the latest position of a component.
+
+        Args:
+            name (str): Component name.
+            longitude (float): Longitude.
+            latitude (float): Latitude.
+            altitude (float): Altitude in meters.
+        """
+        position = (longitude, latitude, altitude)
+        node = self.nodes.get(name)
+
+        if node is None:
+            self.nodes[name] = len(self._positions)
+            self._positions.append(position)
+        else:
+            self._positions[node] = position
+
+    def update(self) -> None:
+        """Move the mesh nodes to their latest positions."""
+        positions = np.array(self._positions, dtype=float)
+        self.delivery.mesh.update_geodetic(
+            positions[:, 0], positions[:, 1], positions[:, 2]
+        )
+
+    def relay(
+        self,
+        source: str,
+        destination: str,
+        size: int,
+        callback: Callable,
+        args: tuple = ()
+    ) -> bool:
+        """Deliver a message through the mesh.
+
+        Args:
+            source (str): Source component name.
+            destination (str): Destination component name.
+            size (int): Message size in bytes.
+            callback (Callable): Function or coroutine function called with
+                `args` when the message is delivered.
+            args (tuple): Positional arguments for the callback.
+
+        Returns:
+            bool: True if the message entered the mesh, False if an endpoint
+                is not on the mesh yet, i.e. its position is not known or it
+                joined after the last mesh update.
+        """
+        source_node = self.nodes.get(source, -1)
+        destination_node = self.nodes.get(destination, -1)
+        count = self.delivery.mesh.count
+        if not (0 <= source_node < count and 0 <= destination_node < count):
+            return False
+
+        self.delivery.send(
+            source_node, destination_node, size, callback, args
+        )
+        return True
+
+    def summary(self) -> list[RouteSummary]:
+        """Summarize the delivery of every route by component name.
+
+        Returns:
+            list[RouteSummary]: Route summaries.
+        """
+        names = {node: name for name, node in self.nodes.items()}
+        return [
+            RouteSummary.from_stats(
+                names[source], names[destination], stats
+            )
+            for (source, destination), stats in self.delivery.routes.items()
+        ]
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+
+    # 2000 drones over a 6 x 6 km area around a central ground station, each
+    # reporting its status every second for a minute of simulated time:
+    fleet_size = 2_000
+    duration = 60.0
+    east = np.append(0.0, rng.uniform(-3_000, 3_000, fleet_size))
+    north = np.append(0.0, rng.uniform(-3_000, 3_000, fleet_size))
+
+    mesh = MeshGraph(radio_range=250.0)
+    mesh.update(east, north)
+    simulation = MeshDelivery(mesh, seed=0)
+
+    def report(drone: int) -> None:
+        simulation.send(drone, 0, 256)
+
+    for drone_index in range(1, fleet_size + 1):
+        simulation.scheduler.call_every(
+            1.0, report, drone_index, delay=rng.uniform(0, 1.0)
+        )
+
+    start = time.perf_counter()
+    simulation.scheduler.run_until(duration)
+    elapsed = time.perf_counter() - start
+
+    print(f"{fleet_size} drones, {len(mesh.links)} links, "
+          + f"{duration:.0f} s simulated in {elapsed:.2f} s:")
+    print(f"  {simulation.hop_events} hop events "
+          + f"({simulation.hop_events / elapsed * 60 / 1e6:.1f} million "
+          + "per minute)")
+    print(f"  {simulation.total()}")
+
+    by_hops = sorted(
+        (summary for summary in simulation.summary()
+         if summary.mean_hops >= 0),
+        key=lambda summary: summary.mean_hops
+    )
+    for summary in by_hops[::len(by_hops) // 4][:4]:
+        print(f"  {summary}")
@@ -9,6 +9,7 @@ Author:
 
 
 import asyncio
+from typing import Optional
 
 from .logger import Logger
 from .messages import (ClientIdentificationMessage, DroneCommandMessage,
@@ -25,22 +26,29 @@ COMMANDS = {
 
 
 class ControlSystem(_BaseNetworkComponent, _NetworkInputReader):
-    """Sends user commands to the server."""
+    """Sends user commands to every server shard."""
 
-    def __init__(self, host: str, port: int):
-        super().__init__(host, port)
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        address: Optional[str] = None,
+        shards: int = 1
+    ):
+        super().__init__(host, port, address, shards)
 
         self._online = True
         self._logger = Logger(0, "[ControlSystem]")
 
     async def run(self) -> None:
-        """Connect to the server and send user commands."""
-        _, writer = await asyncio.open_connection(self.host, self.port)
+        """Connect to every server shard and send user commands."""
+        writers = [writer for _, writer in await self.open_connections()]
 
-        await ClientIdentificationMessage(
-            component="ControlSystem",
-            writer=writer
-        ).send()
+        for writer in writers:
+            await ClientIdentificationMessage(
+                component="ControlSystem",
+                writer=writer
+            ).send()
 
         self._logger.log("ControlSystem started.", 1)
         self._logger.log(
@@ -73,19 +81,22 @@ class ControlSystem(_BaseNetworkComponent, _NetworkInputReader):
 
                 # External operation commands:
                 if command.startswith("moveto"):
-                    await DroneCommandMessage(
-                        target="all",
-                        command="moveto",
-                        args=tuple(
-                            map(float, command.split("moveto ")[1].split(","))
-                        ),
-                        writer=writer
-                    ).send()
+                    args = tuple(
+                        map(float, command.split("moveto ")[1].split(","))
+                    )
+                    for writer in writers:
+                        await DroneCommandMessage(
+                            target="all",
+                            command="moveto",
+                            args=args,
+                            writer=writer
+                        ).send()
                 elif command == "drones":
-                    await ServerCommandMessage(
-                        command="drones",
-                        writer=writer
-                    ).send()
+                    for writer in writers:
+                        await ServerCommandMessage(
+                            command="drones",
+                            writer=writer
+                        ).send()
 
                     self._logger.log(
                         "Requesting drone list. Check server log for result.",
@@ -102,12 +113,20 @@ class ControlSystem(_BaseNetworkComponent, _NetworkInputReader):
             self._logger.log("ControlSystem connection interrupted.", 2)
 
         finally:
-            writer.close()
-            await writer.wait_closed()
+            for writer in writers:
+                writer.close()
+                await writer.wait_closed()
             self._logger.log("ControlSystem connection closed.", 1)
 
 
 if __name__ == "__main__":
+    import sys
+
     # A single ControlSystem instance can be run per standalone application:
-    control_system = ControlSystem(host="127.0.0.1", port=8888)
+    control_system = ControlSystem(
+        host="127.0.0.1",
+        port=8888,
+        address=sys.argv[1] if len(sys.argv) > 1 else None,
+        shards=int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    )
     asyncio.run(control_system.run())
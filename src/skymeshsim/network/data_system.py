@@ -5,68 +5,247 @@ Author:
 """
 
 
+from __future__ import annotations
+
 import asyncio
 import json
-import math
-import os
-from typing import Any
+from typing import TYPE_CHECKING, Any, Iterable, Optional
 
-import geopandas as gpd
-import matplotlib.pyplot as plt
 import numpy as np
-import rasterio
-from matplotlib.colors import LinearSegmentedColormap, Normalize
-from rasterio.mask import mask
-from shapely.geometry import mapping
 
+from ..modules.core.scheduler import EventScheduler, ScheduledEvent
+from ..modules.interface.color_gradient import (ALTITUDE_GRADIENT,
+                                                AUTONOMY_GRADIENT,
+                                                SPEED_GRADIENT, ColorLUT,
+                                                get_color_lut)
+from ..services.coverage import CoverageAccumulator
 from .logger import Logger
 from .messages import ClientIdentificationMessage
 from .network_component import _BaseNetworkComponent
-from .utils import COVER_RADIUS, radius_to_lat_lon_units
+from .raster_cache import RasterCache, load_static_layers
+from .raster_view import TileCache, ViewManager, load_layer_pyramids
+from .renderer import FleetSnapshot, HeadlessRenderer
+from .transport import create_telemetry_reader, parse_telemetry_addresses
 
+if TYPE_CHECKING:
+    from ..modules.mesh.connectivity import MeshGraph
+    from ..services.geofence import Geofence
 
-class DataSystem(_BaseNetworkComponent):
-    """Logs messages received from the server and plots drone data."""
+# Gradient and default value range of every drone color attribute:
+COLOR_SCALES = {
+    "speed": (SPEED_GRADIENT, (0.0, 50.0)),
+    "autonomy": (AUTONOMY_GRADIENT, (0.0, 100.0)),
+    "altitude": (ALTITUDE_GRADIENT, (0.0, 500.0))
+}
 
-    def __init__(self, host: str, port: int):
-        super().__init__(host, port)
+
+class DataSystem(_BaseNetworkComponent):
+    """Logs messages received from the server and plots drone data.
+
+    Attributes:
+        telemetry (str | Iterable[str] | None): Local telemetry addresses on
+            which drone status messages are received besides the reliable
+            stream: a `udp://host:port` datagram endpoint (port 0 picks an
+            ephemeral port) and/or `shm://name` rings, one per simulation
+            process.
+        scheduler (EventScheduler | None): Shared scheduler driving the plot
+            refreshes. The DataSystem runs its own real-time scheduler if
+            None.
+        target_fps (float): Maximum plot refresh rate in frames per second.
+            Refreshes are skipped when no drone status was applied since the
+            previous frame.
+        raster_cache (RasterCache): Cache of the derived static map layers.
+        tile_cache (TileCache): Cache of the decoded raster tiles displayed
+            at the current view.
+        coverage (CoverageAccumulator | None): Accumulator of the ground
+            cells covered by the fleet, updated every `coverage_interval`
+            seconds with the latest drone positions.
+        coverage_interval (float): Coverage update period in seconds.
+        renderer (HeadlessRenderer | None): Offscreen renderer used instead
+            of the interactive plot window, e.g. on machines without a
+            display. Snapshots are sent at the renderer frame rate.
+        color_by (str | None): Drone attribute mapped to the drone colors
+            (`speed`, `autonomy` or `altitude`). Drones use a single color
+            if None.
+        color_range (tuple[float, float]): Attribute values mapped to the
+            first and last colors.
+        mesh (MeshGraph | None): Radio range graph between drones, updated
+            every `mesh_interval` seconds with the latest drone positions.
+            Its links are drawn over the map.
+        mesh_interval (float): Mesh update period in seconds.
+        geofence (Geofence | None): Allowed airspace, checked every
+            `geofence_interval` seconds with the latest drone positions.
+            Drones that leave it are logged and its no-fly zones are drawn
+            over the map.
+        geofence_interval (float): Geofence check period in seconds.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        address: Optional[str] = None,
+        telemetry: Optional[str | Iterable[str]] = None,
+        scheduler: Optional[EventScheduler] = None,
+        target_fps: float = 30.0,
+        raster_cache: Optional[RasterCache] = None,
+        renderer: Optional[HeadlessRenderer] = None,
+        tile_cache: Optional[TileCache] = None,
+        coverage: Optional[CoverageAccumulator] = None,
+        coverage_interval: float = 0.1,
+        color_by: Optional[str] = None,
+        color_range: Optional[tuple[float, float]] = None,
+        mesh: Optional[MeshGraph] = None,
+        mesh_interval: float = 0.1,
+        geofence: Optional[Geofence] = None,
+        geofence_interval: float = 0.1,
+        shards: int = 1
+    ):
+        super().__init__(host, port, address, shards)
         self.drone_data: dict[str, Any] = {}
+        self.telemetry = telemetry
+        self.scheduler = scheduler
+        self.target_fps = target_fps
+
+        self._telemetry_version = 0
+        self.raster_cache = raster_cache or RasterCache()
+        self.renderer = renderer
+        self.tile_cache = (
+            tile_cache if tile_cache is not None else TileCache()
+        )
+        self.coverage = coverage
+        self.coverage_interval = coverage_interval
+
+        if color_by is not None and color_by not in COLOR_SCALES:
+            raise ValueError(
+                f"expected one of {', '.join(COLOR_SCALES)} color attribute"
+                + f" but got {color_by!r} instead"
+            )
+
+        self.color_by = color_by
+        self.color_range = (
+            color_range if color_range is not None
+            else COLOR_SCALES[color_by][1] if color_by is not None
+            else (0.0, 1.0)
+        )
+        self._color_lut: Optional[ColorLUT] = (
+            get_color_lut(COLOR_SCALES[color_by][0])
+            if color_by is not None else None
+        )
+        self.mesh = mesh
+        self.mesh_interval = mesh_interval
+        self.geofence = geofence
+        self.geofence_interval = geofence_interval
 
         self._logger = Logger(1, "[DataSystem]")
 
     async def run(self) -> None:
-        """Connect to the server and log messages."""
-        reader, writer = await asyncio.open_connection(self.host, self.port)
-        await ClientIdentificationMessage(
-            component="DataSystem",
-            writer=writer
-        ).send()
+        """Connect to every server shard and log messages."""
+        connections = await self.open_connections()
+
+        datagram_port = None
+        readers = []
+        for endpoint in parse_telemetry_addresses(self.telemetry):
+            telemetry_reader = create_telemetry_reader(
+                endpoint,
+                lambda message, _: self.update_drone_data(message)
+            )
+            await telemetry_reader.start()
+            readers.append(telemetry_reader)
+
+            if endpoint.scheme == "udp":
+                datagram_port = telemetry_reader.port
+
+        for _, writer in connections:
+            await ClientIdentificationMessage(
+                component="DataSystem",
+                writer=writer,
+                datagram_port=datagram_port
+            ).send()
+
+        scheduler = self.scheduler or EventScheduler()
+        scheduler_task = (
+            asyncio.create_task(scheduler.run())
+            if self.scheduler is None else None
+        )
 
-        # Start the plotting in a separate task
-        asyncio.create_task(self.start_plotting())
+        # Register the plotting refreshes in the scheduler
+        if self.renderer is not None:
+            refresh_event = self.start_rendering(scheduler)
+        else:
+            refresh_event = self.start_plotting(scheduler)
+
+        coverage_event = (
+            scheduler.call_every(self.coverage_interval,
+                                 self.update_coverage, scheduler)
+            if self.coverage is not None else None
+        )
+        mesh_event = (
+            scheduler.call_every(self.mesh_interval, self.update_mesh)
+            if self.mesh is not None else None
+        )
+        geofence_event = (
+            scheduler.call_every(self.geofence_interval,
+                                 self.update_geofence, scheduler)
+            if self.geofence is not None else None
+        )
 
         try:
-            while True:
-                message = await reader.readline()
+            await asyncio.gather(*(
+                self.receive_messages(reader) for reader, _ in connections
+            ))
 
-                if not message:
-                    break
+        except asyncio.CancelledError:
+            self._logger.log("DataSystem interrupted.", 1)
 
-                self._logger.log(f"Received: {message.decode().strip()}", 0)
+        finally:
+            refresh_event.cancel()
+            if coverage_event is not None:
+                coverage_event.cancel()
+            if mesh_event is not None:
+                mesh_event.cancel()
+            if geofence_event is not None:
+                geofence_event.cancel()
+            if scheduler_task is not None:
+                scheduler_task.cancel()
+
+            for telemetry_reader in readers:
+                telemetry_reader.close()
+
+            for _, writer in connections:
+                writer.close()
+
+            # Rendering the queued snapshots may take a while, so the worker
+            # is joined off the event loop:
+            if self.renderer is not None:
+                await asyncio.to_thread(self.renderer.close)
+
+    async def receive_messages(self, reader: asyncio.StreamReader) -> None:
+        """Log the messages of a server shard until it disconnects.
+
+        Args:
+            reader (asyncio.StreamReader): Stream of the server shard.
+        """
+        while True:
+            data = await reader.readline()
 
-                try:
-                    # Decode and parse the JSON message
-                    decoded_message = json.loads(message.decode().strip())
+            if not data:
+                break
 
-                    if decoded_message["type"] == "dstat":
-                        self._logger.log(f"Drone status: {decoded_message}", 0)
-                        self.update_drone_data(decoded_message)
+            message = data.decode().strip()
+            self._logger.log("Received: %s", 0, message)
 
-                except json.JSONDecodeError:
-                    self._logger.log("Received invalid JSON.", 2)
+            try:
+                # Decode and parse the JSON message
+                decoded_message = json.loads(message)
 
-        except asyncio.CancelledError:
-            self._logger.log("DataSystem interrupted.", 1)
+                if decoded_message["type"] == "dstat":
+                    self._logger.log(
+                        "Drone status: %s", 0, decoded_message)
+                    self.update_drone_data(decoded_message)
+
+            except json.JSONDecodeError:
+                self._logger.log("Received invalid JSON.", 2)
 
     def update_drone_data(self, message) -> None:
         """Update the drone data with the received message."""
@@ -76,136 +255,245 @@ class DataSystem(_BaseNetworkComponent):
             "speed": message["speed"],
             "autonomy": message["autonomy"],
         }
+        self._telemetry_version += 1
+
+    def update_coverage(self, scheduler: EventScheduler) -> None:
+        """Move the coverage footprints to the latest drone positions.
+
+        Args:
+            scheduler (EventScheduler): Scheduler providing the current time.
+        """
+        assert self.coverage is not None
+        x_data, y_data, _ = self.fleet_snapshot()
+        self.coverage.update(x_data, y_data, scheduler.now)
+
+        self._logger.log(
+            "Coverage: %.3f km2 and %.0f people now, %.3f km2 and %.0f "
+            + "people ever.",
+            0,
+            self.coverage.covered_area / 1e6,
+            self.coverage.covered_population,
+            self.coverage.ever_covered_area / 1e6,
+            self.coverage.ever_covered_population
+        )
 
-    async def start_plotting(self) -> None:
-        """Start the plotting loop with terrain and population density, and update drone positions dynamically."""
-
-        # Load Spain shapefile (for boundaries)
-        spain_shapefile = gpd.read_file(os.path.join(
-            os.path.dirname(__file__),
-            "data",
-            "ne_110m_admin_0_countries.shp"
-        ))
-        spain = spain_shapefile[spain_shapefile["ADMIN"] == "Spain"]
-        spain = spain.to_crs("EPSG:4326")  # Ensure matching CRS for the data
-
-        # Load the raster data for population density
-        file_path = os.path.join(
-            os.path.dirname(__file__),
-            "data",
-            "esp_pd_2020_1km.tif"
+    def update_mesh(self) -> None:
+        """Move the mesh drones to the latest drone positions."""
+        assert self.mesh is not None
+        x_data, y_data, _ = self.fleet_snapshot()
+        diff = self.mesh.update_geodetic(
+            x_data, y_data, self.fleet_attribute("altitude")
+        )
+
+        if diff:
+            component_count, _ = self.mesh.components()
+            self._logger.log(
+                "Mesh: %d links (%d added, %d removed), %d components.",
+                0,
+                len(self.mesh.links),
+                len(diff.added),
+                len(diff.removed),
+                component_count
+            )
+
+    def update_geofence(self, scheduler: EventScheduler) -> None:
+        """Check the latest drone positions against the geofence.
+
+        Args:
+            scheduler (EventScheduler): Scheduler providing the current time.
+        """
+        assert self.geofence is not None
+        x_data, y_data, _ = self.fleet_snapshot()
+        names = list(self.drone_data)
+
+        for event in self.geofence.update(
+            x_data, y_data, self.fleet_attribute("altitude"), scheduler.now
+        ):
+            self._logger.log(
+                "Geofence: %s %s %s zone %r.",
+                2 if event.violation else 1,
+                names[event.drone],
+                "entered" if event.entered else "left",
+                event.zone.kind,
+                event.zone.name
+            )
+
+    def fleet_links(self) -> Optional[np.ndarray]:
+        """Get the mesh links between known drones.
+
+        Returns:
+            np.ndarray | None: Drone index pairs with shape (N, 2), in the
+                order of `fleet_snapshot`, or None if there is no mesh.
+        """
+        return self.mesh.links if self.mesh is not None else None
+
+    def fleet_snapshot(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Get current drone longitudes, latitudes and speeds as arrays.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray]: Longitudes, latitudes
+                and speeds of every known drone.
+        """
+        count = len(self.drone_data)
+        x_data = np.fromiter(
+            (data["location"]["x"] for data in self.drone_data.values()),
+            float,
+            count
+        )
+        y_data = np.fromiter(
+            (data["location"]["y"] for data in self.drone_data.values()),
+            float,
+            count
         )
-        with rasterio.open(file_path) as dataset:
-            out_image, out_transform = mask(
-                dataset, [mapping(spain.geometry.iloc[0])], crop=True)
-            out_meta = dataset.meta
-
-        # Clamp the raster values to [0, inf)
-        out_image = np.clip(out_image, 0, None)
-
-        # Custom colormap (transparent to black with opacity)
-        colors = [(0, (1, 1, 1, 0)), (1, (242 / 255, 107 / 255, 10 / 255, 1))]
-        cmap_name = 'transparent_black'
-        cmap = LinearSegmentedColormap.from_list(cmap_name, colors, N=100)
-
-        # Plot the terrain and population density
-        with rasterio.open(os.path.join(
-            os.path.dirname(__file__),
-            "data",
-            "reprojected_terrain_view.tiff"
-        )) as terrain_dataset:
-            terrain_data = terrain_dataset.read([1, 2, 3])  # RGB bands
-            terrain_transform = terrain_dataset.transform
-
-        # Normalize reflectance to [0, 1]
-        terrain_data = np.clip(terrain_data, 0, 10000) / 10000
-        terrain_data = (terrain_data ** (1 / 1.5))  # Apply gamma correction
-        # Convert to 0-255 range for display
-        terrain_data = (terrain_data * 255).astype(np.uint8)
+        speeds = np.fromiter(
+            (data["speed"] for data in self.drone_data.values()),
+            float,
+            count
+        )
+
+        return x_data, y_data, speeds
+
+    def fleet_attribute(self, name: str) -> np.ndarray:
+        """Get an attribute of every known drone as an array.
+
+        Args:
+            name (str): Attribute name (`speed`, `autonomy` or `altitude`).
+
+        Returns:
+            np.ndarray: Attribute values, in the order of `fleet_snapshot`.
+        """
+        return np.fromiter(
+            (
+                data["location"]["z"] if name == "altitude" else data[name]
+                for data in self.drone_data.values()
+            ),
+            float,
+            len(self.drone_data)
+        )
+
+    def fleet_colors(self) -> Optional[np.ndarray]:
+        """Map the color attribute of every known drone to RGBA colors.
+
+        Returns:
+            np.ndarray | None: RGBA colors with shape (N, 4), in the order of
+                `fleet_snapshot`, or None if drones are not colored by an
+                attribute.
+        """
+        if self._color_lut is None or self.color_by is None:
+            return None
+
+        return self._color_lut(
+            self.fleet_attribute(self.color_by),
+            *self.color_range
+        )
+
+    def start_rendering(self, scheduler: EventScheduler) -> ScheduledEvent:
+        """Start the headless renderer and register its periodic snapshots.
+
+        Snapshots are only sent when new telemetry was applied since the
+        previous one, and are dropped by the renderer when it falls behind.
+
+        Args:
+            scheduler (EventScheduler): Scheduler driving the snapshots.
+
+        Returns:
+            ScheduledEvent: Periodic snapshot event.
+        """
+        assert self.renderer is not None
+        renderer = self.renderer
+        renderer.start()
+        rendered_version = -1
+
+        def snapshot() -> None:
+            nonlocal rendered_version
+
+            if rendered_version != self._telemetry_version:
+                rendered_version = self._telemetry_version
+                renderer.submit(FleetSnapshot(
+                    scheduler.now,
+                    *self.fleet_snapshot(),
+                    self.fleet_colors(),
+                    self.fleet_links()
+                ))
+
+        return scheduler.call_every(1 / renderer.fps, snapshot)
+
+    def start_plotting(self, scheduler: EventScheduler) -> ScheduledEvent:
+        """Set up the plot and register its periodic refresh.
+
+        Terrain and population density are read from the tiles visible at the
+        current view (again on every pan and zoom) and cached as the blit
+        background; drone positions are blitted on top at up to `target_fps`
+        frames per second, and only when new telemetry was applied since the
+        previous frame.
+
+        Args:
+            scheduler (EventScheduler): Scheduler driving the refreshes.
+
+        Returns:
+            ScheduledEvent: Periodic refresh event.
+        """
+
+        # Matplotlib is only imported by processes that open a plot window:
+        # pylint: disable=import-outside-toplevel
+        import matplotlib.pyplot as plt
+
+        from .plotting import (BlitManager, FleetOverlay, draw_color_scale,
+                               draw_static_layers, draw_zones)
+
+        # Load the derived static layers (cached after the first run)
+        layers = load_static_layers(self.raster_cache)
+
+        # Raster layers are read through pyramids, at the level of detail
+        # and extent of the current view
+        pyramids = load_layer_pyramids(layers, self.raster_cache,
+                                       self.tile_cache)
 
         # Set up the plot
         fig, ax = plt.subplots(1, 1)
+        images = draw_static_layers(ax, layers, pyramids)
+
+        view_manager = ViewManager(ax)
+        for name, pyramid in pyramids.items():
+            view_manager.add(images[name], pyramid)
 
-        # Plot the terrain data (static)
-        ax.imshow(np.transpose(terrain_data, (1, 2, 0)), extent=[
-            terrain_transform[2],
-            terrain_transform[2] + terrain_transform[0] *
-            terrain_data.shape[2],
-            terrain_transform[5] + terrain_transform[4] *
-            terrain_data.shape[1],
-            terrain_transform[5]
-        ], alpha=1, zorder=3)
-
-        # Plot population density (static)
-        pop_density_data = np.squeeze(out_image)  # Remove extra dimensions
-        ax.imshow(pop_density_data, cmap=cmap, extent=[
-            out_transform[2],
-            out_transform[2] + out_transform[0] * pop_density_data.shape[1],
-            out_transform[5] + out_transform[4] * pop_density_data.shape[0],
-            out_transform[5]
-        ], alpha=1, norm=Normalize(vmin=pop_density_data.min(), vmax=pop_density_data.max()), zorder=4)
-
-        # Plot the boundary of Spain (static)
-        spain.boundary.plot(ax=ax, edgecolor="black",
-                            facecolor=(0, 0, 0, .1), linewidth=1)
-
-        # Add a colorbar for population density
-        cbar = plt.colorbar(ax.imshow(pop_density_data, cmap=cmap),
-                            ax=ax, orientation="vertical", fraction=0.036, pad=0.04)
-        cbar.set_label("Population Density")
-
-        # Add title and labels
-        ax.set_title(
-            "Drone Positions on Terrain and Population Density", fontsize=14)
-        ax.set_xlabel("Longitude")
-        ax.set_ylabel("Latitude")
-
-        # Create a scatter plot for the drone positions (this will be updated dynamically)
-        sc = ax.scatter([], [], color=(237/255, 104/255, 95/255),
-                        label='Drones', s=10, zorder=5)
-
-        # Function to update both the position plot
+        if self.geofence is not None:
+            draw_zones(ax, self.geofence.zones)
+
+        # Drone positions, coverage and mesh links (updated in place
+        # dynamically)
+        overlay = FleetOverlay(ax)
+        if self._color_lut is not None and self.color_by is not None:
+            draw_color_scale(ax, self._color_lut.table, *self.color_range,
+                             label=f"Drone {self.color_by}")
 
         def update_plot() -> None:
-            x_data = [data["location"]["x"]
-                      for data in self.drone_data.values()]
-            y_data = [data["location"]["y"]
-                      for data in self.drone_data.values()]
-            speeds = [data["speed"] for data in self.drone_data.values()]
+            x_data, y_data, speeds = self.fleet_snapshot()
             self._logger.log(
-                f"Plotting drone positions: {x_data}, {y_data}", 0)
-            self._logger.log(f"Plotting speeds: {speeds}", 0)
-
-            if x_data and y_data:
-                # Update the scatter plot for drone positions
-                sc.set_offsets(list(zip(x_data, y_data)))
-
-                # Dynamically adjust the plot limits for positions
-
-                # ax.set_xlim(-0.5, -0.325)
-                # ax.set_ylim(39.40, 39.52)
-                # Plot circles around each drone position
-                for x, y in zip(x_data, y_data):
-                    circle_rad = radius_to_lat_lon_units(x, y, COVER_RADIUS)
-                    circle = plt.Circle(
-                        (x, y), circle_rad[0], color=(245/255, 182/255, 93/255, 0.05), fill=True, linestyle='--', linewidth=0.2, zorder=4)
-                    ax.add_patch(circle)
-
-            hardcoded_center = (-0.4, 39.48)
-            margin = 0.05  # Add a margin to the bounds
-            x_min, x_max = hardcoded_center[0] - \
-                margin, hardcoded_center[0] + margin
-            y_min, y_max = hardcoded_center[1] - \
-                margin, hardcoded_center[1] + margin
-
-            ax.set_xlim(x_min, x_max)
-            ax.set_ylim(y_min, y_max)
+                "Plotting drone positions: %s, %s", 0, x_data, y_data)
+            self._logger.log("Plotting speeds: %s", 0, speeds)
+
+            overlay.update(x_data, y_data, self.fleet_colors(),
+                           self.fleet_links())
+
+        # Static layers are rendered once and cached as the blit background
+        blit_manager = BlitManager(fig.canvas, overlay.artists)
+        plt.show(block=False)
+        rendered_version = -1
+
+        def refresh() -> None:
+            nonlocal rendered_version
+
+            # Skip frames when no new telemetry arrived:
+            if rendered_version != self._telemetry_version:
+                rendered_version = self._telemetry_version
+                update_plot()  # Update the drone positions dynamically
+                blit_manager.update()
+
+            fig.canvas.flush_events()  # Keep the window responsive
 
         # Plotting loop (dynamic updates)
-        while True:
-            update_plot()  # Update the drone positions dynamically
-            plt.pause(0.01)  # Non-blocking pause to refresh the plot
-            await asyncio.sleep(0.01)  # Async sleep for non-blocking behavior
+        return scheduler.call_every(1 / self.target_fps, refresh)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,249 @@
+"""Datagram telemetry channel module.
+
+This module provides an optional UDP channel for high-rate telemetry
+(`DroneStatusMessage`). Every datagram carries a sequence number so that
+receivers can discard out-of-order (stale) updates instead of waiting for
+them, which is what the reliable stream would do. Commands, identification
+and log messages are expected to keep using the reliable stream.
+
+Synthetic loss can be configured on the sending side so that the channel can
+be exercised entirely on loopback.
+
+Author:
+    Paulo Sanchez (@erlete)
+"""
+
+
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import struct
+from typing import Any, Callable, Dict, Optional, Tuple
+
+Address = Tuple[str, int]
+
+_HEADER = struct.Struct("!Q")  # Sequence number (unsigned 64-bit).
+
+
+class DatagramWriter:
+    """Sequenced datagram writer.
+
+    This class mimics the `write`/`drain` interface of `asyncio.StreamWriter`
+    so that existing message classes can be sent through it unchanged. Each
+    written payload is sent as a single datagram prefixed by a sequence
+    number. The transport must be connected to the destination.
+
+    Attributes:
+        remote (Address): Destination address.
+        loss_rate (float): Probability of dropping a datagram before sending
+            it (synthetic loss).
+        sent (int): Number of datagrams sent.
+        lost (int): Number of datagrams dropped by synthetic loss.
+    """
+
+    def __init__(
+        self,
+        transport: asyncio.DatagramTransport,
+        remote: Address,
+        loss_rate: float = 0.0,
+        seed: Optional[int] = None
+    ) -> None:
+        """Initialize a DatagramWriter instance.
+
+        Args:
+            transport (asyncio.DatagramTransport): Underlying transport.
+            remote (Address): Destination address.
+            loss_rate (float): Synthetic loss probability in [0, 1].
+            seed (int | None): Seed for the synthetic loss generator.
+        """
+        if not 0 <= loss_rate <= 1:
+            raise ValueError(
+                f"loss_rate must be in [0, 1] but got {loss_rate} instead"
+            )
+
+        self.remote = remote
+        self.loss_rate = loss_rate
+        self.sent = 0
+        self.lost = 0
+
+        self._transport = transport
+        self._sequence = 0
+        self._random = random.Random(seed)
+
+    def write(self, data: bytes) -> None:
+        """Send a payload as a single sequenced datagram.
+
+        Args:
+            data (bytes): Encoded payload.
+        """
+        self._sequence += 1
+
+        if self.loss_rate and self._random.random() < self.loss_rate:
+            self.lost += 1
+            return
+
+        self._transport.sendto(
+            _HEADER.pack(self._sequence) + data.rstrip(b"\n")
+        )
+        self.sent += 1
+
+    async def drain(self) -> None:
+        """Do nothing. Datagrams are never buffered for flow control."""
+
+    def close(self) -> None:
+        """Close the underlying transport."""
+        self._transport.close()
+
+    async def wait_closed(self) -> None:
+        """Do nothing. Provided for `asyncio.StreamWriter` compatibility."""
+
+
+class _TelemetryProtocol(asyncio.DatagramProtocol):
+    """Datagram protocol that discards stale and malformed updates.
+
+    Sequence numbers are tracked per sender address, so each sender has its
+    own ordering domain.
+
+    Attributes:
+        received (int): Number of datagrams accepted.
+        stale (int): Number of datagrams discarded for being out of order.
+        invalid (int): Number of malformed datagrams discarded.
+        lost (int): Number of sequence numbers skipped by accepted
+            datagrams. Datagrams that arrive late are counted as lost, then
+            as stale.
+    """
+
+    def __init__(self, callback: Callable[[dict, Address], Any]) -> None:
+        self.received = 0
+        self.stale = 0
+        self.invalid = 0
+        self.lost = 0
+
+        self._callback = callback
+        self._last_sequence: Dict[Address, int] = {}
+
+    def datagram_received(self, data: bytes, addr: Address) -> None:
+        """Validate sequence number and forward fresh messages."""
+        if len(data) <= _HEADER.size:
+            self.invalid += 1
+            return
+
+        (sequence,) = _HEADER.unpack_from(data)
+        if sequence <= self._last_sequence.get(addr, 0):
+            self.stale += 1
+            return
+
+        try:
+            message = json.loads(data[_HEADER.size:].decode())
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            self.invalid += 1
+            return
+
+        self.lost += sequence - self._last_sequence.get(addr, 0) - 1
+        self._last_sequence[addr] = sequence
+        self.received += 1
+        self._callback(message, addr)
+
+    def forget(self, addr: Address) -> None:
+        """Reset the ordering state of a sender (e.g. after a restart)."""
+        self._last_sequence.pop(addr, None)
+
+
+class TelemetryReceiver:
+    """Datagram telemetry receiver.
+
+    Fresh messages are handed to `callback`; out-of-order updates are
+    dropped, since a newer status supersedes any older one.
+
+    Attributes:
+        host (str): Local host address.
+        port (int): Local port number (resolved after `start` if 0).
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        callback: Callable[[dict, Address], Any]
+    ) -> None:
+        """Initialize a TelemetryReceiver instance.
+
+        Args:
+            host (str): Local host address.
+            port (int): Local port number. Use 0 for an ephemeral port.
+            callback (Callable[[dict, Address], Any]): Function called with
+                every fresh decoded message and its sender address.
+        """
+        self.host = host
+        self.port = port
+
+        self._protocol = _TelemetryProtocol(callback)
+        self._transport: Optional[asyncio.DatagramTransport] = None
+
+    @property
+    def received(self) -> int:
+        """Get number of accepted datagrams."""
+        return self._protocol.received
+
+    @property
+    def stale(self) -> int:
+        """Get number of datagrams discarded for being out of order."""
+        return self._protocol.stale
+
+    @property
+    def invalid(self) -> int:
+        """Get number of malformed datagrams discarded."""
+        return self._protocol.invalid
+
+    @property
+    def lost(self) -> int:
+        """Get number of datagrams missing from the sequences."""
+        return self._protocol.lost
+
+    async def start(self) -> None:
+        """Bind the local endpoint."""
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(
+            lambda: self._protocol,
+            local_addr=(self.host, self.port)
+        )
+        self.port = self._transport.get_extra_info("sockname")[1]
+
+    def close(self) -> None:
+        """Close the local endpoint."""
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+
+async def open_datagram_writer(
+    host: str,
+    port: int,
+    loss_rate: float = 0.0,
+    seed: Optional[int] = None
+) -> DatagramWriter:
+    """Open a sequenced datagram writer toward a remote endpoint.
+
+    Args:
+        host (str): Remote host address.
+        port (int): Remote port number.
+        loss_rate (float): Synthetic loss probability in [0, 1].
+        seed (int | None): Seed for the synthetic loss generator.
+
+    Returns:
+        DatagramWriter: Writer bound to the remote endpoint.
+    """
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        asyncio.DatagramProtocol,
+        remote_addr=(host, port)
+    )
+
+    return DatagramWriter(
+        transport,
+        transport.get_extra_info("peername"),
+        loss_rate,
+        seed
+    )
@@ -7,43 +7,178 @@ Author:
 
 import asyncio
 import json
+import math
 import random
-from typing import Optional, Tuple
+from typing import Any, Optional, Sequence, Tuple
 
+import numpy as np
+
+from ..modules.core.scheduler import EventScheduler
+from ..services.routing import RoutePlanner
 from .logger import Logger
 from .messages import (ClientIdentificationMessage, DroneStatusMessage,
                        LogMessage)
 from .network_component import _BaseNetworkComponent
-from .utils import geo_distance_to_m, predefined_route
+from .transport import open_telemetry_writer, parse_address
+from .utils import OPERATING_AREA_CENTER, LocalProjection, predefined_route
 
 
 class IndependentComponent(_BaseNetworkComponent):
-    """Simulates a drone moving toward a target."""
+    """Simulates a drone moving toward a target.
+
+    The drone is simulated in meters on a local East-North-Up plane and its
+    position is only converted to longitude and latitude at the boundary
+    (status messages and logs).
+
+    Attributes:
+        position (tuple[float, float]): Longitude and latitude of the drone.
+        target (tuple[float, float] | None): Longitude and latitude of the
+            current target.
+        projection (LocalProjection): Local plane of the operating area.
+        scheduler (EventScheduler | None): Shared scheduler driving the
+            movement ticks. The drone runs its own real-time scheduler if
+            None.
+        cruise_speed (float): Cruise speed in m/s.
+        telemetry (str | None): Telemetry address for status messages, either
+            the server's `udp://host:port` datagram endpoint or a DataSystem
+            `shm://name` ring. Status messages use the reliable stream if
+            None.
+        datagram_loss_rate (float): Synthetic loss probability applied to
+            telemetry datagrams.
+        planner (RoutePlanner | None): Planner of `moveto` routes. Drones fly
+            straight to `moveto` targets if None.
+    """
 
-    def __init__(self, id_: str, host: str, port: int, time_tick: float = 0.1, start_position: Tuple[float, float] = (-0.4, 39.4628)) -> None:
-        super().__init__(host, port)
+    ARRIVAL_DISTANCE = 10  # [m]
+
+    def __init__(
+        self,
+        id_: str,
+        host: str,
+        port: int,
+        time_tick: float = 0.1,
+        start_position: Tuple[float, float] = (-0.4, 39.4628),
+        address: Optional[str] = None,
+        telemetry: Optional[str] = None,
+        datagram_loss_rate: float = 0.0,
+        projection: Optional[LocalProjection] = None,
+        cruise_speed: float = 50.0,
+        scheduler: Optional[EventScheduler] = None,
+        planner: Optional[RoutePlanner] = None
+    ) -> None:
+        super().__init__(host, port, address)
 
         self.id = id_
+        self.telemetry = telemetry
+        self.datagram_loss_rate = datagram_loss_rate
         self.time_tick = time_tick
+        self.projection = projection or LocalProjection(*OPERATING_AREA_CENTER)
+        self.cruise_speed = cruise_speed
+        self.scheduler = scheduler
+        self.planner = planner
         self.position = start_position
-        self.target: Optional[Tuple[float, float]] = None
 
-        self.waypoints = [(start_position[0] + x * 0.005, start_position[1] + y * 0.005)
-                          for x, y in zip(predefined_route["x"], predefined_route["y"])]
-        self.target = self.waypoints.pop(0)
+        # Waypoints are projected in bulk, once:
+        east, north = self.projection.to_enu(
+            start_position[0] + np.asarray(predefined_route["x"]) * 0.005,
+            start_position[1] + np.asarray(predefined_route["y"]) * 0.005
+        )
+        self._waypoints_enu = list(zip(east.tolist(), north.tolist()))
+        self._target_enu: Optional[Tuple[float, float]] = (
+            self._waypoints_enu.pop(0)
+        )
 
         self._logger = Logger(1, f"[Drone ({self.id})]")
 
+    @property
+    def position(self) -> Tuple[float, float]:
+        """Get longitude and latitude of the drone.
+
+        Returns:
+            tuple[float, float]: Longitude and latitude of the drone.
+        """
+        longitude, latitude = self.projection.to_geodetic(*self._position_enu)
+        return float(longitude), float(latitude)
+
+    @position.setter
+    def position(self, value: Sequence[float]) -> None:
+        """Set longitude and latitude of the drone.
+
+        Args:
+            value (Sequence[float]): Longitude and latitude of the drone.
+        """
+        east, north = self.projection.to_enu(*value)
+        self._position_enu = (float(east), float(north))
+
+    @property
+    def target(self) -> Optional[Tuple[float, float]]:
+        """Get longitude and latitude of the current target.
+
+        Returns:
+            tuple[float, float] | None: Longitude and latitude of the target.
+        """
+        if self._target_enu is None:
+            return None
+
+        longitude, latitude = self.projection.to_geodetic(*self._target_enu)
+        return float(longitude), float(latitude)
+
+    @target.setter
+    def target(self, value: Optional[Sequence[float]]) -> None:
+        """Set longitude and latitude of the current target.
+
+        Args:
+            value (Sequence[float] | None): Longitude and latitude of the
+                target, or None to hover.
+        """
+        if value is None:
+            self._target_enu = None
+        else:
+            east, north = self.projection.to_enu(*value)
+            self._target_enu = (float(east), float(north))
+
+    @property
+    def waypoints(self) -> list[Tuple[float, float]]:
+        """Get longitude and latitude of the remaining waypoints.
+
+        Returns:
+            list[tuple[float, float]]: Remaining waypoints.
+        """
+        if not self._waypoints_enu:
+            return []
+
+        longitude, latitude = self.projection.to_geodetic(
+            *np.asarray(self._waypoints_enu).T
+        )
+        return list(zip(longitude.tolist(), latitude.tolist()))
+
     async def run(self) -> None:
         """Connect to the server and process commands."""
-        reader, writer = await asyncio.open_connection(self.host, self.port)
+        reader, writer = await self.open_connection()
 
         await ClientIdentificationMessage(
             component=f"Drone-{self.id}",
             writer=writer
         ).send()
 
-        asyncio.create_task(self.move(writer))
+        status_writer = writer
+        if self.telemetry is not None:
+            status_writer = await open_telemetry_writer(
+                parse_address(self.telemetry),
+                self.datagram_loss_rate
+            )
+
+        scheduler = self.scheduler or EventScheduler()
+        scheduler_task = (
+            asyncio.create_task(scheduler.run())
+            if self.scheduler is None else None
+        )
+        move_event = scheduler.call_every(
+            self.time_tick,
+            self.move,
+            writer,
+            status_writer
+        )
 
         try:
             while True:
@@ -65,65 +200,125 @@ class IndependentComponent(_BaseNetworkComponent):
                     and decoded_message.get("target") in (self.id, "all")
                     and decoded_message.get("command") == "moveto"
                 ):
-                    self.target = decoded_message.get("args")
+                    await self.route_to(
+                        decoded_message.get("args"),
+                        shared=decoded_message.get("target") == "all"
+                    )
 
         except asyncio.CancelledError:
             self._logger.log("Drone connection interrupted.", 2)
 
         finally:
+            move_event.cancel()
+            if scheduler_task is not None:
+                scheduler_task.cancel()
+
+            if status_writer is not writer:
+                status_writer.close()
+
             writer.close()
             await writer.wait_closed()
 
-    async def move(self, writer: asyncio.StreamWriter) -> None:
-        """Simulate movement toward the target."""
-        while True:
-
-            await DroneStatusMessage(
-                component=f"Drone-{self.id}",
-                location={
-                    "x": self.position[0],
-                    "y": self.position[1],
-                    "z": 0.0
-                },
-                orientation={
-                    "roll": 0.0,
-                    "pitch": 0.0,
-                    "yaw": 0.0
-                },
-                speed=random.random() * 10,
-                autonomy=100 - random.random() * 10,
-                writer=writer
-            ).send()
-
-            if self.target:
-                tx, ty = self.target
-                x, y = self.position
-                dx, dy = tx - x, ty - y
-                distance = geo_distance_to_m(x, y, tx, ty)
-
-                print(
-                    f"{tx = }, {ty = }, {x = }, {y = }, {dx = }, {dy = }, {distance = }")
-
-                if distance < 10:  # 10 m offset
-                    self.position = self.target
-                    self.target = self.waypoints.pop(
-                        0) if self.waypoints else None
-
-                    await LogMessage(
-                        component=f"Drone-{self.id}",
-                        message=f"Reached {self.position}",
-                        writer=writer
-                    ).send()
-                else:
-                    step = self.time_tick * 50
-                    print(f"{step = }")
-                    self.position = (
-                        x + step * dx / distance,
-                        y + step * dy / distance
-                    )
-                    print(f"{self.position = }")
+    async def route_to(
+        self,
+        target: Sequence[float],
+        shared: bool = False
+    ) -> None:
+        """Head to a target, along a planned route if there is a planner.
+
+        The planned waypoints are flown before the remaining waypoints.
+        Routes are planned in the default executor, as long searches would
+        otherwise stall the event loop shared with the other drones.
+
+        Args:
+            target (Sequence[float]): Longitude and latitude of the target.
+            shared (bool): Whether the target was sent to the whole fleet, in
+                which case drones sharing the planner extract their routes
+                from a single distance field of the target.
+        """
+        longitude, latitude = target
+        if self.planner is None:
+            self.target = (longitude, latitude)
+            return
+
+        try:
+            route = (await asyncio.get_running_loop().run_in_executor(
+                None, self.planner.plan, self.position, target, shared
+            ))[1:]
+        except ValueError as error:
+            self._logger.log("Flying straight to %s: %s", 2, target, error)
+            self.target = (longitude, latitude)
+            return
+
+        east, north = self.projection.to_enu(*np.asarray(route).T)
+        waypoints = list(zip(east.tolist(), north.tolist()))
+        self._target_enu = waypoints.pop(0)
+        self._waypoints_enu[:0] = waypoints
+
+    async def move(
+        self,
+        writer: asyncio.StreamWriter,
+        status_writer: Any = None
+    ) -> None:
+        """Simulate one tick of movement toward the target.
 
-            await asyncio.sleep(self.time_tick)
+        Args:
+            writer (asyncio.StreamWriter): Reliable stream writer.
+            status_writer (Any): Writer used for status messages. Defaults to
+                the reliable stream writer.
+        """
+        status_writer = status_writer or writer
+
+        longitude, latitude = self.position
+        await DroneStatusMessage(
+            component=f"Drone-{self.id}",
+            location={
+                "x": longitude,
+                "y": latitude,
+                "z": 0.0
+            },
+            orientation={
+                "roll": 0.0,
+                "pitch": 0.0,
+                "yaw": 0.0
+            },
+            speed=random.random() * 10,
+            autonomy=100 - random.random() * 10,
+            writer=status_writer
+        ).send()
+
+        if self._target_enu is not None:
+            tx, ty = self._target_enu
+            x, y = self._position_enu
+            dx, dy = tx - x, ty - y
+            distance = math.hypot(dx, dy)
+
+            self._logger.log(
+                "tx = %s, ty = %s, x = %s, y = %s, dx = %s, dy = %s,"
+                + " distance = %s",
+                0, tx, ty, x, y, dx, dy, distance
+            )
+
+            if distance < self.ARRIVAL_DISTANCE:
+                self._position_enu = self._target_enu
+                self._target_enu = (
+                    self._waypoints_enu.pop(0)
+                    if self._waypoints_enu else None
+                )
+
+                await LogMessage(
+                    component=f"Drone-{self.id}",
+                    message=f"Reached {self.position}",
+                    writer=writer
+                ).send()
+            else:
+                step = min(self.cruise_speed * self.time_tick, distance)
+                self._logger.log("step = %s", 0, step)
+                self._position_enu = (
+                    x + step * dx / distance,
+                    y + step * dy / distance
+                )
+                self._logger.log("position = %s", 0, self._position_enu)
 
 
 if __name__ == "__main__":
@@ -1,31 +1,95 @@
 """Logger module.
 
+Log calls only enqueue a raw record after a level check. Message formatting,
+timestamp rendering and I/O happen in a background writer thread that drains
+the queue in batches and flushes every sink once per batch, so logging never
+blocks the event loop.
+
+Messages can be formatted lazily, either with `%`-style arguments or with a
+callable that returns the message:
+
+    logger.log("Client %s says %s", 0, client_name, message)
+    logger.log(lambda: expensive_summary(), 0)
+
 Author:
     Paulo Sanchez (@erlete)
 """
 
 
+from __future__ import annotations
+
+import atexit
 import datetime
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Any, Callable, Iterable, NamedTuple, Optional, TextIO
 
 from colorama import Fore, Style, init
 
 init(autoreset=True)
 
+LEVELS = {
+    0: 'DEBUG',
+    1: 'INFO',
+    2: 'WARNING',
+    3: 'ERROR'
+}
 
-class Logger:
-    """Logger class.
+
+class LogRecord(NamedTuple):
+    """Raw log record, formatted by the writer thread.
 
     Attributes:
-        level (int): The logging level.
-        prefix (str): The prefix to add to each log message.
+        timestamp (float): UNIX timestamp of the log call.
+        level (int): Log level.
+        prefix (str): Logger prefix.
+        message (str | Callable[[], str]): Message, format string or callable
+            returning the message.
+        args (tuple): Arguments for `%`-style formatting of the message.
     """
 
-    _LEVELS = {
-        0: 'DEBUG',
-        1: 'INFO',
-        2: 'WARNING',
-        3: 'ERROR'
-    }
+    timestamp: float
+    level: int
+    prefix: str
+    message: str | Callable[[], str]
+    args: tuple
+
+    @property
+    def level_name(self) -> str:
+        """Get level name.
+
+        Returns:
+            str: Level name.
+        """
+        return LEVELS.get(self.level, 'LOG')
+
+    def render(self) -> str:
+        """Render the message text.
+
+        Returns:
+            str: Formatted message.
+        """
+        message = self.message() if callable(self.message) else self.message
+
+        if self.args:
+            try:
+                return str(message) % self.args
+            except (TypeError, ValueError):
+                return " ".join(map(str, (message, *self.args)))
+
+        return str(message)
+
+
+class ConsoleSink:
+    """Colored console sink.
+
+    Attributes:
+        stream (TextIO): Output stream.
+    """
 
     _COLORS = {
         'DEBUG': Fore.BLUE,
@@ -34,19 +98,321 @@ class Logger:
         'ERROR': Fore.RED + Style.BRIGHT,
     }
 
+    def __init__(self, stream: Optional[TextIO] = None) -> None:
+        """Initialize a ConsoleSink instance.
+
+        Args:
+            stream (TextIO | None): Output stream. Defaults to standard output.
+        """
+        self.stream = stream or sys.stdout
+
+    def write(self, records: list[LogRecord]) -> None:
+        """Write a batch of records.
+
+        Args:
+            records (list[LogRecord]): Records to write.
+        """
+        lines = []
+        for record in records:
+            color = self._COLORS.get(record.level_name, Fore.WHITE)
+            timestamp = datetime.datetime.fromtimestamp(
+                record.timestamp
+            ).strftime('%Y-%m-%d %H:%M:%S')
+            timestamp = f"{Style.DIM}({timestamp}){Style.NORMAL}"
+            lines.append(
+                f"{color}{timestamp}{color} "
+                + f"{record.prefix} [{record.level_name}] "
+                + f"{record.render()}{Style.RESET_ALL}\n"
+            )
+
+        self.stream.write("".join(lines))
+
+    def flush(self) -> None:
+        """Flush the output stream."""
+        self.stream.flush()
+
+    def close(self) -> None:
+        """Flush the output stream. Standard streams are never closed.
+
+        Streams closed by someone else (e.g. a test runner capturing the
+        output) are left alone.
+        """
+        if not self.stream.closed:
+            self.flush()
+
+
+class JsonlSink:
+    """Structured JSON Lines file sink with size-based rotation.
+
+    When the current file exceeds `max_bytes`, it is renamed to `<path>.1`,
+    previous backups are shifted (`<path>.1` to `<path>.2`, and so on) and
+    the oldest one beyond `backup_count` is discarded.
+
+    Attributes:
+        path (str): Log file path.
+        max_bytes (int): Size threshold for rotation. Rotation is disabled if
+            0.
+        backup_count (int): Number of rotated files to keep.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 5
+    ) -> None:
+        """Initialize a JsonlSink instance.
+
+        Args:
+            path (str): Log file path.
+            max_bytes (int): Size threshold for rotation in bytes.
+            backup_count (int): Number of rotated files to keep.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # The file stays open for the lifetime of the sink, until `close`:
+        self._file = open(  # pylint: disable=consider-using-with
+            path, "a", encoding="utf-8"
+        )
+        self._size = self._file.tell()
+
+    def write(self, records: list[LogRecord]) -> None:
+        """Write a batch of records.
+
+        Args:
+            records (list[LogRecord]): Records to write.
+        """
+        for record in records:
+            line = json.dumps({
+                "timestamp": record.timestamp,
+                "level": record.level_name,
+                "component": record.prefix,
+                "message": record.render()
+            }) + "\n"
+
+            if self.max_bytes and self._size + len(line) > self.max_bytes:
+                self._rotate()
+
+            self._file.write(line)
+            self._size += len(line)
+
+    def flush(self) -> None:
+        """Flush the log file."""
+        self._file.flush()
+
+    def close(self) -> None:
+        """Close the log file."""
+        self._file.close()
+
+    def _rotate(self) -> None:
+        self._file.close()
+
+        if self.backup_count:
+            for index in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+        self._file = open(  # pylint: disable=consider-using-with
+            self.path, "a", encoding="utf-8"
+        )
+        self._size = 0
+
+
+class LogPipeline:
+    """Background log writer.
+
+    Records are queued by any thread and consumed by a single daemon thread,
+    which formats them and writes them to every sink in batches of up to
+    `batch_size` records.
+
+    Attributes:
+        sinks (list): Output sinks. Each sink provides `write(records)`,
+            `flush()` and `close()`.
+        batch_size (int): Maximum number of records per batch.
+    """
+
+    _STOP = None
+
+    def __init__(
+        self,
+        sinks: Optional[Iterable[Any]] = None,
+        batch_size: int = 256
+    ) -> None:
+        """Initialize a LogPipeline instance.
+
+        Args:
+            sinks (Iterable | None): Output sinks. Defaults to a console sink.
+            batch_size (int): Maximum number of records per batch.
+        """
+        self.sinks = list(sinks) if sinks is not None else [ConsoleSink()]
+        self.batch_size = batch_size
+
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, record: LogRecord) -> None:
+        """Queue a record for writing.
+
+        Args:
+            record (LogRecord): Record to write.
+        """
+        if self._thread is None:
+            self._start()
+
+        self._queue.put(record)
+
+    def flush(self) -> None:
+        """Block until every queued record has been written."""
+        if self._thread is None:
+            return
+
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self) -> None:
+        """Write pending records, stop the writer thread and close sinks."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+
+        if thread is not None:
+            self._queue.put(self._STOP)
+            thread.join()
+
+        for sink in self.sinks:
+            sink.close()
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name="LogPipeline",
+                    daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        running = True
+
+        while running:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            records = []
+            events = []
+            for item in batch:
+                if item is self._STOP:
+                    running = False
+                elif isinstance(item, threading.Event):
+                    events.append(item)
+                else:
+                    records.append(item)
+
+            if records:
+                for sink in self.sinks:
+                    try:
+                        sink.write(records)
+                        sink.flush()
+                    except Exception as exc:  # pylint: disable=broad-except
+                        sys.stderr.write(f"Log sink failure: {exc!r}\n")
+
+            for event in events:
+                event.set()
+
+
+_pipeline = LogPipeline()
+
+
+def _close_pipeline() -> None:
+    # The pipeline is looked up at exit, since `configure_logging` may have
+    # replaced it:
+    _pipeline.close()
+
+
+atexit.register(_close_pipeline)
+
+
+def configure_logging(
+    sinks: Iterable[Any],
+    batch_size: int = 256
+) -> LogPipeline:
+    """Replace the shared log pipeline.
+
+    Pending records of the previous pipeline are written before it is closed.
+
+    Args:
+        sinks (Iterable): Output sinks (e.g. `ConsoleSink`, `JsonlSink`).
+        batch_size (int): Maximum number of records per batch.
+
+    Returns:
+        LogPipeline: New shared pipeline.
+    """
+    global _pipeline  # pylint: disable=global-statement
+
+    previous, _pipeline = _pipeline, LogPipeline(sinks, batch_size)
+    previous.close()
+
+    return _pipeline
+
+
+class Logger:
+    """Logger class.
+
+    Attributes:
+        level (int): The logging level.
+        prefix (str): The prefix to add to each log message.
+    """
+
+    _LEVELS = LEVELS
+
     def __init__(self, level, prefix) -> None:
         self.level = level
         self.prefix = prefix
 
-    def log(self, message, level) -> None:
-        """Log a message to console."""
+    def is_enabled(self, level: int) -> bool:
+        """Check whether messages of a given level are logged.
+
+        Args:
+            level (int): Log level.
+
+        Returns:
+            bool: True if messages of the level are logged.
+        """
+        return level >= self.level
+
+    def log(self, message, level, *args) -> None:
+        """Log a message.
+
+        The message is only formatted if its level is enabled, and then in the
+        background writer thread. Arguments must not be mutated after the
+        call.
+
+        Args:
+            message (str | Callable[[], str]): Message, `%`-style format
+                string or callable returning the message.
+            level (int): Log level.
+            *args: Arguments for `%`-style formatting.
+        """
         if level >= self.level:
-            level_name = self._LEVELS.get(level, 'LOG')
-            color = self._COLORS.get(level_name, Fore.WHITE)
-            timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            timestamp = f"{Style.DIM}({timestamp}){Style.NORMAL}"
-            print(
-                f"{color}{timestamp}{color} "
-                + f"{self.prefix} [{level_name}] "
-                + f"{message}{Style.RESET_ALL}"
+            _pipeline.submit(
+                LogRecord(time.time(), level, self.prefix, message, args)
             )
+
+    @staticmethod
+    def flush() -> None:
+        """Block until every queued message has been written."""
+        _pipeline.flush()
@@ -9,7 +9,7 @@ from __future__ import annotations
 
 import asyncio
 import json
-from typing import Any
+from typing import Any, Optional
 
 
 class _BaseMessage:
@@ -150,11 +150,14 @@ class ClientIdentificationMessage(_BaseMessage):
 
     Attributes:
         component (str): Component name.
+        datagram_port (int | None): Local port on which the component accepts
+            datagram telemetry, if any.
 
     Example:
         {
             'type': 'cid',
-            'component': 'Drone-1'
+            'component': 'DataSystem',
+            'datagram_port': 9999
         }
     """
 
@@ -163,10 +166,12 @@ class ClientIdentificationMessage(_BaseMessage):
     def __init__(
         self,
         component: str,
-        writer: asyncio.StreamWriter
+        writer: asyncio.StreamWriter,
+        datagram_port: Optional[int] = None
     ) -> None:
         super().__init__(writer)
         self.component = component
+        self.datagram_port = datagram_port
 
 
 class DroneStatusMessage(_BaseMessage):
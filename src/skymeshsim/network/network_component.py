@@ -6,6 +6,10 @@ Author:
 
 
 import asyncio
+from typing import List, Optional, Tuple
+
+from .transport import (STREAM_SCHEMES, ClientCallback, open_connection,
+                        parse_address, start_server)
 
 
 class _BaseNetworkComponent:
@@ -14,12 +18,66 @@ class _BaseNetworkComponent:
     Attributes:
         host (str): Host address.
         port (int): Port number.
+        endpoint (Endpoint): Stream endpoint used to reach the server.
+        endpoints (list[Endpoint]): Stream endpoints of every server shard,
+            starting with `endpoint`.
     """
 
-    def __init__(self, host: str, port: int) -> None:
-        """Initialize a NetworkComponent instance."""
-        self.host = host
-        self.port = port
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        address: Optional[str] = None,
+        shards: int = 1
+    ) -> None:
+        """Initialize a NetworkComponent instance.
+
+        Args:
+            host (str): Host address.
+            port (int): Port number.
+            address (str | None): URL-style stream address (`tcp://host:port`
+                or `unix:///path`). Overrides `host` and `port` if given.
+            shards (int): Number of server shards, listening on consecutive
+                TCP ports from the server endpoint.
+        """
+        self.endpoint = parse_address(address or f"tcp://{host}:{port}")
+        if self.endpoint.scheme not in STREAM_SCHEMES:
+            raise ValueError(f"{self.endpoint} is not a stream address")
+
+        if shards < 1 or (shards > 1 and self.endpoint.scheme != "tcp"):
+            raise ValueError(
+                "expected one server shard or several on a tcp endpoint but"
+                + f" got {shards} on {self.endpoint} instead"
+            )
+
+        self.host = self.endpoint.host or host
+        self.port = self.endpoint.port or port
+        self.endpoints = [
+            self.endpoint._replace(port=self.endpoint.port + shard)
+            if shard else self.endpoint
+            for shard in range(shards)
+        ]
+
+    async def open_connection(
+        self
+    ) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """Open a stream connection to the server endpoint."""
+        return await open_connection(self.endpoint)
+
+    async def open_connections(
+        self
+    ) -> List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]:
+        """Open a stream connection to every server shard."""
+        return [
+            await open_connection(endpoint) for endpoint in self.endpoints
+        ]
+
+    async def start_server(
+        self,
+        callback: ClientCallback
+    ) -> asyncio.AbstractServer:
+        """Start listening on the server endpoint."""
+        return await start_server(callback, self.endpoint)
 
 
 class _NetworkInputReader:
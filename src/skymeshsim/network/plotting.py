@@ -0,0 +1,333 @@
+"""Plotting utilities module.
+
+This module contains the dynamic map artists used to display the drone fleet.
+Every artist is created once and updated in place, so the cost of a redraw
+depends on the current fleet size only, not on how long the viewer has been
+running. Static layers are rendered once to a cached background on which the
+dynamic artists are blitted.
+
+None of the helpers depend on `pyplot`, so they can be used with any figure,
+including offscreen `Agg` figures in worker processes.
+
+Author:
+    Paulo Sanchez (@erlete)
+"""
+
+
+from __future__ import annotations
+
+from typing import Any, Optional
+
+import numpy as np
+from matplotlib.collections import EllipseCollection, LineCollection
+from matplotlib.cm import ScalarMappable
+from matplotlib.colors import (LinearSegmentedColormap, ListedColormap,
+                               Normalize)
+
+from .utils import (COVER_RADIUS, OPERATING_AREA_CENTER,
+                    radius_to_lat_lon_units)
+
+DRONE_COLOR = (237 / 255, 104 / 255, 95 / 255)
+COVERAGE_COLOR = (245 / 255, 182 / 255, 93 / 255, 0.05)
+LINK_COLOR = (60 / 255, 90 / 255, 160 / 255, 0.6)
+NO_FLY_COLOR = (200 / 255, 30 / 255, 45 / 255)
+
+# Custom colormap (transparent to black with opacity)
+POPULATION_CMAP = LinearSegmentedColormap.from_list(
+    'transparent_black',
+    [(0, (1, 1, 1, 0)), (1, (242 / 255, 107 / 255, 10 / 255, 1))],
+    N=100
+)
+
+
+def draw_static_layers(
+    ax: Any,
+    layers: dict[str, Any],
+    pyramids: Optional[dict[str, Any]] = None,
+    margin: float = 0.05
+) -> dict[str, Any]:
+    """Draw the static map layers and center the view on the operating area.
+
+    Args:
+        ax (Any): Matplotlib axes.
+        layers (dict[str, Any]): Layers returned by `load_static_layers`.
+        pyramids (dict[str, RasterPyramid] | None): Pyramids of the raster
+            layers. Layers with a pyramid are displayed through a
+            `ViewManager`, which only reads the visible tiles, instead of
+            being drawn in full.
+        margin (float): Half size of the initial view in degrees.
+
+    Returns:
+        dict[str, Any]: Raster layer images by layer name.
+    """
+    pyramids = pyramids or {}
+    images = {}
+
+    def raster(name: str) -> np.ndarray:
+        # Placeholder until the view manager reads the visible tiles:
+        if name in pyramids:
+            return np.zeros((1, 1) + layers[name].shape[2:],
+                            dtype=layers[name].dtype)
+
+        return layers[name]
+
+    # Plot the terrain data (static)
+    if "terrain" in layers:
+        images["terrain"] = ax.imshow(
+            raster("terrain"), extent=layers["terrain_extent"], alpha=1,
+            zorder=3)
+
+    # Plot population density (static)
+    images["population"] = ax.imshow(
+        raster("population"), cmap=POPULATION_CMAP,
+        extent=layers["population_extent"], alpha=1,
+        norm=Normalize(*layers["population_range"]), zorder=4)
+
+    # Plot the boundary of Spain (static)
+    ax.plot(layers["boundary"][:, 0], layers["boundary"][:, 1],
+            color="black", linewidth=1)
+
+    # Add a colorbar for population density
+    cbar = ax.figure.colorbar(images["population"], ax=ax,
+                              orientation="vertical", fraction=0.036,
+                              pad=0.04)
+    cbar.set_label("Population Density")
+
+    # Add title and labels
+    ax.set_title(
+        "Drone Positions on Terrain and Population Density", fontsize=14)
+    ax.set_xlabel("Longitude")
+    ax.set_ylabel("Latitude")
+
+    # View centered on the operating area
+    ax.set_xlim(OPERATING_AREA_CENTER[0] - margin,
+                OPERATING_AREA_CENTER[0] + margin)
+    ax.set_ylim(OPERATING_AREA_CENTER[1] - margin,
+                OPERATING_AREA_CENTER[1] + margin)
+
+    return images
+
+
+def draw_zones(ax: Any, zones: list[Any]) -> Optional[Any]:
+    """Draw the outlines of the no-fly zones of a geofence.
+
+    Args:
+        ax (Any): Matplotlib axes.
+        zones (list[Zone]): Geofence zones. Allowed zones are skipped, as
+            the country boundary is already drawn.
+
+    Returns:
+        LineCollection | None: Zone outlines, if there are no-fly zones.
+    """
+    outlines = [
+        np.asarray(ring.coords)[:, :2]
+        for zone in zones if zone.kind == "no-fly"
+        for polygon in getattr(zone.geometry, "geoms", [zone.geometry])
+        for ring in (polygon.exterior, *polygon.interiors)
+    ]
+    if not outlines:
+        return None
+
+    collection = LineCollection(outlines, colors=[NO_FLY_COLOR],
+                                linewidths=0.8, linestyles="--", zorder=4)
+    ax.add_collection(collection, autolim=False)
+
+    return collection
+
+
+def draw_color_scale(
+    ax: Any,
+    table: np.ndarray,
+    vmin: float,
+    vmax: float,
+    label: str
+) -> Any:
+    """Draw the color scale of a per-drone attribute.
+
+    Args:
+        ax (Any): Matplotlib axes.
+        table (np.ndarray): RGBA lookup table of the attribute colors.
+        vmin (float): Value of the first color.
+        vmax (float): Value of the last color.
+        label (str): Color scale label.
+
+    Returns:
+        Any: Matplotlib colorbar.
+    """
+    scale = ax.figure.colorbar(
+        ScalarMappable(Normalize(vmin, vmax), ListedColormap(table)),
+        ax=ax, orientation="vertical", fraction=0.036, pad=0.04)
+    scale.set_label(label)
+
+    return scale
+
+
+class FleetOverlay:
+    """Drone positions and coverage areas drawn over a map.
+
+    Drone positions are a single scatter collection, coverage areas a
+    single ellipse collection, sized in data units from the cover radius,
+    and mesh links a single line collection. All of them are updated in
+    place on every frame.
+
+    Attributes:
+        ax (Any): Matplotlib axes.
+        cover_radius (float): Coverage radius in meters.
+        scatter (Any): Drone positions collection.
+        coverage (EllipseCollection): Coverage areas collection.
+        links (LineCollection): Mesh links collection.
+    """
+
+    def __init__(self, ax: Any, cover_radius: float = COVER_RADIUS) -> None:
+        """Initialize a FleetOverlay instance.
+
+        Args:
+            ax (Any): Matplotlib axes.
+            cover_radius (float): Coverage radius in meters.
+        """
+        self.ax = ax
+        self.cover_radius = cover_radius
+
+        self.scatter = ax.scatter([], [], color=DRONE_COLOR, label='Drones',
+                                  s=10, zorder=5)
+        self.coverage = EllipseCollection(
+            widths=[],
+            heights=[],
+            angles=[],
+            units="xy",
+            offsets=np.empty((0, 2)),
+            offset_transform=ax.transData,
+            facecolors=[COVERAGE_COLOR],
+            edgecolors=[COVERAGE_COLOR],
+            linestyle='--',
+            linewidths=0.2,
+            zorder=4
+        )
+        ax.add_collection(self.coverage, autolim=False)
+
+        self.links = LineCollection([], colors=[LINK_COLOR],
+                                    linewidths=0.5, zorder=5)
+        ax.add_collection(self.links, autolim=False)
+
+    @property
+    def artists(self) -> tuple[Any, ...]:
+        """Get the dynamic artists of the overlay.
+
+        Returns:
+            tuple[Any, ...]: Dynamic artists.
+        """
+        return self.coverage, self.links, self.scatter
+
+    def update(
+        self,
+        longitude: np.ndarray,
+        latitude: np.ndarray,
+        colors: Optional[np.ndarray] = None,
+        links: Optional[np.ndarray] = None
+    ) -> None:
+        """Move the overlay to the current fleet positions.
+
+        Args:
+            longitude (np.ndarray): Drone longitudes.
+            latitude (np.ndarray): Drone latitudes.
+            colors (np.ndarray | None): RGBA colors of the drones, with shape
+                (N, 4). Drones keep their current colors if None.
+            links (np.ndarray | None): Drone index pairs of the mesh links,
+                with shape (M, 2). Links to unknown drones are ignored. No
+                links are drawn if None.
+        """
+        offsets = np.column_stack((longitude, latitude))
+        if colors is not None:
+            self.scatter.set_color(colors)
+
+        if links is None:
+            self.links.set_segments([])
+        else:
+            links = links[np.all(links < len(offsets), axis=1)]
+            self.links.set_segments(offsets[links])
+
+        delta_lat, delta_lon = radius_to_lat_lon_units(
+            latitude,
+            longitude,
+            self.cover_radius
+        )
+
+        self.scatter.set_offsets(offsets)
+        self.coverage.set_offsets(offsets)
+        self.coverage.set_widths(
+            np.broadcast_to(2 * delta_lon, len(offsets))
+        )
+        self.coverage.set_heights(
+            np.broadcast_to(2 * delta_lat, len(offsets))
+        )
+        self.coverage.set_angles(np.zeros(len(offsets)))
+
+
+class BlitManager:
+    """Blitting helper for figures with static and dynamic artists.
+
+    Static content is rendered by a full draw and cached as a background
+    whenever the canvas is drawn (initial show, resize, pan, zoom). Frames
+    then only restore that background and redraw the dynamic artists. Canvases
+    that do not support blitting fall back to full redraws.
+
+    Attributes:
+        canvas (Any): Matplotlib figure canvas.
+        artists (list[Any]): Dynamic artists.
+        frames (int): Number of frames rendered.
+    """
+
+    def __init__(self, canvas: Any, artists: tuple[Any, ...]) -> None:
+        """Initialize a BlitManager instance.
+
+        Args:
+            canvas (Any): Matplotlib figure canvas.
+            artists (tuple[Any, ...]): Dynamic artists. They are marked as
+                animated, so full draws leave them out of the background.
+        """
+        self.canvas = canvas
+        self.artists = list(artists)
+        self.frames = 0
+
+        self._background = None
+        for artist in self.artists:
+            artist.set_animated(True)
+
+        self._callback_id = canvas.mpl_connect("draw_event", self._on_draw)
+
+    def update(self) -> None:
+        """Render a frame with the current state of the dynamic artists."""
+        figure = self.canvas.figure
+
+        if not getattr(self.canvas, "supports_blit", False):
+            for artist in self.artists:
+                artist.set_animated(False)
+            self.canvas.draw_idle()
+
+        elif self._background is None:
+            # Full draw, which captures the background via draw_event:
+            self.canvas.draw()
+
+        else:
+            self.canvas.restore_region(self._background)
+            self._draw_artists()
+            self.canvas.blit(figure.bbox)
+
+        self.frames += 1
+
+    def disconnect(self) -> None:
+        """Stop tracking canvas redraws."""
+        self.canvas.mpl_disconnect(self._callback_id)
+
+    def _on_draw(self, _: Any) -> None:
+        if not getattr(self.canvas, "supports_blit", False):
+            return
+
+        self._background = self.canvas.copy_from_bbox(
+            self.canvas.figure.bbox
+        )
+        self._draw_artists()
+
+    def _draw_artists(self) -> None:
+        for artist in self.artists:
+            self.canvas.figure.draw_artist(artist)
@@ -0,0 +1,442 @@
+"""Raster preprocessing cache module.
+
+Deriving the static map layers (population masked against the Spain polygon,
+display-ready terrain, country boundary) requires reading a shapefile and two
+rasters and processing them in full. This module stores the derived arrays as
+`.npy` files that are memory-mapped on load, keyed by a hash of the source
+files and of the processing parameters, so that warm starts skip the work
+entirely and cold starts build the cache once.
+
+The cache directory defaults to `~/.cache/skymeshsim` and can be changed with
+the `SKYMESHSIM_CACHE_DIR` environment variable.
+
+Author:
+    Paulo Sanchez (@erlete)
+"""
+
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Any, Callable, Iterable, Optional
+
+import numpy as np
+
+from .logger import Logger
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+POPULATION_PATH = os.path.join(DATA_DIR, "esp_pd_2020_1km.tif")
+TERRAIN_PATH = os.path.join(DATA_DIR, "reprojected_terrain_view.tiff")
+DEM_PATH = os.path.join(DATA_DIR, "spain_dem.tif")
+COUNTRIES_PATH = os.path.join(DATA_DIR, "ne_110m_admin_0_countries.shp")
+
+CACHE_VERSION = 1
+
+Arrays = dict[str, np.ndarray]
+Builder = Callable[[], tuple[Arrays, dict[str, Any]]]
+
+_logger = Logger(1, "[RasterCache]")
+
+
+def default_cache_dir() -> str:
+    """Get the default cache directory.
+
+    Returns:
+        str: Cache directory path.
+    """
+    return os.environ.get(
+        "SKYMESHSIM_CACHE_DIR",
+        os.path.join(os.path.expanduser("~"), ".cache", "skymeshsim")
+    )
+
+
+@functools.lru_cache(maxsize=64)
+def _digest(path: str, size: int, mtime_ns: int) -> str:
+    # Size and modification time are part of the memoization key only; the
+    # digest itself depends on the file contents.
+    del size, mtime_ns
+    sha = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            sha.update(chunk)
+
+    return sha.hexdigest()
+
+
+def file_digest(path: str) -> str:
+    """Compute the SHA-256 digest of a file's contents.
+
+    Digests are memoized per process for unchanged files.
+
+    Args:
+        path (str): File path.
+
+    Returns:
+        str: Hexadecimal digest.
+    """
+    stat = os.stat(path)
+    return _digest(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+class RasterCache:
+    """Content-addressed cache of derived NumPy arrays.
+
+    Each entry is a directory holding one `.npy` file per array plus a
+    `meta.json` file with JSON-serializable metadata. Entries are written to
+    a temporary directory and renamed into place, so concurrent builders never
+    observe partial entries.
+
+    Attributes:
+        directory (str): Cache directory.
+    """
+
+    def __init__(self, directory: Optional[str] = None) -> None:
+        """Initialize a RasterCache instance.
+
+        Args:
+            directory (str | None): Cache directory. Defaults to
+                `default_cache_dir()`.
+        """
+        self.directory = directory or default_cache_dir()
+
+    def key(
+        self,
+        name: str,
+        sources: Iterable[str],
+        params: dict[str, Any]
+    ) -> str:
+        """Compute the key of an entry.
+
+        Args:
+            name (str): Entry name.
+            sources (Iterable[str]): Source file paths.
+            params (dict[str, Any]): JSON-serializable processing parameters.
+
+        Returns:
+            str: Entry key.
+        """
+        sha = hashlib.sha256()
+        sha.update(json.dumps(
+            {
+                "version": CACHE_VERSION,
+                "name": name,
+                "sources": [file_digest(path) for path in sources],
+                "params": params
+            },
+            sort_keys=True
+        ).encode())
+
+        return f"{name}-{sha.hexdigest()[:24]}"
+
+    def load(self, key: str) -> Optional[tuple[Arrays, dict[str, Any]]]:
+        """Load an entry, memory-mapping its arrays.
+
+        Args:
+            key (str): Entry key.
+
+        Returns:
+            tuple[Arrays, dict] | None: Arrays and metadata, or None if the
+                entry does not exist.
+        """
+        path = os.path.join(self.directory, key)
+        try:
+            with open(
+                os.path.join(path, "meta.json"), encoding="utf-8"
+            ) as file:
+                entry = json.load(file)
+
+            arrays = {
+                name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+                for name in entry["arrays"]
+            }
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+        return arrays, entry["meta"]
+
+    def store(
+        self,
+        key: str,
+        arrays: Arrays,
+        meta: dict[str, Any]
+    ) -> None:
+        """Store an entry atomically.
+
+        Args:
+            key (str): Entry key.
+            arrays (Arrays): Arrays to store.
+            meta (dict[str, Any]): JSON-serializable metadata.
+
+        Raises:
+            OSError: If the entry could not be written.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=f".{key}-", dir=self.directory)
+        target = os.path.join(self.directory, key)
+
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(staging, f"{name}.npy"), array)
+
+            with open(
+                os.path.join(staging, "meta.json"), "w", encoding="utf-8"
+            ) as file:
+                json.dump({"arrays": list(arrays), "meta": meta}, file)
+
+            os.replace(staging, target)
+
+        except Exception:  # pylint: disable=broad-except
+            shutil.rmtree(staging, ignore_errors=True)
+
+            # Renaming fails if another process stored the same entry first,
+            # which is the only benign error:
+            if not os.path.isfile(os.path.join(target, "meta.json")):
+                raise
+
+    def get_or_build(
+        self,
+        name: str,
+        sources: Iterable[str],
+        params: dict[str, Any],
+        builder: Builder
+    ) -> tuple[Arrays, dict[str, Any]]:
+        """Load an entry, building and storing it first if needed.
+
+        Args:
+            name (str): Entry name.
+            sources (Iterable[str]): Source file paths.
+            params (dict[str, Any]): JSON-serializable processing parameters.
+            builder (Builder): Function returning the arrays and metadata of
+                the entry.
+
+        Returns:
+            tuple[Arrays, dict]: Memory-mapped arrays and metadata.
+        """
+        key = self.key(name, sources, params)
+        entry = self.load(key)
+
+        if entry is None:
+            _logger.log("Building %s cache entry %s.", 1, name, key)
+            self.store(key, *builder())
+            entry = self.load(key)
+            if entry is None:
+                raise OSError(
+                    f"expected a readable {name} cache entry at"
+                    + f" {os.path.join(self.directory, key)} but got an"
+                    + " incomplete entry instead"
+                )
+
+        return entry
+
+    def get_or_build_file(
+        self,
+        key: str,
+        suffix: str,
+        builder: Callable[[str], None]
+    ) -> str:
+        """Get the path of a derived file, building it first if needed.
+
+        Args:
+            key (str): File key, usually derived from an entry key.
+            suffix (str): File name suffix (e.g. `.tif`).
+            builder (Callable[[str], None]): Function writing the file to the
+                given path.
+
+        Returns:
+            str: Path of the derived file.
+        """
+        path = os.path.join(self.directory, f"{key}{suffix}")
+        if os.path.exists(path):
+            return path
+
+        _logger.log("Building cache file %s.", 1, os.path.basename(path))
+        os.makedirs(self.directory, exist_ok=True)
+        descriptor, staging = tempfile.mkstemp(
+            prefix=f".{key}-", suffix=suffix, dir=self.directory
+        )
+        os.close(descriptor)
+
+        try:
+            builder(staging)
+            os.replace(staging, path)
+        finally:
+            if os.path.exists(staging):
+                os.remove(staging)
+
+        return path
+
+
+def country_geometry(country: str) -> Any:
+    """Load the boundary of a country.
+
+    Args:
+        country (str): Natural Earth `ADMIN` name of the country.
+
+    Returns:
+        Any: Shapely (multi)polygon in EPSG:4326.
+    """
+    import geopandas as gpd  # pylint: disable=import-outside-toplevel
+
+    countries = gpd.read_file(COUNTRIES_PATH)
+    selection = countries[countries["ADMIN"] == country]
+    return selection.to_crs("EPSG:4326").geometry.iloc[0]
+
+
+def _build_boundary(country: str) -> tuple[Arrays, dict[str, Any]]:
+    geometry = country_geometry(country)
+    polygons = getattr(geometry, "geoms", [geometry])
+
+    # Rings separated by NaN rows can be drawn with a single line artist:
+    rings = []
+    for polygon in polygons:
+        for ring in (polygon.exterior, *polygon.interiors):
+            rings.append(np.asarray(ring.coords)[:, :2])
+            rings.append(np.full((1, 2), np.nan))
+
+    return {"boundary": np.concatenate(rings[:-1])}, {"country": country}
+
+
+def _build_population(country: str) -> tuple[Arrays, dict[str, Any]]:
+    # pylint: disable=import-outside-toplevel
+    import rasterio
+    from rasterio.mask import mask
+    from shapely.geometry import mapping
+
+    with rasterio.open(POPULATION_PATH) as dataset:
+        image, transform = mask(
+            dataset,
+            [mapping(country_geometry(country))],
+            crop=True
+        )
+
+    # Clamp the raster values to [0, inf)
+    population = np.clip(np.squeeze(image), 0, None).astype(np.float32)
+
+    return {"population": population}, {
+        "transform": list(transform)[:6],
+        "min": float(population.min()),
+        "max": float(population.max())
+    }
+
+
+def _build_terrain(
+    reflectance_max: float,
+    gamma: float
+) -> tuple[Arrays, dict[str, Any]]:
+    import rasterio  # pylint: disable=import-outside-toplevel
+
+    with rasterio.open(TERRAIN_PATH) as dataset:
+        terrain = dataset.read([1, 2, 3])  # RGB bands
+        transform = dataset.transform
+
+    # Normalize reflectance to [0, 1], apply gamma correction and convert to
+    # 0-255 range for display:
+    terrain = np.clip(terrain, 0, reflectance_max) / reflectance_max
+    terrain = (terrain ** (1 / gamma) * 255).astype(np.uint8)
+
+    return {"terrain": np.ascontiguousarray(terrain.transpose(1, 2, 0))}, {
+        "transform": list(transform)[:6]
+    }
+
+
+def raster_extent(transform: list[float], shape: tuple[int, ...]) -> list:
+    """Compute the `imshow` extent of a north-up raster.
+
+    Args:
+        transform (list[float]): Affine transform coefficients (a, b, c, d,
+            e, f).
+        shape (tuple[int, ...]): Raster shape (rows, columns, ...).
+
+    Returns:
+        list: Left, right, bottom and top coordinates.
+    """
+    return [
+        transform[2],
+        transform[2] + transform[0] * shape[1],
+        transform[5] + transform[4] * shape[0],
+        transform[5]
+    ]
+
+
+def load_static_layers(
+    cache: Optional[RasterCache] = None,
+    country: str = "Spain",
+    reflectance_max: float = 10000,
+    gamma: float = 1.5
+) -> dict[str, Any]:
+    """Load the static DataSystem map layers through the cache.
+
+    Args:
+        cache (RasterCache | None): Cache to use. Defaults to a cache in the
+            default directory.
+        country (str): Natural Earth `ADMIN` name of the country to display.
+        reflectance_max (float): Terrain reflectance mapped to full
+            brightness.
+        gamma (float): Terrain gamma correction.
+
+    Returns:
+        dict[str, Any]: Layers with keys `boundary` (N x 2 array with NaN
+            separators), `population` (2D array), `population_extent`,
+            `population_range`, and `terrain` (H x W x 3 uint8 array) and
+            `terrain_extent` if the terrain view is available. Raster layers
+            also have `<layer>_transform` and `<layer>_key` (cache entry
+            key, for files derived from the layer) items.
+    """
+    cache = cache or RasterCache()
+    shapefile_sources = [COUNTRIES_PATH, COUNTRIES_PATH[:-4] + ".dbf"]
+
+    boundary, _ = cache.get_or_build(
+        "boundary",
+        shapefile_sources,
+        {"country": country},
+        lambda: _build_boundary(country)
+    )
+
+    population_args = (
+        "population",
+        [POPULATION_PATH, *shapefile_sources],
+        {"country": country}
+    )
+    population, population_meta = cache.get_or_build(
+        *population_args,
+        lambda: _build_population(country)
+    )
+
+    layers = {
+        "boundary": boundary["boundary"],
+        "population": population["population"],
+        "population_extent": raster_extent(
+            population_meta["transform"],
+            population["population"].shape
+        ),
+        "population_range": (population_meta["min"], population_meta["max"]),
+        "population_transform": population_meta["transform"],
+        "population_key": cache.key(*population_args)
+    }
+
+    if os.path.exists(TERRAIN_PATH):
+        terrain_args = (
+            "terrain",
+            [TERRAIN_PATH],
+            {"reflectance_max": reflectance_max, "gamma": gamma}
+        )
+        terrain, terrain_meta = cache.get_or_build(
+            *terrain_args,
+            lambda: _build_terrain(reflectance_max, gamma)
+        )
+        layers["terrain"] = terrain["terrain"]
+        layers["terrain_extent"] = raster_extent(
+            terrain_meta["transform"],
+            terrain["terrain"].shape
+        )
+        layers["terrain_transform"] = terrain_meta["transform"]
+        layers["terrain_key"] = cache.key(*terrain_args)
+    else:
+        _logger.log("Terrain view %s not found; skipping.", 2, TERRAIN_PATH)
+
+    return layers
@@ -0,0 +1,433 @@
+"""Raster view module.
+
+This module displays large rasters through level-of-detail pyramids. Each
+raster layer is written once to a tiled GeoTIFF with overviews in the raster
+cache; the view manager then reads only the tiles that intersect the current
+axes extent, at the coarsest level that still provides at least one raster
+pixel per screen pixel. Decoded tiles are kept in an LRU cache bounded by a
+memory budget, so memory usage depends on the view size and on the budget,
+not on the raster size.
+
+Author:
+    Paulo Sanchez (@erlete)
+"""
+
+
+from __future__ import annotations
+
+import math
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from .logger import Logger
+from .raster_cache import RasterCache
+
+TILE_SIZE = 256
+OVERVIEW_FACTORS = (2, 4, 8, 16, 32)
+
+TileKey = tuple[str, int, int, int]
+
+_logger = Logger(1, "[RasterView]")
+
+
+def build_pyramid(
+    path: str,
+    array: np.ndarray,
+    transform: list[float],
+    tile_size: int = TILE_SIZE,
+    resampling: str = "average"
+) -> None:
+    """Write an array to a tiled GeoTIFF with overviews.
+
+    Args:
+        path (str): Output file path.
+        array (np.ndarray): 2D array, or H x W x bands array.
+        transform (list[float]): Affine transform coefficients (a, b, c, d,
+            e, f) in EPSG:4326.
+        tile_size (int): Tile width and height in pixels.
+        resampling (str): Overview resampling method name (e.g. `average`
+            for quantities, `nearest` for categories).
+    """
+    # pylint: disable=import-outside-toplevel
+    import rasterio
+    from affine import Affine
+    from rasterio.enums import Resampling
+
+    bands = array[np.newaxis] if array.ndim == 2 else array.transpose(2, 0, 1)
+
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        width=bands.shape[2],
+        height=bands.shape[1],
+        count=bands.shape[0],
+        dtype=bands.dtype,
+        crs="EPSG:4326",
+        transform=Affine(*transform),
+        tiled=True,
+        blockxsize=tile_size,
+        blockysize=tile_size,
+        compress="deflate"
+    ) as dataset:
+        for index, band in enumerate(bands, start=1):
+            dataset.write(band, index)
+
+        factors = [
+            factor for factor in OVERVIEW_FACTORS
+            if max(bands.shape[1:]) / factor >= tile_size / 2
+        ]
+        dataset.build_overviews(factors, Resampling[resampling])
+
+
+class TileCache:
+    """LRU cache of decoded raster tiles bounded by a memory budget.
+
+    Attributes:
+        max_bytes (int): Memory budget in bytes.
+        size (int): Memory used by the cached tiles in bytes.
+        hits (int): Number of cache hits.
+        misses (int): Number of cache misses.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024) -> None:
+        """Initialize a TileCache instance.
+
+        Args:
+            max_bytes (int): Memory budget in bytes.
+        """
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._tiles: OrderedDict[TileKey, np.ndarray] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Get number of cached tiles.
+
+        Returns:
+            int: Number of cached tiles.
+        """
+        return len(self._tiles)
+
+    def get(
+        self,
+        key: TileKey,
+        loader: Callable[[], np.ndarray]
+    ) -> np.ndarray:
+        """Get a tile, loading it on a miss.
+
+        Args:
+            key (TileKey): Tile key.
+            loader (Callable[[], np.ndarray]): Function decoding the tile.
+
+        Returns:
+            np.ndarray: Decoded tile.
+        """
+        tile = self._tiles.get(key)
+        if tile is not None:
+            self._tiles.move_to_end(key)
+            self.hits += 1
+            return tile
+
+        self.misses += 1
+        tile = loader()
+        self._tiles[key] = tile
+        self.size += tile.nbytes
+
+        # Evict least recently used tiles, always keeping the new one:
+        while self.size > self.max_bytes and len(self._tiles) > 1:
+            _, evicted = self._tiles.popitem(last=False)
+            self.size -= evicted.nbytes
+
+        return tile
+
+    def clear(self) -> None:
+        """Remove every cached tile."""
+        self._tiles.clear()
+        self.size = 0
+
+
+class RasterPyramid:
+    """Tiled raster with overview levels.
+
+    Attributes:
+        path (str): GeoTIFF path.
+        tile_size (int): Tile width and height in pixels.
+        tile_cache (TileCache): Cache of decoded tiles.
+        levels (list[tuple[float, float, float, float, int, int]]): Pixel
+            width, pixel height, left, top, columns and rows of every level,
+            from full resolution to the coarsest overview.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        tile_cache: Optional[TileCache] = None,
+        tile_size: int = TILE_SIZE
+    ) -> None:
+        """Initialize a RasterPyramid instance.
+
+        Args:
+            path (str): Tiled GeoTIFF with overviews.
+            tile_cache (TileCache | None): Cache of decoded tiles, which may
+                be shared between pyramids.
+            tile_size (int): Tile width and height in pixels.
+        """
+        import rasterio  # pylint: disable=import-outside-toplevel
+
+        self.path = path
+        self.tile_size = tile_size
+        self.tile_cache = (
+            tile_cache if tile_cache is not None else TileCache()
+        )
+
+        with rasterio.open(path) as dataset:
+            factors = dataset.overviews(1)
+            width, height = dataset.width, dataset.height
+            transform = dataset.transform
+
+        self._datasets = [rasterio.open(path)] + [
+            rasterio.open(path, overview_level=level)
+            for level in range(len(factors))
+        ]
+        self.levels = [
+            (
+                transform.a * width / dataset.width,
+                transform.e * height / dataset.height,
+                transform.c,
+                transform.f,
+                dataset.width,
+                dataset.height
+            )
+            for dataset in self._datasets
+        ]
+
+    @property
+    def bounds(self) -> tuple[float, float, float, float]:
+        """Get raster bounds.
+
+        Returns:
+            tuple[float, float, float, float]: Left, right, bottom and top.
+        """
+        x_res, y_res, left, top, columns, rows = self.levels[0]
+        return left, left + x_res * columns, top + y_res * rows, top
+
+    def select_level(self, resolution: float) -> int:
+        """Select the coarsest level not coarser than a resolution.
+
+        Args:
+            resolution (float): Target pixel width in raster units.
+
+        Returns:
+            int: Level index (0 is full resolution).
+        """
+        selected = 0
+        for index, (x_res, *_) in enumerate(self.levels):
+            if abs(x_res) <= resolution:
+                selected = index
+
+        return selected
+
+    def read(
+        self,
+        extent: tuple[float, float, float, float],
+        resolution: float
+    ) -> Optional[tuple[np.ndarray, list[float], tuple]]:
+        """Read the tiles intersecting an extent.
+
+        Args:
+            extent (tuple[float, float, float, float]): Left, right, bottom
+                and top of the view.
+            resolution (float): Screen pixel width in raster units.
+
+        Returns:
+            tuple[np.ndarray, list, tuple] | None: Mosaic of the tiles, its
+                `imshow` extent and a key identifying the selected level and
+                tiles, or None if the extent does not intersect the raster.
+        """
+        level = self.select_level(resolution)
+        x_res, y_res, left, top, columns, rows = self.levels[level]
+        size = self.tile_size
+
+        # Tile index ranges intersecting the extent:
+        col_0 = max(math.floor((extent[0] - left) / x_res / size), 0)
+        col_1 = min(math.ceil((extent[1] - left) / x_res / size),
+                    math.ceil(columns / size))
+        row_0 = max(math.floor((extent[3] - top) / y_res / size), 0)
+        row_1 = min(math.ceil((extent[2] - top) / y_res / size),
+                    math.ceil(rows / size))
+
+        if col_0 >= col_1 or row_0 >= row_1:
+            return None
+
+        tiles = [
+            [self._tile(level, row, col) for col in range(col_0, col_1)]
+            for row in range(row_0, row_1)
+        ]
+        mosaic = np.concatenate(
+            [np.concatenate(row, axis=1) for row in tiles],
+            axis=0
+        )
+
+        mosaic_extent = [
+            left + col_0 * size * x_res,
+            left + (col_0 * size + mosaic.shape[1]) * x_res,
+            top + (row_0 * size + mosaic.shape[0]) * y_res,
+            top + row_0 * size * y_res
+        ]
+
+        return mosaic, mosaic_extent, (level, col_0, col_1, row_0, row_1)
+
+    def close(self) -> None:
+        """Close the underlying datasets."""
+        for dataset in self._datasets:
+            dataset.close()
+
+    def _tile(self, level: int, row: int, col: int) -> np.ndarray:
+        def load() -> np.ndarray:
+            # pylint: disable=import-outside-toplevel
+            from rasterio.windows import Window
+
+            dataset = self._datasets[level]
+            size = self.tile_size
+            window = Window(
+                col * size,
+                row * size,
+                min(size, dataset.width - col * size),
+                min(size, dataset.height - row * size)
+            )
+            data = dataset.read(window=window)
+            return data[0] if data.shape[0] == 1 else data.transpose(1, 2, 0)
+
+        return self.tile_cache.get((self.path, level, row, col), load)
+
+
+def load_layer_pyramids(
+    layers: dict[str, Any],
+    cache: Optional[RasterCache] = None,
+    tile_cache: Optional[TileCache] = None,
+    tile_size: int = TILE_SIZE
+) -> dict[str, RasterPyramid]:
+    """Get pyramids of the raster layers, building them if needed.
+
+    Pyramid files are stored in the raster cache next to the layer entries
+    they are derived from.
+
+    Args:
+        layers (dict[str, Any]): Layers returned by `load_static_layers`.
+        cache (RasterCache | None): Cache storing the pyramid files.
+        tile_cache (TileCache | None): Decoded tile cache shared by the
+            pyramids.
+        tile_size (int): Tile width and height in pixels.
+
+    Returns:
+        dict[str, RasterPyramid]: Pyramids by layer name.
+    """
+    cache = cache or RasterCache()
+    if tile_cache is None:
+        tile_cache = TileCache()
+    resampling = {"population": "average", "terrain": "average"}
+
+    pyramids = {}
+    for name, method in resampling.items():
+        if name not in layers:
+            continue
+
+        def build(path: str, name: str = name, method: str = method) -> None:
+            build_pyramid(
+                path,
+                layers[name],
+                layers[name + "_transform"],
+                tile_size,
+                method
+            )
+
+        path = cache.get_or_build_file(
+            f"{layers[name + '_key']}-pyramid-{tile_size}", ".tif", build
+        )
+        pyramids[name] = RasterPyramid(path, tile_cache, tile_size)
+
+    return pyramids
+
+
+class ViewManager:
+    """Keeps axes images in sync with the visible part of their pyramids.
+
+    Images are updated whenever the axes limits change (pan, zoom, resize),
+    before the canvas is redrawn.
+
+    Attributes:
+        ax (Any): Matplotlib axes.
+        reads (int): Number of mosaic updates.
+    """
+
+    def __init__(self, ax: Any) -> None:
+        """Initialize a ViewManager instance.
+
+        Args:
+            ax (Any): Matplotlib axes.
+        """
+        self.ax = ax
+        self.reads = 0
+
+        self._layers: list[tuple[Any, RasterPyramid, list]] = []
+        self._callback_ids = [
+            ax.callbacks.connect("xlim_changed", self._on_limits_changed),
+            ax.callbacks.connect("ylim_changed", self._on_limits_changed)
+        ]
+
+    def add(self, image: Any, pyramid: RasterPyramid) -> None:
+        """Display a pyramid through an axes image.
+
+        Args:
+            image (Any): Axes image created by `imshow`.
+            pyramid (RasterPyramid): Pyramid to display.
+        """
+        self._layers.append((image, pyramid, [None]))
+        self.update()
+
+    def update(self) -> None:
+        """Read the visible tiles of every layer at the current view."""
+        x_0, x_1 = sorted(self.ax.get_xlim())
+        y_0, y_1 = sorted(self.ax.get_ylim())
+        width = max(self.ax.bbox.width, 1.0)
+        resolution = (x_1 - x_0) / width
+
+        for image, pyramid, state in self._layers:
+            result = pyramid.read((x_0, x_1, y_0, y_1), resolution)
+
+            if result is None:
+                image.set_visible(False)
+                state[0] = None
+                continue
+
+            mosaic, extent, key = result
+            image.set_visible(True)
+            if key == state[0]:
+                continue
+
+            state[0] = key
+            image.set_data(mosaic)
+            image.set_extent(extent)
+            self.reads += 1
+
+            _logger.log(
+                "Displaying %s at level %d (%d x %d pixels).",
+                0,
+                pyramid.path,
+                key[0],
+                mosaic.shape[1],
+                mosaic.shape[0]
+            )
+
+    def disconnect(self) -> None:
+        """Stop tracking axes limits."""
+        for callback_id in self._callback_ids:
+            self.ax.callbacks.disconnect(callback_id)
+
+    def _on_limits_changed(self, _: Any) -> None:
+        self.update()
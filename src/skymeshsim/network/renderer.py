@@ -0,0 +1,386 @@
+"""Headless renderer module.
+
+This module renders fleet snapshots offscreen in a worker process, so that
+simulations can produce visual output on machines without a display. The
+ingestion process only enqueues small snapshot arrays without blocking: when
+the worker falls behind, new snapshots are dropped instead of queued, so
+rendering never slows down message processing.
+
+The worker draws the static map layers once with the `Agg` backend, blits the
+fleet overlay on every frame and writes the frames as a PNG sequence and/or
+pipes them to `ffmpeg` to encode a video, if it is installed.
+
+Author:
+    Paulo Sanchez (@erlete)
+"""
+
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import queue
+import shutil
+import subprocess
+import time
+from typing import IO, Any, NamedTuple, Optional
+
+import numpy as np
+
+from .logger import Logger
+
+
+class FleetSnapshot(NamedTuple):
+    """Fleet state sent to the renderer.
+
+    Attributes:
+        time (float): Simulation time in seconds.
+        longitude (np.ndarray): Drone longitudes.
+        latitude (np.ndarray): Drone latitudes.
+        speed (np.ndarray): Drone speeds.
+        colors (np.ndarray | None): RGBA drone colors with shape (N, 4).
+            Drones use the default color if None.
+        links (np.ndarray | None): Drone index pairs of the mesh links with
+            shape (M, 2). No links are drawn if None.
+    """
+
+    time: float
+    longitude: np.ndarray
+    latitude: np.ndarray
+    speed: np.ndarray
+    colors: Optional[np.ndarray] = None
+    links: Optional[np.ndarray] = None
+
+
+class RenderStats(NamedTuple):
+    """Frame production statistics of a renderer worker.
+
+    Attributes:
+        frames (int): Number of frames rendered.
+        elapsed (float): Wall-clock lifetime of the worker in seconds.
+        busy (float): Wall-clock time spent rendering and writing frames in
+            seconds.
+        video (str | None): Path of the encoded video, if any.
+    """
+
+    frames: int
+    elapsed: float
+    busy: float
+    video: Optional[str]
+
+    @property
+    def fps(self) -> float:
+        """Get frame production rate.
+
+        Returns:
+            float: Frames rendered per wall-clock second.
+        """
+        return self.frames / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def capacity(self) -> float:
+        """Get maximum frame production rate.
+
+        Returns:
+            float: Frames rendered per wall-clock second spent rendering.
+        """
+        return self.frames / self.busy if self.busy > 0 else 0.0
+
+
+class HeadlessRenderer:
+    """Offscreen fleet renderer running in a worker process.
+
+    Attributes:
+        output_dir (str): Directory of the rendered frames and video.
+        fps (float): Snapshot rate in frames per second. Also used as the
+            video frame rate.
+        frames (bool): Whether to write every frame as a PNG file.
+        video (bool): Whether to encode a video with `ffmpeg`. Ignored with a
+            warning if `ffmpeg` is not installed.
+        queue_size (int): Maximum number of snapshots waiting to be rendered.
+        size (tuple[float, float]): Figure size in inches.
+        dpi (int): Figure resolution in dots per inch.
+        cache_dir (str | None): Raster cache directory of the static layers.
+        submitted (int): Number of snapshots queued for rendering.
+        dropped (int): Number of snapshots dropped because the worker was
+            behind.
+        stats (RenderStats | None): Worker statistics, available after
+            `close`.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        fps: float = 10.0,
+        frames: bool = True,
+        video: bool = True,
+        queue_size: int = 4,
+        size: tuple[float, float] = (10.0, 8.0),
+        dpi: int = 100,
+        cache_dir: Optional[str] = None
+    ) -> None:
+        """Initialize a HeadlessRenderer instance.
+
+        Args:
+            output_dir (str): Directory of the rendered frames and video.
+            fps (float): Snapshot rate in frames per second.
+            frames (bool): Whether to write every frame as a PNG file.
+            video (bool): Whether to encode a video with `ffmpeg`.
+            queue_size (int): Maximum number of snapshots waiting to be
+                rendered.
+            size (tuple[float, float]): Figure size in inches.
+            dpi (int): Figure resolution in dots per inch.
+            cache_dir (str | None): Raster cache directory of the static
+                layers. Defaults to the default cache directory.
+        """
+        if fps <= 0:
+            raise ValueError(f"fps must be positive but got {fps} instead")
+
+        self.output_dir = output_dir
+        self.fps = fps
+        self.frames = frames
+        self.video = video
+        self.queue_size = queue_size
+        self.size = size
+        self.dpi = dpi
+        self.cache_dir = cache_dir
+        self.submitted = 0
+        self.dropped = 0
+        self.stats: Optional[RenderStats] = None
+
+        self._queue: Any = None
+        self._results: Any = None
+        self._process: Optional[multiprocessing.process.BaseProcess] = None
+
+        self._logger = Logger(1, "[HeadlessRenderer]")
+
+    @property
+    def running(self) -> bool:
+        """Check whether the worker process is alive.
+
+        Returns:
+            bool: True if the worker process is alive.
+        """
+        return self._process is not None and self._process.is_alive()
+
+    def start(self) -> None:
+        """Start the worker process."""
+        if self._process is not None:
+            return
+
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        # Spawned workers do not inherit the event loop, the log thread or
+        # any interactive backend of the parent process:
+        context = multiprocessing.get_context("spawn")
+        self._queue = context.Queue(self.queue_size)
+        self._results = context.Queue(1)
+        self._process = context.Process(
+            target=_render_worker,
+            args=(self._queue, self._results, self._options()),
+            name="HeadlessRenderer",
+            daemon=True
+        )
+        self._process.start()
+
+    def submit(self, snapshot: FleetSnapshot) -> bool:
+        """Queue a snapshot for rendering without blocking.
+
+        Args:
+            snapshot (FleetSnapshot): Fleet state to render.
+
+        Returns:
+            bool: True if the snapshot was queued, False if it was dropped.
+        """
+        if self._queue is None:
+            raise RuntimeError("renderer is not started")
+
+        try:
+            self._queue.put_nowait(snapshot)
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+        self.submitted += 1
+        return True
+
+    def close(self, timeout: float = 30.0) -> Optional[RenderStats]:
+        """Render the queued snapshots, stop the worker and report its rate.
+
+        Args:
+            timeout (float): Maximum time to wait for the worker in seconds.
+
+        Returns:
+            RenderStats | None: Worker statistics, or None if the worker did
+                not report them.
+        """
+        if self._process is None:
+            return self.stats
+
+        try:
+            self._queue.put(None, timeout=timeout)
+            self.stats = self._results.get(timeout=timeout)
+        except (queue.Full, queue.Empty):
+            self._logger.log("Renderer worker did not finish in time.", 2)
+
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+
+        self._process = None
+        self._queue = self._results = None
+
+        if self.stats is not None:
+            self._logger.log(
+                "Rendered %d frames in %.1f s (%.1f frames/s, capacity "
+                + "%.1f frames/s), dropped %d.",
+                1,
+                self.stats.frames,
+                self.stats.elapsed,
+                self.stats.fps,
+                self.stats.capacity,
+                self.dropped
+            )
+
+        return self.stats
+
+    def _options(self) -> dict[str, Any]:
+        return {
+            "output_dir": self.output_dir,
+            "fps": self.fps,
+            "frames": self.frames,
+            "video": self.video,
+            "size": self.size,
+            "dpi": self.dpi,
+            "cache_dir": self.cache_dir
+        }
+
+
+def _open_encoder(
+    path: str,
+    width: int,
+    height: int,
+    fps: float
+) -> subprocess.Popen:
+    return subprocess.Popen(
+        [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgba",
+            "-s", f"{width}x{height}", "-r", str(fps),
+            "-i", "-",
+            # H.264 requires even frame dimensions:
+            "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+            "-c:v", "libx264", "-pix_fmt", "yuv420p",
+            path
+        ],
+        stdin=subprocess.PIPE
+    )
+
+
+def _render_worker(
+    snapshots: Any,
+    results: Any,
+    options: dict[str, Any]
+) -> None:
+    # pylint: disable=import-outside-toplevel,too-many-locals
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from matplotlib.image import imsave
+
+    from .plotting import BlitManager, FleetOverlay, draw_static_layers
+    from .raster_cache import RasterCache, load_static_layers
+    from .raster_view import ViewManager, load_layer_pyramids
+
+    logger = Logger(1, "[HeadlessRenderer]")
+    report_interval = 5.0
+
+    figure = Figure(figsize=options["size"], dpi=options["dpi"])
+    # The Agg canvas is untyped in matplotlib:
+    canvas: Any = FigureCanvasAgg(figure)
+    ax = figure.add_subplot(1, 1, 1)
+    cache = RasterCache(options["cache_dir"])
+    layers = load_static_layers(cache)
+    pyramids = load_layer_pyramids(layers, cache)
+    images = draw_static_layers(ax, layers, pyramids)
+
+    view_manager = ViewManager(ax)
+    for name, pyramid in pyramids.items():
+        view_manager.add(images[name], pyramid)
+
+    overlay = FleetOverlay(ax)
+    label = ax.text(0.02, 0.98, "", transform=ax.transAxes, va="top",
+                    fontsize=9, zorder=6)
+    blit_manager = BlitManager(canvas, (*overlay.artists, label))
+
+    width, height = (int(value) for value in figure.bbox.size)
+    encoder = None
+    encoder_input: Optional[IO[bytes]] = None
+    video_path = None
+    if options["video"]:
+        if shutil.which("ffmpeg") is None:
+            logger.log("ffmpeg not found; writing PNG frames only.", 2)
+        else:
+            video_path = os.path.join(options["output_dir"], "fleet.mp4")
+            encoder = _open_encoder(video_path, width, height, options["fps"])
+            encoder_input = encoder.stdin
+
+    frames = 0
+    busy = 0.0
+    start = last_report = time.perf_counter()
+
+    try:
+        while True:
+            snapshot = snapshots.get()
+            if snapshot is None:
+                break
+
+            frame_start = time.perf_counter()
+            overlay.update(snapshot.longitude, snapshot.latitude,
+                           snapshot.colors, snapshot.links)
+            label.set_text(
+                f"t = {snapshot.time:.1f} s, "
+                + f"{len(snapshot.longitude)} drones"
+            )
+            blit_manager.update()
+            frame = np.asarray(canvas.buffer_rgba())
+
+            if options["frames"]:
+                imsave(
+                    os.path.join(
+                        options["output_dir"], f"frame_{frames:06d}.png"
+                    ),
+                    frame
+                )
+
+            if encoder_input is not None:
+                encoder_input.write(frame.tobytes())
+
+            frames += 1
+            now = time.perf_counter()
+            busy += now - frame_start
+            if now - last_report >= report_interval:
+                logger.log(
+                    "Rendered %d frames (%.1f frames/s, capacity %.1f "
+                    + "frames/s).",
+                    1,
+                    frames,
+                    frames / (now - start),
+                    frames / busy
+                )
+                last_report = now
+
+    finally:
+        if encoder_input is not None:
+            encoder_input.close()
+        if encoder is not None:
+            encoder.wait()
+
+        results.put(RenderStats(
+            frames,
+            time.perf_counter() - start,
+            busy,
+            video_path
+        ))
+
+        # Spawned processes exit without running `atexit` handlers:
+        Logger.flush()
@@ -5,22 +5,67 @@ Author:
 """
 
 
+from __future__ import annotations
+
 import asyncio
 import json
-from typing import Dict
+from typing import TYPE_CHECKING, Dict, Optional
 
+from .datagram import (Address, DatagramWriter, TelemetryReceiver,
+                       open_datagram_writer)
 from .logger import Logger
 from .network_component import _BaseNetworkComponent
+from .transport import parse_address
+
+if TYPE_CHECKING:
+    from ..modules.mesh.delivery import MeshRelay
+
+DATAGRAM_TYPES = ("dstat",)
 
 
 class SocketServer(_BaseNetworkComponent):
-    """Message broker for routing messages between systems and components."""
+    """Message broker for routing messages between systems and components.
 
-    def __init__(self, host: str, port: int):
-        super().__init__(host, port)
+    Attributes:
+        telemetry (str | None): `udp://host:port` address on which drone
+            telemetry datagrams are accepted. The datagram channel is
+            disabled if None.
+        datagram_loss_rate (float): Synthetic loss probability applied to
+            forwarded telemetry datagrams.
+        mesh_relay (MeshRelay | None): Simulated drone mesh. If given,
+            messages between drones and the ground systems are delivered
+            over the mesh, hop by hop, after their simulated delay (or
+            dropped), instead of directly. Drone positions are taken from
+            their status messages.
+        mesh_report_interval (float): Time between mesh delivery reports in
+            seconds.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        address: Optional[str] = None,
+        telemetry: Optional[str] = None,
+        datagram_loss_rate: float = 0.0,
+        mesh_relay: Optional[MeshRelay] = None,
+        mesh_report_interval: float = 30.0
+    ):
+        super().__init__(host, port, address)
 
         self.clients: Dict[str, asyncio.StreamWriter] = {}
+        self.datagram_clients: Dict[str, DatagramWriter] = {}
         self.message_queue: asyncio.Queue = asyncio.Queue()
+        self.telemetry = telemetry
+        self.datagram_loss_rate = datagram_loss_rate
+        self.mesh_relay = mesh_relay
+        self.mesh_report_interval = mesh_report_interval
+
+        if telemetry is not None and parse_address(telemetry).scheme != "udp":
+            raise ValueError(
+                f"expected udp:// telemetry address but got {telemetry!r}"
+                + " instead"
+            )
 
         self._logger = Logger(1, "[SocketServer]")
 
@@ -32,12 +77,25 @@ class SocketServer(_BaseNetworkComponent):
         """Handle client connections and enqueue their messages."""
         try:
             # Identify client:
-            client_name = json.loads(
-                (await reader.readline()).decode()
-            )["component"].strip()
+            identification = json.loads((await reader.readline()).decode())
+            client_name = identification["component"].strip()
             self.clients[client_name] = writer
             self._logger.log(f"Client {client_name!s} connected.", 1)
 
+            if identification.get("datagram_port") is not None:
+                # Unix domain socket clients are reached through loopback:
+                peer_host = (
+                    writer.get_extra_info("peername")[0]
+                    if self.endpoint.scheme == "tcp" else "127.0.0.1"
+                )
+                self.datagram_clients[client_name] = (
+                    await open_datagram_writer(
+                        peer_host,
+                        identification["datagram_port"],
+                        self.datagram_loss_rate
+                    )
+                )
+
             # Read messages from client:
             while True:
                 data = await reader.readline()
@@ -61,6 +119,9 @@ class SocketServer(_BaseNetworkComponent):
         finally:
             self._logger.log(f"Client {client_name!s} disconnected.", 1)
             self.clients.pop(client_name, None)
+            datagram_writer = self.datagram_clients.pop(client_name, None)
+            if datagram_writer is not None:
+                datagram_writer.close()
             writer.close()
             await writer.wait_closed()
 
@@ -68,21 +129,33 @@ class SocketServer(_BaseNetworkComponent):
         """Process messages and forward them to target clients."""
         while True:
             client_name, message = await self.message_queue.get()
-            self._logger.log(f"Client {client_name!s} says {message}", 0)
+            self._logger.log("Client %s says %s", 0, client_name, message)
+
+            if (
+                message.get("type") == "dstat"
+                and self.mesh_relay is not None
+            ):
+                location = message["location"]
+                self.mesh_relay.update_position(
+                    client_name, location["x"], location["y"],
+                    location.get("z", 0.0)
+                )
 
             # DataSystem valid messages forwarding:
             if (
                 message.get("type") in ("log", "dstat")
                 and "DataSystem" in self.clients
             ):
-                await self.send_message("DataSystem", message)
+                await self.forward_message(client_name, "DataSystem", message)
 
             # Drone commands handling:
             elif message.get("type") == "dcmd":
                 # Forward commands to all drones
-                for client_name in self.clients:
-                    if client_name.startswith("Drone"):
-                        await self.send_message(client_name, message)
+                for recipient in list(self.clients):
+                    if recipient.startswith("Drone"):
+                        await self.forward_message(
+                            client_name, recipient, message
+                        )
 
             # Server commands handling:
             elif message.get("type") == "scmd":
@@ -97,27 +170,124 @@ class SocketServer(_BaseNetworkComponent):
                             1
                         )
 
+    async def forward_message(
+        self,
+        sender: str,
+        recipient: str,
+        message: dict
+    ) -> None:
+        """Forward a message to a client, over the simulated mesh if any.
+
+        Ground systems share the ground station of the mesh, so only
+        messages between drones and ground systems cross it. Messages whose
+        endpoints are not on the mesh yet are sent directly.
+
+        Args:
+            sender (str): Sender client name.
+            recipient (str): Recipient client name.
+            message (dict): Message to forward.
+        """
+        if self.mesh_relay is not None:
+            ground = self.mesh_relay.GROUND
+            source = sender if sender.startswith("Drone") else ground
+            destination = (
+                recipient if recipient.startswith("Drone") else ground
+            )
+
+            if source != destination and self.mesh_relay.relay(
+                source,
+                destination,
+                len(json.dumps(message)),
+                self.deliver_message,
+                args=(recipient, message)
+            ):
+                return
+
+        await self.send_message(recipient, message)
+
+    async def deliver_message(self, recipient: str, message: dict) -> None:
+        """Send a message that crossed the mesh to its recipient.
+
+        The recipient may have disconnected while the message was in flight,
+        which must not stop the mesh relay.
+
+        Args:
+            recipient (str): Recipient client name.
+            message (dict): Message to send.
+        """
+        try:
+            await self.send_message(recipient, message)
+        except ConnectionError as exc:
+            self._logger.log(
+                "Dropped mesh message to %s: %s", 2, recipient, exc
+            )
+
+    def handle_datagram(self, message: dict, _: Address) -> None:
+        """Enqueue a fresh telemetry datagram as if it came from a client."""
+        if message.get("type") in DATAGRAM_TYPES:
+            self.message_queue.put_nowait(
+                (message.get("component"), message)
+            )
+
     async def send_message(self, recipient: str, message: dict) -> None:
-        """Send a message to a specific client."""
-        if recipient in self.clients:
+        """Send a message to a specific client.
+
+        Telemetry messages are sent over the datagram channel if the recipient
+        registered one. Everything else uses the reliable stream.
+        """
+        if (
+            message.get("type") in DATAGRAM_TYPES
+            and recipient in self.datagram_clients
+        ):
+            self.datagram_clients[recipient].write(
+                json.dumps(message).encode()
+            )
+
+        elif recipient in self.clients:
             writer = self.clients[recipient]
             writer.write((json.dumps(message) + "\n").encode())
             await writer.drain()
 
     async def run(self) -> None:
         """Start the server and listen for client connections."""
-        server = await asyncio.start_server(
-            self.handle_client,
-            self.host,
-            self.port
-        )
-        self._logger.log(f"Server running on {self.host}:{self.port}", 1)
+        server = await self.start_server(self.handle_client)
+        self._logger.log(f"Server running on {self.endpoint}", 1)
 
-        async with server:
-            await asyncio.gather(
-                server.serve_forever(),
-                self.process_messages()
+        if self.telemetry is not None:
+            endpoint = parse_address(self.telemetry)
+            receiver = TelemetryReceiver(
+                endpoint.host,
+                endpoint.port,
+                self.handle_datagram
+            )
+            await receiver.start()
+            self._logger.log(
+                "Accepting telemetry datagrams on"
+                + f" udp://{endpoint.host}:{receiver.port}",
+                1
+            )
+
+        tasks = [server.serve_forever(), self.process_messages()]
+        if self.mesh_relay is not None:
+            self.mesh_relay.start()
+            self.mesh_relay.scheduler.call_every(
+                self.mesh_report_interval,
+                self.report_mesh_delivery,
+                delay=self.mesh_report_interval
             )
+            tasks.append(self.mesh_relay.scheduler.run())
+
+        async with server:
+            await asyncio.gather(*tasks)
+
+    def report_mesh_delivery(self) -> None:
+        """Log the delivery statistics of the simulated mesh."""
+        assert self.mesh_relay is not None
+        self._logger.log(
+            "Mesh delivery: %s", 1, self.mesh_relay.delivery.total()
+        )
+        for summary in self.mesh_relay.summary():
+            self._logger.log("Mesh route: %s", 0, summary)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,563 @@
+"""Transport selection module.
+
+This module maps URL-style addresses to the transports available to network
+components:
+
+- `tcp://host:port`: reliable stream over TCP (default).
+- `unix:///path/to/socket`: reliable stream over a Unix domain socket, for
+  components that share a host.
+- `udp://host:port`: sequenced telemetry datagrams (see `datagram` module).
+- `shm://name`: telemetry ring buffer in shared memory, for a simulation
+  process and a DataSystem that share a host.
+
+Stream addresses (`tcp`, `unix`) carry every message type. Telemetry
+addresses (`udp`, `shm`) only carry drone status messages. The launcher only
+wires `udp` telemetry: a `shm` ring accepts a single producer, while drone
+hosts run many drones per process.
+
+Author:
+    Paulo Sanchez (@erlete)
+"""
+
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import struct
+from multiprocessing import resource_tracker, shared_memory
+from typing import (Any, Awaitable, Callable, Iterable, NamedTuple, Optional,
+                    Tuple)
+from urllib.parse import urlsplit
+
+from .datagram import TelemetryReceiver, open_datagram_writer
+
+STREAM_SCHEMES = ("tcp", "unix")
+TELEMETRY_SCHEMES = ("udp", "shm")
+
+ClientCallback = Callable[
+    [asyncio.StreamReader, asyncio.StreamWriter],
+    Awaitable[None]
+]
+
+
+class Endpoint(NamedTuple):
+    """Parsed transport address.
+
+    Attributes:
+        scheme (str): Transport scheme.
+        host (str): Host address (`tcp` and `udp` only).
+        port (int): Port number (`tcp` and `udp` only).
+        path (str): Socket path (`unix`) or segment name (`shm`).
+    """
+
+    scheme: str
+    host: str = ""
+    port: int = 0
+    path: str = ""
+
+    def __str__(self) -> str:
+        """Get URL representation of the endpoint.
+
+        Returns:
+            str: URL representation of the endpoint.
+        """
+        if self.scheme in ("tcp", "udp"):
+            return f"{self.scheme}://{self.host}:{self.port}"
+
+        if self.scheme == "unix":
+            return f"unix://{self.path}"
+
+        return f"shm://{self.path}"
+
+
+def parse_address(address: str) -> Endpoint:
+    """Parse a URL-style transport address.
+
+    Args:
+        address (str): Address such as `tcp://127.0.0.1:8888`,
+            `unix:///tmp/skymesh.sock` or `shm://skymesh`.
+
+    Returns:
+        Endpoint: Parsed address.
+
+    Raises:
+        ValueError: If the scheme is unknown or the address is incomplete.
+    """
+    parts = urlsplit(address)
+
+    if parts.scheme in ("tcp", "udp"):
+        if parts.hostname is None or parts.port is None:
+            raise ValueError(
+                f"expected {parts.scheme}://host:port address but got"
+                + f" {address!r} instead"
+            )
+
+        return Endpoint(parts.scheme, host=parts.hostname, port=parts.port)
+
+    if parts.scheme == "unix":
+        path = parts.netloc + parts.path
+        if not path:
+            raise ValueError(f"missing socket path in address {address!r}")
+
+        return Endpoint("unix", path=path)
+
+    if parts.scheme == "shm":
+        if not parts.netloc or parts.path not in ("", "/"):
+            raise ValueError(
+                f"expected shm://name address but got {address!r} instead"
+            )
+
+        return Endpoint("shm", path=parts.netloc)
+
+    raise ValueError(
+        f"unknown transport scheme {parts.scheme!r} in address {address!r}"
+    )
+
+
+async def open_connection(
+    endpoint: Endpoint
+) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    """Open a reliable stream connection.
+
+    Args:
+        endpoint (Endpoint): Stream endpoint.
+
+    Returns:
+        tuple[asyncio.StreamReader, asyncio.StreamWriter]: Stream pair.
+    """
+    if endpoint.scheme == "tcp":
+        return await asyncio.open_connection(endpoint.host, endpoint.port)
+
+    if endpoint.scheme == "unix":
+        return await asyncio.open_unix_connection(endpoint.path)
+
+    raise ValueError(f"{endpoint} is not a stream address")
+
+
+async def start_server(
+    callback: ClientCallback,
+    endpoint: Endpoint
+) -> asyncio.AbstractServer:
+    """Start a reliable stream server.
+
+    Args:
+        callback (ClientCallback): Client connection handler.
+        endpoint (Endpoint): Stream endpoint.
+
+    Returns:
+        asyncio.AbstractServer: Listening server.
+    """
+    if endpoint.scheme == "tcp":
+        return await asyncio.start_server(
+            callback,
+            endpoint.host,
+            endpoint.port
+        )
+
+    if endpoint.scheme == "unix":
+        # Remove stale socket files left behind by a previous run:
+        if os.path.exists(endpoint.path):
+            os.unlink(endpoint.path)
+
+        return await asyncio.start_unix_server(callback, endpoint.path)
+
+    raise ValueError(f"{endpoint} is not a stream address")
+
+
+class ShmRingBuffer:
+    """Single-producer, single-consumer byte ring in shared memory.
+
+    The segment starts with two monotonically increasing 64-bit counters
+    (bytes written and bytes read) and the process ID of the producer,
+    followed by the data area. Each record is a 32-bit length followed by its
+    payload, wrapping around the end of the data area. The producer only
+    advances the write counter and the consumer only advances the read
+    counter, so no lock is required as long as there is one producer and one
+    consumer per ring. Producers claim the ring on attach, and attaching
+    while another live producer holds it fails.
+
+    Attributes:
+        name (str): Shared memory segment name.
+        capacity (int): Size of the data area in bytes.
+        dropped (int): Records dropped by this producer because the ring was
+            full.
+    """
+
+    _COUNTERS = struct.Struct("=QQ")
+    _PRODUCER = struct.Struct("=Q")
+    _HEADER_SIZE = _COUNTERS.size + _PRODUCER.size
+    _LENGTH = struct.Struct("=I")
+
+    # Names of the segments created by this process:
+    _created: set[str] = set()
+
+    def __init__(
+        self,
+        name: str,
+        capacity: int = 1 << 20,
+        create: bool = False
+    ) -> None:
+        """Initialize a ShmRingBuffer instance.
+
+        Args:
+            name (str): Shared memory segment name.
+            capacity (int): Size of the data area in bytes. Ignored when
+                attaching to an existing segment.
+            create (bool): Whether to create the segment (consumer side) or
+                attach to an existing one (producer side). A segment left
+                over by a consumer that crashed is replaced.
+
+        Raises:
+            FileNotFoundError: If attaching to a segment that does not exist.
+            RuntimeError: If attaching to a segment that has a live producer
+                already.
+        """
+        if create:
+            size = self._HEADER_SIZE + capacity
+            try:
+                self._shm = shared_memory.SharedMemory(
+                    name, create=True, size=size
+                )
+            except FileExistsError:
+                stale = shared_memory.SharedMemory(name)
+                stale.close()
+                stale.unlink()
+                self._shm = shared_memory.SharedMemory(
+                    name, create=True, size=size
+                )
+            self._COUNTERS.pack_into(self._shm.buf, 0, 0, 0)
+            self._PRODUCER.pack_into(self._shm.buf, self._COUNTERS.size, 0)
+            self._created.add(name)
+        else:
+            self._shm = shared_memory.SharedMemory(name)
+            # Attached segments must not be unlinked by this process' resource
+            # tracker at exit, since the consumer owns them, unless this
+            # process is the consumer. The tracker only runs on POSIX, where
+            # it registers names with a leading slash:
+            if os.name == "posix" and name not in self._created:
+                resource_tracker.unregister(
+                    f"/{self._shm.name.lstrip('/')}", "shared_memory"
+                )
+
+            (producer,) = self._PRODUCER.unpack_from(
+                self._shm.buf, self._COUNTERS.size
+            )
+            if producer and _is_alive(producer):
+                self._shm.close()
+                raise RuntimeError(
+                    f"expected a single producer on shm://{name} but got"
+                    + f" process {producer} attached already instead"
+                )
+
+            self._PRODUCER.pack_into(
+                self._shm.buf, self._COUNTERS.size, os.getpid()
+            )
+
+        self.name = name
+        self.capacity = self._shm.size - self._HEADER_SIZE
+        self.dropped = 0
+
+        self._owner = create
+        self._data = self._shm.buf[self._HEADER_SIZE:]
+
+    def push(self, payload: bytes) -> bool:
+        """Append a record to the ring.
+
+        Args:
+            payload (bytes): Record payload.
+
+        Returns:
+            bool: True if the record was written, False if the ring was full
+                and the record was dropped.
+        """
+        size = self._LENGTH.size + len(payload)
+        written, read = self._COUNTERS.unpack_from(self._shm.buf, 0)
+
+        if self.capacity - (written - read) < size:
+            self.dropped += 1
+            return False
+
+        self._copy_in(written, self._LENGTH.pack(len(payload)))
+        self._copy_in(written + self._LENGTH.size, payload)
+
+        # Publish the record only once its bytes are in place:
+        struct.pack_into("=Q", self._shm.buf, 0, written + size)
+        return True
+
+    def pop_all(self) -> list[bytes]:
+        """Consume every complete record currently in the ring.
+
+        Returns:
+            list[bytes]: Record payloads in write order.
+        """
+        written, read = self._COUNTERS.unpack_from(self._shm.buf, 0)
+        records = []
+
+        while read < written:
+            (length,) = self._LENGTH.unpack(
+                self._copy_out(read, self._LENGTH.size)
+            )
+            records.append(
+                self._copy_out(read + self._LENGTH.size, length)
+            )
+            read += self._LENGTH.size + length
+
+        struct.pack_into("=Q", self._shm.buf, 8, read)
+        return records
+
+    def close(self) -> None:
+        """Detach from the segment, unlinking it if this side created it.
+
+        Producers release their claim on the ring, so that another process
+        can attach to it.
+        """
+        self._data.release()
+        if not self._owner and self._PRODUCER.unpack_from(
+            self._shm.buf, self._COUNTERS.size
+        ) == (os.getpid(),):
+            self._PRODUCER.pack_into(self._shm.buf, self._COUNTERS.size, 0)
+
+        self._shm.close()
+
+        if self._owner:
+            self._shm.unlink()
+            self._created.discard(self.name)
+
+    def _copy_in(self, position: int, data: bytes) -> None:
+        start = position % self.capacity
+        head = min(len(data), self.capacity - start)
+        self._data[start:start + head] = data[:head]
+        self._data[:len(data) - head] = data[head:]
+
+    def _copy_out(self, position: int, size: int) -> bytes:
+        start = position % self.capacity
+        head = min(size, self.capacity - start)
+        return bytes(self._data[start:start + head]) + bytes(
+            self._data[:size - head]
+        )
+
+
+def _is_alive(pid: int) -> bool:
+    # Whether a process exists. Signal 0 only checks for it on POSIX, while
+    # it would terminate the process on Windows, where producers are always
+    # assumed to be alive:
+    if os.name != "posix":
+        return True
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    return True
+
+
+class ShmTelemetryWriter:
+    """Telemetry writer over a shared memory ring.
+
+    This class mimics the `write`/`drain` interface of `asyncio.StreamWriter`
+    so that existing message classes can be sent through it unchanged.
+    Messages are dropped, not queued, if the consumer falls behind.
+    """
+
+    def __init__(self, ring: ShmRingBuffer) -> None:
+        """Initialize a ShmTelemetryWriter instance.
+
+        Args:
+            ring (ShmRingBuffer): Attached ring buffer.
+        """
+        self._ring = ring
+
+    @property
+    def dropped(self) -> int:
+        """Get number of messages dropped because the ring was full."""
+        return self._ring.dropped
+
+    def write(self, data: bytes) -> None:
+        """Append an encoded message to the ring.
+
+        Args:
+            data (bytes): Encoded message.
+        """
+        self._ring.push(data.rstrip(b"\n"))
+
+    async def drain(self) -> None:
+        """Do nothing. The ring never applies back-pressure."""
+
+    def close(self) -> None:
+        """Detach from the ring."""
+        self._ring.close()
+
+    async def wait_closed(self) -> None:
+        """Do nothing. Provided for `asyncio.StreamWriter` compatibility."""
+
+
+class ShmTelemetryReader:
+    """Telemetry reader over a shared memory ring.
+
+    The reader owns the ring: it creates the segment on `start` and unlinks
+    it on `close`. The ring is polled with a back-off that grows while it is
+    empty and resets as soon as data arrives.
+
+    Attributes:
+        name (str): Shared memory segment name.
+        capacity (int): Size of the data area in bytes.
+        received (int): Number of messages consumed.
+        invalid (int): Number of malformed messages discarded.
+    """
+
+    MIN_POLL_INTERVAL = 0.0005  # [s]
+    MAX_POLL_INTERVAL = 0.01  # [s]
+
+    def __init__(
+        self,
+        name: str,
+        callback: Callable[[dict, str], Any],
+        capacity: int = 1 << 20
+    ) -> None:
+        """Initialize a ShmTelemetryReader instance.
+
+        Args:
+            name (str): Shared memory segment name.
+            callback (Callable[[dict, str], Any]): Function called with every
+                decoded message and the segment name.
+            capacity (int): Size of the data area in bytes.
+        """
+        self.name = name
+        self.capacity = capacity
+        self.received = 0
+        self.invalid = 0
+
+        self._callback = callback
+        self._ring: Optional[ShmRingBuffer] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Create the ring and start polling it."""
+        self._ring = ShmRingBuffer(self.name, self.capacity, create=True)
+        self._task = asyncio.create_task(self._poll())
+
+    def close(self) -> None:
+        """Stop polling and unlink the ring."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
+
+    async def _poll(self) -> None:
+        assert self._ring is not None
+        interval = self.MIN_POLL_INTERVAL
+
+        while True:
+            records = self._ring.pop_all()
+
+            for record in records:
+                try:
+                    message = json.loads(record.decode())
+                except (UnicodeDecodeError, json.JSONDecodeError):
+                    self.invalid += 1
+                    continue
+
+                self.received += 1
+                self._callback(message, self.name)
+
+            interval = (
+                self.MIN_POLL_INTERVAL if records
+                else min(interval * 2, self.MAX_POLL_INTERVAL)
+            )
+            await asyncio.sleep(interval)
+
+
+async def open_telemetry_writer(
+    endpoint: Endpoint,
+    loss_rate: float = 0.0,
+    retry_interval: float = 0.5
+) -> Any:
+    """Open a telemetry writer for a `udp` or `shm` endpoint.
+
+    Shared memory rings are created by their reader, so this function waits
+    until the segment exists.
+
+    Args:
+        endpoint (Endpoint): Telemetry endpoint.
+        loss_rate (float): Synthetic loss probability (`udp` only).
+        retry_interval (float): Seconds between attempts to attach to a
+            shared memory ring that does not exist yet.
+
+    Returns:
+        Any: Writer with `write`/`drain` interface.
+    """
+    if endpoint.scheme == "udp":
+        return await open_datagram_writer(
+            endpoint.host,
+            endpoint.port,
+            loss_rate
+        )
+
+    if endpoint.scheme == "shm":
+        while True:
+            try:
+                return ShmTelemetryWriter(ShmRingBuffer(endpoint.path))
+            except FileNotFoundError:
+                await asyncio.sleep(retry_interval)
+
+    raise ValueError(f"{endpoint} is not a telemetry address")
+
+
+def create_telemetry_reader(
+    endpoint: Endpoint,
+    callback: Callable[[dict, Any], Any]
+) -> Any:
+    """Create a telemetry reader for a `udp` or `shm` endpoint.
+
+    Args:
+        endpoint (Endpoint): Telemetry endpoint.
+        callback (Callable[[dict, Any], Any]): Function called with every
+            fresh decoded message and its origin.
+
+    Returns:
+        Any: Reader with `start`/`close` interface.
+    """
+    if endpoint.scheme == "udp":
+        return TelemetryReceiver(endpoint.host, endpoint.port, callback)
+
+    if endpoint.scheme == "shm":
+        return ShmTelemetryReader(endpoint.path, callback)
+
+    raise ValueError(f"{endpoint} is not a telemetry address")
+
+
+def parse_telemetry_addresses(
+    addresses: Optional[str | Iterable[str]]
+) -> list[Endpoint]:
+    """Parse one or more telemetry addresses.
+
+    Args:
+        addresses (str | Iterable[str] | None): Telemetry address or
+            addresses.
+
+    Returns:
+        list[Endpoint]: Parsed telemetry endpoints.
+
+    Raises:
+        ValueError: If any address is not a telemetry address.
+    """
+    if addresses is None:
+        return []
+
+    if isinstance(addresses, str):
+        addresses = [addresses]
+
+    endpoints = [parse_address(address) for address in addresses]
+    for endpoint in endpoints:
+        if endpoint.scheme not in TELEMETRY_SCHEMES:
+            raise ValueError(f"{endpoint} is not a telemetry address")
+
+    return endpoints
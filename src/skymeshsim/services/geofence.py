@@ -0,0 +1,348 @@
+"""Geofence service module.
+
+This module checks the fleet against the allowed airspace: the boundary of
+the operating country and any number of no-fly zones, optionally limited to
+an altitude band.
+
+Zone geometries are loaded once, prepared and indexed in an STRtree. Every
+update queries the tree with all drone positions at once to find the zones
+whose bounding box holds each drone, and tests those candidate pairs with a
+single vectorized `contains_xy` call. Zone memberships are kept between
+updates, so only the drones that entered or left a zone produce events.
+
+Author:
+    Paulo Sanchez (@erlete)
+"""
+
+
+from __future__ import annotations
+
+import time
+from typing import Any, NamedTuple, Optional, Sequence
+
+import numpy as np
+import shapely
+
+from ..network.utils import ArrayLike
+
+ALLOWED = "allowed"
+NO_FLY = "no-fly"
+
+
+class Zone(NamedTuple):
+    """Geofence zone.
+
+    Attributes:
+        name (str): Zone name.
+        geometry (Any): Shapely (multi)polygon in longitude and latitude.
+        kind (str): `allowed` for areas that drones must stay within, or
+            `no-fly` for areas that drones must not enter.
+        floor (float): Lowest altitude of the zone in meters.
+        ceiling (float): Highest altitude of the zone in meters.
+    """
+
+    name: str
+    geometry: Any
+    kind: str = NO_FLY
+    floor: float = -np.inf
+    ceiling: float = np.inf
+
+
+class GeofenceEvent(NamedTuple):
+    """Drone entering or leaving a zone.
+
+    Attributes:
+        time (float): Update time in seconds.
+        drone (int): Drone index.
+        zone (Zone): Zone entered or left.
+        entered (bool): True if the drone entered the zone, False if it left.
+    """
+
+    time: float
+    drone: int
+    zone: Zone
+    entered: bool
+
+    @property
+    def violation(self) -> bool:
+        """Check whether the event breaks the geofence.
+
+        Returns:
+            bool: True if the drone entered a no-fly zone or left an allowed
+                zone.
+        """
+        return self.entered == (self.zone.kind == NO_FLY)
+
+    def __str__(self) -> str:
+        """Get readable event representation.
+
+        Returns:
+            str: Readable event representation.
+        """
+        action = "entered" if self.entered else "left"
+        return (
+            f"t = {self.time:.1f} s: drone {self.drone} {action} "
+            + f"{self.zone.kind} zone {self.zone.name!r}"
+        )
+
+
+class Geofence:
+    """Vectorized geofence of a fleet.
+
+    Drones are identified by their index in the arrays given to `update`;
+    positions with NaN coordinates are outside of every zone.
+
+    Attributes:
+        zones (list[Zone]): Geofence zones.
+        time (float): Time of the last update in seconds.
+    """
+
+    def __init__(self, zones: Sequence[Zone]) -> None:
+        """Initialize a Geofence instance.
+
+        Args:
+            zones (Sequence[Zone]): Geofence zones.
+        """
+        for zone in zones:
+            if zone.kind not in (ALLOWED, NO_FLY):
+                raise ValueError(
+                    f"expected {ALLOWED} or {NO_FLY} zone but got"
+                    + f" {zone.kind!r} instead"
+                )
+
+        self.zones = list(zones)
+        self.time = 0.0
+
+        self._geometries = np.array(
+            [zone.geometry for zone in self.zones], dtype=object
+        )
+        shapely.prepare(self._geometries)
+        self._tree = shapely.STRtree(self._geometries)
+
+        self._floors = np.array([zone.floor for zone in self.zones])
+        self._ceilings = np.array([zone.ceiling for zone in self.zones])
+        self._allowed = np.flatnonzero(
+            [zone.kind == ALLOWED for zone in self.zones]
+        )
+        self._no_fly = np.flatnonzero(
+            [zone.kind == NO_FLY for zone in self.zones]
+        )
+
+        self._count = 0
+        self._memberships = np.empty(0, dtype=np.int64)
+
+    @classmethod
+    def from_country(
+        cls,
+        country: str = "Spain",
+        zones: Sequence[Zone] = ()
+    ) -> Geofence:
+        """Create a geofence within the boundary of a country.
+
+        Args:
+            country (str): Natural Earth `ADMIN` name of the country.
+            zones (Sequence[Zone]): Additional zones, e.g. no-fly zones.
+
+        Returns:
+            Geofence: Geofence of the country.
+        """
+        # pylint: disable=import-outside-toplevel
+        from ..network.raster_cache import country_geometry
+
+        return cls([
+            Zone(country, country_geometry(country), ALLOWED),
+            *zones
+        ])
+
+    @staticmethod
+    def read_zones(
+        path: str,
+        name_field: str = "name",
+        kind: str = NO_FLY
+    ) -> list[Zone]:
+        """Read zones from a vector file (GeoJSON, shapefile...).
+
+        Optional `floor` and `ceiling` attribute columns set the altitude
+        band of every zone in meters.
+
+        Args:
+            path (str): Vector file path.
+            name_field (str): Attribute column with the zone names. Zones
+                are numbered if missing.
+            kind (str): Kind of every zone.
+
+        Returns:
+            list[Zone]: Zones in longitude and latitude.
+        """
+        import geopandas as gpd  # pylint: disable=import-outside-toplevel
+
+        frame = gpd.read_file(path).to_crs("EPSG:4326")
+        zones = []
+        for index, row in enumerate(frame.itertuples()):
+            floor = getattr(row, "floor", None)
+            ceiling = getattr(row, "ceiling", None)
+            zones.append(Zone(
+                str(getattr(row, name_field, index)),
+                row.geometry,
+                kind,
+                -np.inf if floor is None or np.isnan(floor) else floor,
+                np.inf if ceiling is None or np.isnan(ceiling) else ceiling
+            ))
+
+        return zones
+
+    def contains(
+        self,
+        longitude: ArrayLike,
+        latitude: ArrayLike,
+        altitude: Optional[ArrayLike] = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Find the zones that contain every drone.
+
+        Args:
+            longitude (ArrayLike): Drone longitudes.
+            latitude (ArrayLike): Drone latitudes.
+            altitude (ArrayLike | None): Drone altitudes in meters. Altitude
+                bands are ignored if None.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Drone and zone indices of every
+                drone inside a zone, sorted by drone.
+        """
+        longitude = np.asarray(longitude, dtype=float).reshape(-1)
+        latitude = np.asarray(latitude, dtype=float).reshape(-1)
+
+        # Candidate pairs by bounding box, then exact tests of the pairs:
+        drones, zones = self._tree.query(shapely.points(longitude, latitude))
+        inside = shapely.contains_xy(
+            self._geometries[zones], longitude[drones], latitude[drones]
+        )
+
+        if altitude is not None:
+            altitude = np.broadcast_to(
+                np.asarray(altitude, dtype=float).reshape(-1),
+                longitude.shape
+            )[drones]
+            inside &= (
+                (altitude >= self._floors[zones])
+                & (altitude <= self._ceilings[zones])
+            )
+
+        order = np.argsort(drones[inside], kind="stable")
+        return drones[inside][order], zones[inside][order]
+
+    def update(
+        self,
+        longitude: ArrayLike,
+        latitude: ArrayLike,
+        altitude: Optional[ArrayLike] = None,
+        time_: Optional[float] = None
+    ) -> list[GeofenceEvent]:
+        """Move the drones and find the zones they entered or left.
+
+        Args:
+            longitude (ArrayLike): Drone longitudes.
+            latitude (ArrayLike): Drone latitudes.
+            altitude (ArrayLike | None): Drone altitudes in meters.
+            time_ (float | None): Update time in seconds. Defaults to the
+                previous time.
+
+        Returns:
+            list[GeofenceEvent]: Events since the previous update, by drone.
+                Drones that appear in an update enter their zones; drones
+                that disappear leave them silently.
+        """
+        if time_ is not None:
+            self.time = time_
+
+        drones, zones = self.contains(longitude, latitude, altitude)
+        memberships = np.sort(
+            drones.astype(np.int64) * len(self.zones) + zones
+        )
+
+        count = np.asarray(longitude).size
+        previous = self._memberships
+        if count < self._count:
+            previous = previous[previous < count * len(self.zones)]
+
+        entered = np.setdiff1d(memberships, previous, assume_unique=True)
+        left = np.setdiff1d(previous, memberships, assume_unique=True)
+        self._memberships = memberships
+        self._count = count
+
+        events = [
+            GeofenceEvent(self.time, drone, self.zones[zone], flag)
+            for keys, flag in ((entered, True), (left, False))
+            for drone, zone in zip(*(
+                array.tolist() for array in np.divmod(keys, len(self.zones))
+            ))
+        ]
+        events.sort(key=lambda event: event.drone)
+
+        return events
+
+    def violations(self) -> np.ndarray:
+        """Find the drones outside of the allowed airspace at the last
+        update.
+
+        Drones break the geofence inside any no-fly zone or, if there are
+        allowed zones, outside of all of them.
+
+        Returns:
+            np.ndarray: Sorted indices of the offending drones.
+        """
+        drones, zones = np.divmod(self._memberships, max(len(self.zones), 1))
+        offending = np.isin(zones, self._no_fly)
+        violating = set(drones[offending].tolist())
+
+        if len(self._allowed):
+            allowed = drones[np.isin(zones, self._allowed)]
+            violating.update(
+                np.setdiff1d(np.arange(self._count), allowed).tolist()
+            )
+
+        return np.array(sorted(violating), dtype=np.intp)
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+
+    # Country boundary and 300 circular no-fly zones (airports, heliports,
+    # restricted areas) of 0.5 to 3 km, around the operating area:
+    zone_count = 300
+    centers = np.column_stack((
+        rng.uniform(-1.0, 0.2, zone_count),
+        rng.uniform(39.0, 40.0, zone_count)
+    ))
+    no_fly_zones = [
+        Zone(f"zone-{index}", shapely.Point(center).buffer(radius / 111_000),
+             floor=0.0, ceiling=rng.choice([120.0, 300.0, np.inf]))
+        for index, (center, radius) in enumerate(
+            zip(centers, rng.uniform(500, 3_000, zone_count))
+        )
+    ]
+    geofence = Geofence.from_country("Spain", no_fly_zones)
+
+    # Drones flying at 15 m/s at telemetry rate (10 Hz), some over the sea:
+    fleet_size = 5_000
+    tick = 0.1
+    lon = rng.uniform(-1.0, 0.2, fleet_size)
+    lat = rng.uniform(39.0, 40.0, fleet_size)
+    alt = rng.uniform(50, 400, fleet_size)
+    heading = rng.uniform(0, 2 * np.pi, fleet_size)
+
+    geofence.update(lon, lat, alt, 0.0)
+    ticks = 100
+    event_count = 0
+    start = time.perf_counter()
+    for step in range(1, ticks + 1):
+        heading += rng.normal(0, 0.1, fleet_size)
+        lon += 15 * tick * np.sin(heading) / 86_000
+        lat += 15 * tick * np.cos(heading) / 111_000
+        event_count += len(geofence.update(lon, lat, alt, step * tick))
+    elapsed = (time.perf_counter() - start) / ticks
+
+    print(f"{fleet_size} drones, {len(geofence.zones)} zones: "
+          + f"{elapsed * 1e3:.2f} ms per tick, "
+          + f"{event_count / ticks:.1f} events per tick, "
+          + f"{len(geofence.violations())} drones violating")
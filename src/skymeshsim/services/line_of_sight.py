@@ -0,0 +1,440 @@
+"""Line-of-sight service module.
+
+This module checks whether pairs of points (drones, ground stations) see each
+other over the terrain, and by how much the line between them clears it.
+
+Lines are sampled every `step` meters between their endpoints and compared
+with the DEM elevations of the `TerrainService`, lowered by the curvature of
+the Earth. Atmospheric refraction bends radio waves towards the ground, which
+is modelled with the usual effective Earth radius of 4/3 times the actual
+one. Pairs are marched together in chunks of a few samples, with one batched
+elevation query per chunk, and pairs that are already blocked leave the
+march early.
+
+Ground stations do not move, so the terrain around them is sampled once on a
+polar grid (one ray per azimuth bin, narrow enough for rays to stay within
+half a step of the exact line) and cached. Checks from a station then gather
+the samples of the nearest ray instead of querying the DEM.
+
+Author:
+    Paulo Sanchez (@erlete)
+"""
+
+
+from __future__ import annotations
+
+import math
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from ..network.utils import (EARTH_RADIUS, ArrayLike, LocalProjection,
+                             equirectangular_distance)
+from .terrain import TerrainService
+
+REFRACTION_FACTOR = 4 / 3
+
+
+class LineOfSightResult(NamedTuple):
+    """Line-of-sight of many pairs.
+
+    Attributes:
+        visible (np.ndarray): Whether the line of every pair clears the
+            terrain.
+        clearance (np.ndarray): Lowest height of every line above the
+            terrain between its endpoints in meters, negative if blocked and
+            infinite if no terrain sample lies between them. With early
+            exit, the clearance of blocked pairs is the lowest one among the
+            samples marched before the exit.
+    """
+
+    visible: np.ndarray
+    clearance: np.ndarray
+
+
+class GroundStation:
+    """Static line-of-sight endpoint with cached terrain samples.
+
+    Attributes:
+        longitude (float): Longitude.
+        latitude (float): Latitude.
+        altitude (float): Antenna altitude above sea level in meters.
+        step (float): Distance between terrain samples in meters.
+        max_range (float): Distance covered by the cached samples in meters.
+        projection (LocalProjection): Local plane centered on the station.
+        profiles (np.ndarray): Terrain elevations along every azimuth ray,
+            lowered by the Earth curvature, with shape (azimuths, samples).
+            Sample `k` lies `(k + 1) * step` meters away from the station.
+    """
+
+    def __init__(
+        self,
+        terrain: TerrainService,
+        longitude: float,
+        latitude: float,
+        height: float = 10.0,
+        step: float = 500.0,
+        max_range: float = 30_000.0,
+        refraction: float = REFRACTION_FACTOR
+    ) -> None:
+        """Initialize a GroundStation instance.
+
+        Args:
+            terrain (TerrainService): Terrain elevations.
+            longitude (float): Longitude.
+            latitude (float): Latitude.
+            height (float): Antenna height above the terrain in meters.
+            step (float): Distance between terrain samples in meters.
+            max_range (float): Distance covered by the cached samples in
+                meters. Farther targets are checked by marching.
+            refraction (float): Effective Earth radius factor.
+        """
+        self.longitude = float(longitude)
+        self.latitude = float(latitude)
+        self.step = float(step)
+        self.max_range = float(max_range)
+        self.projection = LocalProjection(longitude, latitude)
+
+        ground = terrain.elevation(longitude, latitude)
+        self.altitude = (0.0 if math.isnan(ground) else ground) + height
+
+        # Rays no farther apart than one step at the maximum range:
+        azimuths = max(int(math.ceil(2 * math.pi * max_range / step)), 8)
+        samples = max(int(max_range // step), 1)
+        angles = np.arange(azimuths) * (2 * math.pi / azimuths)
+        distances = np.arange(1, samples + 1) * self.step
+
+        longitudes, latitudes = self.projection.to_geodetic(
+            np.sin(angles)[:, np.newaxis] * distances,
+            np.cos(angles)[:, np.newaxis] * distances
+        )
+        elevations = np.nan_to_num(terrain.elevations(longitudes, latitudes))
+        self.profiles = (
+            elevations
+            - distances ** 2 / (2 * refraction * EARTH_RADIUS)
+        ).astype(np.float32)
+
+        self._refraction = refraction
+
+    def check(
+        self,
+        longitude: ArrayLike,
+        latitude: ArrayLike,
+        altitude: ArrayLike
+    ) -> LineOfSightResult:
+        """Check the line of sight from the station to many points.
+
+        Points beyond the maximum range are reported as not visible, with a
+        NaN clearance.
+
+        Args:
+            longitude (ArrayLike): Longitudes.
+            latitude (ArrayLike): Latitudes.
+            altitude (ArrayLike): Altitudes above sea level in meters.
+
+        Returns:
+            LineOfSightResult: Line of sight of every point.
+        """
+        east, north = self.projection.to_enu(
+            np.asarray(longitude, dtype=float).reshape(-1),
+            np.asarray(latitude, dtype=float).reshape(-1)
+        )
+        altitude = np.broadcast_to(
+            np.asarray(altitude, dtype=float).reshape(-1), east.shape
+        )
+        distance = np.hypot(east, north)
+
+        azimuths, samples = self.profiles.shape
+        rays = np.rint(
+            np.arctan2(east, north) * (azimuths / (2 * math.pi))
+        ).astype(np.intp) % azimuths
+
+        # Straight line in the tangent plane of the station, towards the
+        # target lowered by the Earth curvature:
+        target = altitude - distance ** 2 / (
+            2 * self._refraction * EARTH_RADIUS
+        )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = (target - self.altitude) / distance
+
+        distances = np.arange(1, samples + 1) * self.step
+        margins = (
+            self.altitude + slope[:, np.newaxis] * distances
+            - self.profiles[rays]
+        )
+        margins[distances >= distance[:, np.newaxis]] = np.inf
+
+        clearance = margins.min(axis=1, initial=np.inf)
+        clearance[distance > self.max_range] = np.nan
+
+        return LineOfSightResult(clearance > 0, clearance)
+
+
+class LineOfSight:
+    """Batched terrain line-of-sight engine.
+
+    Attributes:
+        terrain (TerrainService): Terrain elevations. Unknown elevations
+            (the sea, outside of the DEM) are taken as sea level.
+        step (float): Distance between terrain samples in meters.
+        refraction (float): Effective Earth radius factor.
+        chunk (int): Samples marched per batched elevation query.
+        max_range (float): Range of the cached ground station samples in
+            meters.
+        cache_size (int): Maximum number of cached ground stations.
+    """
+
+    def __init__(
+        self,
+        terrain: Optional[TerrainService] = None,
+        step: Optional[float] = None,
+        refraction: float = REFRACTION_FACTOR,
+        chunk: int = 8,
+        max_range: float = 30_000.0,
+        cache_size: int = 16
+    ) -> None:
+        """Initialize a LineOfSight instance.
+
+        Args:
+            terrain (TerrainService | None): Terrain elevations. Defaults to
+                the bundled DEM.
+            step (float | None): Distance between terrain samples in meters.
+                Defaults to half the DEM pixel size at its center latitude.
+            refraction (float): Effective Earth radius factor.
+            chunk (int): Samples marched per batched elevation query.
+            max_range (float): Range of the cached ground station samples in
+                meters.
+            cache_size (int): Maximum number of cached ground stations.
+        """
+        self.terrain = terrain if terrain is not None else TerrainService()
+        self.refraction = refraction
+        self.chunk = chunk
+        self.max_range = max_range
+        self.cache_size = cache_size
+
+        if step is None:
+            left, right, bottom, top = self.terrain.bounds
+            pixel = min(
+                float(equirectangular_distance(
+                    left, (bottom + top) / 2,
+                    left + self.terrain.resolution[0], (bottom + top) / 2
+                )),
+                float(equirectangular_distance(
+                    left, bottom, left, bottom + self.terrain.resolution[1]
+                ))
+            )
+            step = pixel / 2
+
+        if step <= 0:
+            raise ValueError(
+                f"expected positive step but got {step} instead"
+            )
+
+        self.step = step
+        self._stations: OrderedDict[tuple, GroundStation] = OrderedDict()
+
+    def check(
+        self,
+        longitude_1: ArrayLike,
+        latitude_1: ArrayLike,
+        altitude_1: ArrayLike,
+        longitude_2: ArrayLike,
+        latitude_2: ArrayLike,
+        altitude_2: ArrayLike,
+        early_exit: bool = True
+    ) -> LineOfSightResult:
+        """Check the line of sight between many pairs of points.
+
+        Args:
+            longitude_1 (ArrayLike): Longitudes of the first points.
+            latitude_1 (ArrayLike): Latitudes of the first points.
+            altitude_1 (ArrayLike): Altitudes of the first points above sea
+                level in meters.
+            longitude_2 (ArrayLike): Longitudes of the second points.
+            latitude_2 (ArrayLike): Latitudes of the second points.
+            altitude_2 (ArrayLike): Altitudes of the second points above sea
+                level in meters.
+            early_exit (bool): Whether to stop marching blocked pairs, which
+                only need their visibility. The clearance of every pair is
+                exact otherwise.
+
+        Returns:
+            LineOfSightResult: Line of sight of every pair.
+        """
+        lon_1, lat_1, alt_1, lon_2, lat_2, alt_2 = (
+            array.ravel() for array in np.broadcast_arrays(*(
+                np.asarray(value, dtype=float) for value in (
+                    longitude_1, latitude_1, altitude_1,
+                    longitude_2, latitude_2, altitude_2
+                )
+            ))
+        )
+        distance = np.asarray(
+            equirectangular_distance(lon_1, lat_1, lon_2, lat_2)
+        )
+        samples = np.ceil(distance / self.step).astype(np.intp) - 1
+        bulge = distance ** 2 / (2 * self.refraction * EARTH_RADIUS)
+
+        clearance = np.full(distance.shape, np.inf)
+        active = np.flatnonzero(samples > 0)
+        first = 1
+
+        while len(active):
+            steps = np.arange(first, first + self.chunk)
+            marched = steps <= samples[active, np.newaxis]
+            fraction = (
+                steps * self.step / distance[active, np.newaxis]
+            )[marched]
+            pairs = np.nonzero(marched)[0]
+            index = active[pairs]
+
+            elevation = np.nan_to_num(self.terrain.elevations(
+                lon_1[index] + fraction * (lon_2[index] - lon_1[index]),
+                lat_1[index] + fraction * (lat_2[index] - lat_1[index])
+            ))
+            height = (
+                alt_1[index] + fraction * (alt_2[index] - alt_1[index])
+                - fraction * (1 - fraction) * bulge[index]
+            )
+
+            lowest = np.full(len(active), np.inf)
+            np.minimum.at(lowest, pairs, height - elevation)
+            clearance[active] = np.minimum(clearance[active], lowest)
+
+            first += self.chunk
+            remaining = samples[active] >= first
+            if early_exit:
+                remaining &= clearance[active] > 0
+
+            active = active[remaining]
+
+        return LineOfSightResult(clearance > 0, clearance)
+
+    def station(
+        self,
+        longitude: float,
+        latitude: float,
+        height: float = 10.0
+    ) -> GroundStation:
+        """Get a ground station with cached terrain samples.
+
+        Args:
+            longitude (float): Longitude.
+            latitude (float): Latitude.
+            height (float): Antenna height above the terrain in meters.
+
+        Returns:
+            GroundStation: Cached ground station.
+        """
+        key = (longitude, latitude, height)
+        station = self._stations.get(key)
+
+        if station is None:
+            station = GroundStation(
+                self.terrain, longitude, latitude, height,
+                step=self.step,
+                max_range=self.max_range,
+                refraction=self.refraction
+            )
+            self._stations[key] = station
+            if len(self._stations) > self.cache_size:
+                self._stations.popitem(last=False)
+        else:
+            self._stations.move_to_end(key)
+
+        return station
+
+    def check_station(
+        self,
+        station: GroundStation,
+        longitude: ArrayLike,
+        latitude: ArrayLike,
+        altitude: ArrayLike
+    ) -> LineOfSightResult:
+        """Check the line of sight from a ground station to many points.
+
+        Points within the cached range use the station samples; farther
+        points are marched.
+
+        Args:
+            station (GroundStation): Ground station.
+            longitude (ArrayLike): Longitudes.
+            latitude (ArrayLike): Latitudes.
+            altitude (ArrayLike): Altitudes above sea level in meters.
+
+        Returns:
+            LineOfSightResult: Line of sight of every point.
+        """
+        result = station.check(longitude, latitude, altitude)
+
+        far = np.flatnonzero(np.isnan(result.clearance))
+        if len(far):
+            marched = self.check(
+                station.longitude, station.latitude, station.altitude,
+                np.asarray(longitude, dtype=float).reshape(-1)[far],
+                np.asarray(latitude, dtype=float).reshape(-1)[far],
+                np.broadcast_to(
+                    np.asarray(altitude, dtype=float).reshape(-1),
+                    result.clearance.shape
+                )[far]
+            )
+            result.visible[far] = marched.visible
+            result.clearance[far] = marched.clearance
+
+        return result
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    line_of_sight = LineOfSight()
+    batch_size = 20_000
+
+    # Drone pairs up to 20 km apart, 50 to 300 m above the terrain, in the
+    # hills west of the operating area:
+    lon_a = rng.uniform(-1.0, -0.5, batch_size)
+    lat_a = rng.uniform(39.3, 39.7, batch_size)
+    bearing = rng.uniform(0, 2 * np.pi, batch_size)
+    separation = rng.uniform(1_000, 20_000, batch_size)
+    lon_b = lon_a + separation * np.sin(bearing) / 86_000
+    lat_b = lat_a + separation * np.cos(bearing) / 111_000
+    alt_a = (
+        np.nan_to_num(line_of_sight.terrain.elevations(lon_a, lat_a))
+        + rng.uniform(50, 300, batch_size)
+    )
+    alt_b = (
+        np.nan_to_num(line_of_sight.terrain.elevations(lon_b, lat_b))
+        + rng.uniform(50, 300, batch_size)
+    )
+
+    line_of_sight.check(lon_a, lat_a, alt_a, lon_b, lat_b, alt_b)  # Warm-up
+    for exits in (True, False):
+        start = time.perf_counter()
+        pairs = line_of_sight.check(
+            lon_a, lat_a, alt_a, lon_b, lat_b, alt_b, early_exit=exits
+        )
+        elapsed = time.perf_counter() - start
+        print(f"{batch_size} drone pairs (early exit: {exits}): "
+              + f"{elapsed * 1e3:.1f} ms ({batch_size / elapsed:,.0f} pairs/s,"
+              + f" {pairs.visible.mean():.1%} visible)")
+
+    start = time.perf_counter()
+    ground = line_of_sight.station(-0.75, 39.5, height=20.0)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cached = line_of_sight.check_station(ground, lon_b, lat_b, alt_b)
+    elapsed = time.perf_counter() - start
+    marched = line_of_sight.check(
+        ground.longitude, ground.latitude, ground.altitude,
+        lon_b, lat_b, alt_b, early_exit=False
+    )
+
+    print(f"Ground station with {ground.profiles.size} cached samples "
+          + f"({build * 1e3:.0f} ms to build):")
+    print(f"  {batch_size} drones: {elapsed * 1e3:.1f} ms "
+          + f"({batch_size / elapsed:,.0f} checks/s, "
+          + f"{cached.visible.mean():.1%} visible, "
+          + f"{(cached.visible == marched.visible).mean():.2%} agree with "
+          + "marching)")
@@ -3,6 +3,397 @@
 This module provides the Population service, which is responsible for
 providing information about the population density of an area.
 
+Population densities (people per square kilometer) are converted once to
+people per cell, using the exact area of every cell on the WGS84 sphere, and
+integrated into a summed-area table that is cached on disk. Since density is
+uniform within a cell, the population of any axis-aligned rectangle is an
+exact bilinear interpolation of the table at its four corners. Circles and
+polygons are approximated by stacks of rectangles, and every query is
+vectorized over many drones.
+
 Author:
     Paulo Sanchez (@erlete)
 """
+
+
+from __future__ import annotations
+
+import math
+import time
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from ..network.raster_cache import POPULATION_PATH, RasterCache
+from ..network.utils import (COVER_RADIUS, EARTH_RADIUS, ArrayLike,
+                             LocalProjection, radius_to_lat_lon_units)
+
+
+def _build_tables(path: str) -> tuple[dict[str, np.ndarray], dict[str, Any]]:
+    import rasterio  # pylint: disable=import-outside-toplevel
+
+    with rasterio.open(path) as dataset:
+        density = dataset.read(1, masked=True).filled(0).astype(np.float32)
+        transform = dataset.transform
+
+    density = np.clip(density, 0, None)
+
+    # Area of every row of cells in square kilometers:
+    rows = np.arange(density.shape[0] + 1)
+    edges = np.radians(transform.f + transform.e * rows)
+    row_area = (
+        (EARTH_RADIUS / 1000) ** 2 * math.radians(abs(transform.a))
+        * np.abs(np.diff(np.sin(edges)))
+    )
+
+    table = np.zeros((density.shape[0] + 1, density.shape[1] + 1))
+    np.cumsum(density * row_area[:, np.newaxis], axis=0, out=table[1:, 1:])
+    np.cumsum(table[1:, 1:], axis=1, out=table[1:, 1:])
+
+    return {"density": density, "table": table, "row_area": row_area}, {
+        "transform": list(transform)[:6]
+    }
+
+
+class PopulationService:
+    """Population service class.
+
+    Attributes:
+        path (str): Population density raster path (people per square
+            kilometer, north-up, EPSG:4326).
+        bounds (tuple[float, float, float, float]): Left, right, bottom and
+            top of the raster.
+        total (float): Total population of the raster.
+    """
+
+    def __init__(
+        self,
+        path: str = POPULATION_PATH,
+        cache: Optional[RasterCache] = None
+    ) -> None:
+        """Initialize a PopulationService instance.
+
+        Args:
+            path (str): Population density raster path.
+            cache (RasterCache | None): Cache storing the summed-area table.
+                Defaults to a cache in the default directory.
+        """
+        self.path = path
+
+        arrays, meta = (cache or RasterCache()).get_or_build(
+            "population-sat",
+            [path],
+            {},
+            lambda: _build_tables(path)
+        )
+        self._density = arrays["density"]
+        self._table = arrays["table"]
+        self._row_area = arrays["row_area"]
+
+        transform = meta["transform"]
+        self._origin = (transform[2], transform[5])
+        self._resolution = (transform[0], transform[4])
+        self._shape = self._density.shape
+
+        self.bounds = (
+            self._origin[0],
+            self._origin[0] + self._resolution[0] * self._shape[1],
+            self._origin[1] + self._resolution[1] * self._shape[0],
+            self._origin[1]
+        )
+        self.total = float(self._table[-1, -1])
+
+    def densities(
+        self,
+        longitude: ArrayLike,
+        latitude: ArrayLike
+    ) -> np.ndarray:
+        """Get the population densities at many points.
+
+        Args:
+            longitude (ArrayLike): Longitudes.
+            latitude (ArrayLike): Latitudes.
+
+        Returns:
+            np.ndarray: Densities in people per square kilometer, NaN outside
+                of the raster.
+        """
+        column, row = self._pixel(longitude, latitude)
+        column = np.floor(column).astype(np.intp)
+        row = np.floor(row).astype(np.intp)
+
+        inside = (
+            (column >= 0) & (column < self._shape[1])
+            & (row >= 0) & (row < self._shape[0])
+        )
+        result = np.full(column.shape, np.nan)
+        result[inside] = self._density[row[inside], column[inside]]
+
+        return result
+
+    def rectangle_sums(
+        self,
+        left: ArrayLike,
+        right: ArrayLike,
+        bottom: ArrayLike,
+        top: ArrayLike
+    ) -> np.ndarray:
+        """Get the population of many longitude-latitude rectangles.
+
+        Args:
+            left (ArrayLike): West longitudes.
+            right (ArrayLike): East longitudes.
+            bottom (ArrayLike): South latitudes.
+            top (ArrayLike): North latitudes.
+
+        Returns:
+            np.ndarray: Number of people in every rectangle.
+        """
+        column_0, row_0 = self._pixel(left, top)
+        column_1, row_1 = self._pixel(right, bottom)
+        return self._pixel_sums(column_0, column_1, row_0, row_1)
+
+    def circle_sums(
+        self,
+        longitude: ArrayLike,
+        latitude: ArrayLike,
+        radius: ArrayLike = COVER_RADIUS,
+        strips: int = 8
+    ) -> np.ndarray:
+        """Get the population of many circles (e.g. drone coverage areas).
+
+        Each circle is approximated by `strips` rectangles of equal height,
+        whose widths preserve the area of the corresponding circle slices.
+
+        Args:
+            longitude (ArrayLike): Center longitudes.
+            latitude (ArrayLike): Center latitudes.
+            radius (ArrayLike): Radii in meters.
+            strips (int): Number of rectangles per circle.
+
+        Returns:
+            np.ndarray: Number of people in every circle.
+        """
+        longitude, latitude, radius = np.broadcast_arrays(
+            np.asarray(longitude, dtype=float),
+            np.asarray(latitude, dtype=float),
+            np.asarray(radius, dtype=float)
+        )
+        delta_lat, delta_lon = map(np.asarray, radius_to_lat_lon_units(
+            latitude, longitude, radius
+        ))
+
+        # Strip edges and area-preserving half widths on the unit circle:
+        edges = np.linspace(-1.0, 1.0, strips + 1)
+        half_widths = np.diff(
+            edges * np.sqrt(1 - edges ** 2) + np.arcsin(edges)
+        ) / (2 * np.diff(edges))
+
+        center_x = longitude[..., np.newaxis]
+        center_y = latitude[..., np.newaxis]
+        sums = self.rectangle_sums(
+            center_x - half_widths * delta_lon[..., np.newaxis],
+            center_x + half_widths * delta_lon[..., np.newaxis],
+            center_y + edges[:-1] * delta_lat[..., np.newaxis],
+            center_y + edges[1:] * delta_lat[..., np.newaxis]
+        )
+
+        return sums.sum(axis=-1)
+
+    def polygon_sum(self, polygon: Any, min_scanlines: int = 32) -> float:
+        """Get the population of a polygon.
+
+        The polygon is scanned by horizontal bands: the population of every
+        band is the sum of the rectangles between pairs of boundary crossings
+        at the middle of the band (even-odd rule, so holes are supported).
+        Bands never span more than one raster row, so large polygons cost one
+        band per row.
+
+        Args:
+            polygon (Any): Shapely polygon or multipolygon, or N x 2 array of
+                longitude-latitude vertices of a simple polygon.
+            min_scanlines (int): Minimum number of bands, which bounds the
+                error of polygons smaller than a few raster rows.
+
+        Returns:
+            float: Number of people in the polygon.
+        """
+        rings = _rings(polygon)
+        if not rings:
+            return 0.0
+
+        vertices = np.concatenate(rings)
+        start = np.concatenate([ring[:-1] for ring in rings])
+        end = np.concatenate([ring[1:] for ring in rings])
+
+        x_start, y_start = self._pixel(start[:, 0], start[:, 1])
+        x_end, y_end = self._pixel(end[:, 0], end[:, 1])
+        _, y_vertices = self._pixel(vertices[:, 0], vertices[:, 1])
+
+        # Scanline bands, split at raster row edges and at vertices, so that
+        # each band lies within one raster row and between two vertices:
+        y_min = max(float(y_vertices.min()), 0.0)
+        y_max = min(float(y_vertices.max()), float(self._shape[0]))
+        if y_min >= y_max:
+            return 0.0
+
+        bands = np.unique(np.concatenate((
+            np.arange(math.ceil(y_min), math.floor(y_max) + 1),
+            y_vertices[(y_vertices > y_min) & (y_vertices < y_max)],
+            np.linspace(y_min, y_max, min_scanlines + 1)
+        )))
+        row_0 = bands[:-1]
+        row_1 = bands[1:]
+        scanline = ((row_0 + row_1) / 2)[:, np.newaxis]
+
+        # Crossings of every edge with every scanline (NaN if none):
+        crosses = (y_start <= scanline) != (y_end <= scanline)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            crossings = np.where(
+                crosses,
+                x_start + (scanline - y_start) * (x_end - x_start)
+                / (y_end - y_start),
+                np.nan
+            )
+
+        crossings.sort(axis=1)  # NaN values are sorted last
+        pairs = crossings.shape[1] // 2
+        enter = crossings[:, 0:2 * pairs:2]
+        leave = crossings[:, 1:2 * pairs:2]
+        valid = ~(np.isnan(enter) | np.isnan(leave))
+
+        row_0 = np.broadcast_to(row_0[:, np.newaxis], enter.shape)
+        row_1 = np.broadcast_to(row_1[:, np.newaxis], enter.shape)
+
+        return float(self._pixel_sums(
+            enter[valid], leave[valid], row_0[valid], row_1[valid]
+        ).sum())
+
+    def corridor_sum(
+        self,
+        longitude: ArrayLike,
+        latitude: ArrayLike,
+        half_width: float
+    ) -> float:
+        """Get the population of a route corridor.
+
+        Args:
+            longitude (ArrayLike): Route vertex longitudes.
+            latitude (ArrayLike): Route vertex latitudes.
+            half_width (float): Distance from the route to the corridor edge
+                in meters.
+
+        Returns:
+            float: Number of people in the corridor.
+        """
+        # pylint: disable=import-outside-toplevel
+        from shapely import LineString, Point
+
+        longitude = np.atleast_1d(np.asarray(longitude, dtype=float))
+        latitude = np.atleast_1d(np.asarray(latitude, dtype=float))
+        projection = LocalProjection(longitude.mean(), latitude.mean())
+
+        east, north = projection.to_enu(longitude, latitude)
+        route = (
+            LineString(np.column_stack((east, north))) if len(east) > 1
+            else Point(east[0], north[0])
+        )
+        corridor = np.asarray(route.buffer(half_width).exterior.coords)
+        corridor_lon, corridor_lat = projection.to_geodetic(
+            corridor[:, 0], corridor[:, 1]
+        )
+
+        return self.polygon_sum(np.column_stack((corridor_lon, corridor_lat)))
+
+    def _pixel(
+        self,
+        longitude: ArrayLike,
+        latitude: ArrayLike
+    ) -> tuple[np.ndarray, np.ndarray]:
+        return (
+            (np.asarray(longitude, dtype=float) - self._origin[0])
+            / self._resolution[0],
+            (np.asarray(latitude, dtype=float) - self._origin[1])
+            / self._resolution[1]
+        )
+
+    def _pixel_sums(
+        self,
+        column_0: np.ndarray,
+        column_1: np.ndarray,
+        row_0: np.ndarray,
+        row_1: np.ndarray
+    ) -> np.ndarray:
+        return (
+            self._table_at(row_1, column_1) - self._table_at(row_0, column_1)
+            - self._table_at(row_1, column_0) + self._table_at(row_0, column_0)
+        )
+
+    def _table_at(self, row: np.ndarray, column: np.ndarray) -> np.ndarray:
+        # The summed-area table is bilinear within every cell:
+        row = np.clip(row, 0, self._shape[0])
+        column = np.clip(column, 0, self._shape[1])
+        row_0 = np.minimum(row.astype(np.intp), self._shape[0] - 1)
+        column_0 = np.minimum(column.astype(np.intp), self._shape[1] - 1)
+        weight_y = row - row_0
+        weight_x = column - column_0
+
+        table = self._table
+        top = (
+            table[row_0, column_0] * (1 - weight_x)
+            + table[row_0, column_0 + 1] * weight_x
+        )
+        bottom = (
+            table[row_0 + 1, column_0] * (1 - weight_x)
+            + table[row_0 + 1, column_0 + 1] * weight_x
+        )
+
+        return top * (1 - weight_y) + bottom * weight_y
+
+
+def _rings(polygon: Any) -> list[np.ndarray]:
+    if isinstance(polygon, (np.ndarray, list, tuple)):
+        ring = np.asarray(polygon, dtype=float)[:, :2]
+        if len(ring) < 3:
+            return []
+
+        return [np.vstack((ring, ring[:1]))]
+
+    rings = []
+    for part in getattr(polygon, "geoms", [polygon]):
+        for boundary in (part.exterior, *part.interiors):
+            rings.append(np.asarray(boundary.coords, dtype=float)[:, :2])
+
+    return rings
+
+
+if __name__ == "__main__":
+    population = PopulationService()
+    rng = np.random.default_rng(0)
+    fleet_size = 10_000
+
+    print(f"Total population: {population.total / 1e6:.2f} M")
+
+    lon = rng.uniform(-0.5, -0.3, fleet_size)
+    lat = rng.uniform(39.38, 39.58, fleet_size)
+
+    queries: dict[str, Callable[[], np.ndarray]] = {
+        "densities": lambda: population.densities(lon, lat),
+        "coverage circles": lambda: population.circle_sums(lon, lat),
+        "1 km squares": lambda: population.rectangle_sums(
+            lon - 0.006, lon + 0.006, lat - 0.0045, lat + 0.0045
+        )
+    }
+    for name, query in queries.items():
+        start = time.perf_counter()
+        result = query()
+        elapsed = time.perf_counter() - start
+        print(f"{name}: {fleet_size} queries in {elapsed * 1e3:.2f} ms "
+              + f"(mean {np.nanmean(result):.1f})")
+
+    start = time.perf_counter()
+    people = population.corridor_sum(np.array([-0.45, -0.4, -0.35]),
+                                     np.array([39.45, 39.48, 39.47]), 500)
+    elapsed = time.perf_counter() - start
+    print(f"1 km wide corridor: {people:.0f} people in "
+          + f"{elapsed * 1e3:.2f} ms")
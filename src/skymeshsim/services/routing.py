@@ -0,0 +1,969 @@
+"""Routing service module.
+
+This module plans drone routes that avoid densely populated areas and, when
+a flight altitude is given, terrain that is too high to overfly.
+
+Routes are searched on a cost grid over the local plane of the operating
+area, where crossing a cell costs its length times a factor that grows with
+the population density of the cell; cells that violate the terrain clearance
+are blocked. Long routes are planned coarse-to-fine: an A* search on a
+coarsened copy of the grid (built once per planner) finds a corridor, and the
+exact shortest path is searched within that corridor only. Grid paths are
+then smoothed by string pulling, which replaces runs of grid moves with
+straight segments whenever that does not increase the route cost, so routes
+are short lists of any-angle waypoints. Computed routes are cached per start
+and goal cell.
+
+When many drones head to the same destination (e.g. a `moveto` sent to the
+whole fleet), routes can be planned from a shared distance field instead: a
+single Dijkstra search from the destination over the whole grid gives the
+cost-to-go of every cell and the next cell towards the destination, so each
+drone extracts its route by following the field downhill in time
+proportional to the route length. Fields are cached per destination cell.
+
+Author:
+    Paulo Sanchez (@erlete)
+"""
+
+
+from __future__ import annotations
+
+import functools
+import heapq
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+from ..network.utils import OPERATING_AREA_CENTER, ArrayLike, LocalProjection
+
+# Neighbor offsets (row, column) of the 8-connected grid:
+_NEIGHBORS = (
+    (-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)
+)
+
+
+class CostGrid:
+    """Traversal cost raster on a local plane.
+
+    Row 0 is the northernmost row and column 0 the westernmost column.
+
+    Attributes:
+        cost (np.ndarray): Cost per meter of every cell, at least 1. Blocked
+            cells are infinite.
+        origin (tuple[float, float]): East and north coordinates of the
+            north-west corner of the grid in meters.
+        cell_size (float): Cell width and height in meters.
+        projection (LocalProjection): Projection of the local plane.
+    """
+
+    def __init__(
+        self,
+        cost: np.ndarray,
+        origin: tuple[float, float],
+        cell_size: float,
+        projection: LocalProjection
+    ) -> None:
+        """Initialize a CostGrid instance.
+
+        Args:
+            cost (np.ndarray): Cost per meter of every cell.
+            origin (tuple[float, float]): North-west corner in meters.
+            cell_size (float): Cell size in meters.
+            projection (LocalProjection): Projection of the local plane.
+        """
+        self.cost = np.asarray(cost, dtype=float)
+        self.origin = origin
+        self.cell_size = cell_size
+        self.projection = projection
+
+    @classmethod
+    def from_services(
+        cls,
+        population: Optional[Any] = None,
+        terrain: Optional[Any] = None,
+        bounds: Optional[tuple[float, float, float, float]] = None,
+        cell_size: float = 100.0,
+        population_weight: float = 1.0,
+        flight_altitude: Optional[float] = None,
+        clearance: float = 50.0
+    ) -> CostGrid:
+        """Build a cost grid from the population and terrain services.
+
+        Args:
+            population (PopulationService | None): Population densities. Cost
+                is uniform if None.
+            terrain (TerrainService | None): Elevations. Terrain is ignored if
+                None.
+            bounds (tuple[float, float, float, float] | None): Left, right,
+                bottom and top of the grid. Defaults to 0.15 degrees around
+                the operating area center.
+            cell_size (float): Cell size in meters.
+            population_weight (float): Cost increase per 1000 people per
+                square kilometer.
+            flight_altitude (float | None): Flight altitude above sea level in
+                meters. Cells whose elevation plus `clearance` exceeds it are
+                blocked. Requires `terrain`.
+            clearance (float): Minimum height above the terrain in meters.
+
+        Returns:
+            CostGrid: Cost grid.
+        """
+        if bounds is None:
+            bounds = (
+                OPERATING_AREA_CENTER[0] - 0.15,
+                OPERATING_AREA_CENTER[0] + 0.15,
+                OPERATING_AREA_CENTER[1] - 0.15,
+                OPERATING_AREA_CENTER[1] + 0.15
+            )
+
+        projection = LocalProjection((bounds[0] + bounds[1]) / 2,
+                                     (bounds[2] + bounds[3]) / 2)
+        west, south = projection.to_enu(bounds[0], bounds[2])
+        east, north = projection.to_enu(bounds[1], bounds[3])
+        shape = (
+            max(round((north - south) / cell_size), 1),
+            max(round((east - west) / cell_size), 1)
+        )
+        grid = cls(np.ones(shape), (float(west), float(north)), cell_size,
+                   projection)
+
+        if population is not None:
+            # Mean density of every cell, from its exact population:
+            edges_east = grid.origin[0] + cell_size * np.arange(shape[1] + 1)
+            edges_north = grid.origin[1] - cell_size * np.arange(shape[0] + 1)
+            edges_lon, _ = projection.to_geodetic(edges_east, 0.0)
+            _, edges_lat = projection.to_geodetic(0.0, edges_north)
+
+            people = np.nan_to_num(population.rectangle_sums(
+                edges_lon[np.newaxis, :-1],
+                edges_lon[np.newaxis, 1:],
+                edges_lat[1:, np.newaxis],
+                edges_lat[:-1, np.newaxis]
+            ))
+            density = people / (cell_size / 1000) ** 2
+            grid.cost += population_weight * density / 1000
+
+        if flight_altitude is not None:
+            if terrain is None:
+                raise ValueError("flight_altitude requires a terrain service")
+
+            rows, columns = np.indices(shape)
+            longitude, latitude = projection.to_geodetic(
+                *grid.centers(rows, columns)
+            )
+            elevation = terrain.elevations(longitude, latitude)
+            grid.cost[
+                np.nan_to_num(elevation, nan=0.0) + clearance > flight_altitude
+            ] = np.inf
+
+        return grid
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        """Get grid shape.
+
+        Returns:
+            tuple[int, int]: Number of rows and columns.
+        """
+        return self.cost.shape
+
+    def cells(
+        self,
+        east: ArrayLike,
+        north: ArrayLike
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Get the cells containing points.
+
+        Args:
+            east (ArrayLike): East coordinates in meters.
+            north (ArrayLike): North coordinates in meters.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Rows and columns, which may be out
+                of the grid.
+        """
+        return (
+            np.floor(
+                (self.origin[1] - np.asarray(north, dtype=float))
+                / self.cell_size
+            ).astype(np.intp),
+            np.floor(
+                (np.asarray(east, dtype=float) - self.origin[0])
+                / self.cell_size
+            ).astype(np.intp)
+        )
+
+    def centers(
+        self,
+        rows: ArrayLike,
+        columns: ArrayLike
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Get the centers of cells.
+
+        Args:
+            rows (ArrayLike): Rows.
+            columns (ArrayLike): Columns.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: East and north coordinates in
+                meters.
+        """
+        return (
+            self.origin[0] + (np.asarray(columns) + 0.5) * self.cell_size,
+            self.origin[1] - (np.asarray(rows) + 0.5) * self.cell_size
+        )
+
+    def contains(self, row: int, column: int) -> bool:
+        """Check whether a cell is within the grid.
+
+        Args:
+            row (int): Row.
+            column (int): Column.
+
+        Returns:
+            bool: True if the cell is within the grid, False otherwise.
+        """
+        return 0 <= row < self.shape[0] and 0 <= column < self.shape[1]
+
+    def coarsen(self, factor: int) -> CostGrid:
+        """Build a coarser grid with blocks of cells merged.
+
+        Merged cells cost the mean of their free cells, and are only blocked
+        if all of them are blocked.
+
+        Args:
+            factor (int): Number of cells per coarse cell side.
+
+        Returns:
+            CostGrid: Coarse grid with the same origin.
+        """
+        rows = -(-self.shape[0] // factor)
+        columns = -(-self.shape[1] // factor)
+        padded = np.full((rows * factor, columns * factor), np.nan)
+        padded[:self.shape[0], :self.shape[1]] = np.where(
+            np.isfinite(self.cost), self.cost, np.nan
+        )
+        blocks = padded.reshape(rows, factor, columns, factor)
+
+        free = np.isfinite(blocks).sum(axis=(1, 3))
+        cost = np.full((rows, columns), np.inf)
+        cost[free > 0] = (
+            np.nansum(blocks, axis=(1, 3))[free > 0] / free[free > 0]
+        )
+
+        return CostGrid(cost, self.origin, self.cell_size * factor,
+                        self.projection)
+
+    def segment_cost(
+        self,
+        start: Sequence[float],
+        end: Sequence[float]
+    ) -> float:
+        """Compute the cost of a straight segment.
+
+        Args:
+            start (Sequence[float]): East and north coordinates of the start.
+            end (Sequence[float]): East and north coordinates of the end.
+
+        Returns:
+            float: Segment cost, infinite if the segment crosses a blocked
+                cell or leaves the grid.
+        """
+        return float(self.segment_costs(
+            np.asarray(start, dtype=float)[np.newaxis],
+            np.asarray(end, dtype=float)[np.newaxis]
+        )[0])
+
+    def segment_costs(
+        self,
+        starts: np.ndarray,
+        ends: np.ndarray
+    ) -> np.ndarray:
+        """Compute the costs of many straight segments.
+
+        Costs are integrated along the segments with the trapezoidal rule,
+        sampling every segment at least twice per cell.
+
+        Args:
+            starts (np.ndarray): Segment starts with shape (N, 2), or (1, 2)
+                for segments with a common start.
+            ends (np.ndarray): Segment ends with shape (N, 2).
+
+        Returns:
+            np.ndarray: Segment costs, infinite for segments that cross a
+                blocked cell or leave the grid.
+        """
+        lengths = np.hypot(*(ends - starts).T)
+        samples = max(math.ceil(2 * lengths.max() / self.cell_size), 1) + 1
+        fractions = np.arange(samples) / (samples - 1)
+        rows, columns = self.cells(
+            starts[:, 0:1] + (ends - starts)[:, 0:1] * fractions,
+            starts[:, 1:2] + (ends - starts)[:, 1:2] * fractions
+        )
+
+        # The grid is convex, so segments are inside if their ends are:
+        inside = (
+            (rows[:, 0] >= 0) & (rows[:, 0] < self.shape[0])
+            & (columns[:, 0] >= 0) & (columns[:, 0] < self.shape[1])
+            & (rows[:, -1] >= 0) & (rows[:, -1] < self.shape[0])
+            & (columns[:, -1] >= 0) & (columns[:, -1] < self.shape[1])
+        )
+        for indices, size in ((rows, self.shape[0]), (columns, self.shape[1])):
+            np.maximum(indices, 0, out=indices)
+            np.minimum(indices, size - 1, out=indices)
+
+        costs = self.cost[rows, columns]
+        integral = (
+            costs.sum(axis=1) - (costs[:, 0] + costs[:, -1]) / 2
+        ) / (samples - 1)
+
+        return np.where(inside, lengths * integral, np.inf)
+
+
+class RoutePlanner:
+    """Coarse-to-fine route planner over a cost grid.
+
+    Attributes:
+        grid (CostGrid): Cost grid.
+        coarse_factor (int): Number of grid cells per coarse cell side.
+        corridor (int): Number of coarse cells around the coarse path within
+            which the fine path is searched.
+        tolerance (float): Relative cost increase accepted when smoothing a
+            route into straight segments.
+        cache_size (int): Maximum number of cached routes.
+        field_cache_size (int): Maximum number of cached distance fields.
+        hits (int): Number of routes served from the cache.
+        misses (int): Number of routes searched or extracted from a field.
+    """
+
+    def __init__(
+        self,
+        grid: CostGrid,
+        coarse_factor: int = 8,
+        corridor: int = 2,
+        tolerance: float = 0.02,
+        cache_size: int = 256,
+        field_cache_size: int = 8
+    ) -> None:
+        """Initialize a RoutePlanner instance.
+
+        Args:
+            grid (CostGrid): Cost grid.
+            coarse_factor (int): Number of grid cells per coarse cell side.
+            corridor (int): Corridor half width in coarse cells.
+            tolerance (float): Relative cost increase accepted when
+                smoothing.
+            cache_size (int): Maximum number of cached routes.
+            field_cache_size (int): Maximum number of cached distance fields.
+        """
+        self.grid = grid
+        self.coarse_factor = coarse_factor
+        self.corridor = corridor
+        self.tolerance = tolerance
+        self.cache_size = cache_size
+        self.field_cache_size = field_cache_size
+        self.hits = 0
+        self.misses = 0
+
+        self._routes: OrderedDict[tuple, np.ndarray] = OrderedDict()
+        self._fields: OrderedDict[tuple, DistanceField] = OrderedDict()
+
+        # Routes may be planned from executor threads sharing the caches:
+        self._lock = threading.Lock()
+
+    @functools.cached_property
+    def coarse(self) -> CostGrid:
+        """Get the coarse grid, built on first use.
+
+        Returns:
+            CostGrid: Coarse grid.
+        """
+        return self.grid.coarsen(self.coarse_factor)
+
+    @functools.cached_property
+    def graph(self) -> tuple[Any, np.ndarray]:
+        """Get the graph of the whole grid, built on first use.
+
+        Returns:
+            tuple[scipy.sparse.csr_matrix, np.ndarray]: Graph of the grid, as
+                returned by `grid_graph`.
+        """
+        return grid_graph(self.grid)
+
+    def warm_up(self) -> None:
+        """Load the search dependencies and build the grids and graph.
+
+        The first route would otherwise pay for them, which takes a few
+        hundred milliseconds with a cold SciPy import.
+        """
+        # pylint: disable=import-outside-toplevel,unused-import
+        from scipy.sparse.csgraph import dijkstra  # noqa: F401
+
+        _ = self.coarse, self.graph
+
+    def field(self, goal: tuple[int, int]) -> DistanceField:
+        """Get the distance field of a destination cell.
+
+        Args:
+            goal (tuple[int, int]): Row and column of the destination.
+
+        Returns:
+            DistanceField: Cached or newly computed distance field.
+        """
+        field = self._fields.get(goal)
+        if field is not None:
+            self._fields.move_to_end(goal)
+            return field
+
+        field = DistanceField(self.grid, goal, self.graph)
+        self._fields[goal] = field
+        if len(self._fields) > self.field_cache_size:
+            self._fields.popitem(last=False)
+
+        return field
+
+    def plan(
+        self,
+        start: Sequence[float],
+        goal: Sequence[float],
+        shared: bool = False
+    ) -> list[tuple[float, float]]:
+        """Plan a route between two geodetic positions.
+
+        Args:
+            start (Sequence[float]): Longitude and latitude of the start.
+            goal (Sequence[float]): Longitude and latitude of the goal.
+            shared (bool): Whether the goal is shared by many drones (see
+                `plan_enu`).
+
+        Returns:
+            list[tuple[float, float]]: Longitudes and latitudes of the route
+                waypoints, from the start to the goal.
+        """
+        projection = self.grid.projection
+        route = self.plan_enu(projection.to_enu(*start),
+                              projection.to_enu(*goal), shared)
+        longitude, latitude = projection.to_geodetic(route[:, 0], route[:, 1])
+
+        return list(zip(longitude.tolist(), latitude.tolist()))
+
+    def plan_enu(
+        self,
+        start: Sequence[float],
+        goal: Sequence[float],
+        shared: bool = False
+    ) -> np.ndarray:
+        """Plan a route between two points of the local plane.
+
+        Args:
+            start (Sequence[float]): East and north coordinates of the start.
+            goal (Sequence[float]): East and north coordinates of the goal.
+            shared (bool): Whether the goal is shared by many drones. Routes
+                are then extracted from the distance field of the goal,
+                computed once for all of them, instead of being searched one
+                by one.
+
+        Returns:
+            np.ndarray: Route waypoints with shape (K, 2), from the start to
+                the goal.
+
+        Raises:
+            ValueError: If an endpoint is outside of the grid, the goal is
+                blocked or there is no route.
+        """
+        start = (float(start[0]), float(start[1]))
+        goal = (float(goal[0]), float(goal[1]))
+        start_row, start_column = self.grid.cells(*start)
+        goal_row, goal_column = self.grid.cells(*goal)
+        start_cell = (int(start_row), int(start_column))
+        goal_cell = (int(goal_row), int(goal_column))
+
+        for name, cell in (("start", start_cell), ("goal", goal_cell)):
+            if not self.grid.contains(*cell):
+                raise ValueError(f"{name} is outside of the cost grid")
+
+        if not np.isfinite(self.grid.cost[goal_cell]):
+            raise ValueError("goal is in a blocked cell")
+
+        key = (start_cell, goal_cell)
+        with self._lock:
+            interior = self._routes.get(key)
+            if interior is not None:
+                self._routes.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+                interior = self._search(start, goal, start_cell, goal_cell,
+                                        shared)
+                self._routes[key] = interior
+                if len(self._routes) > self.cache_size:
+                    self._routes.popitem(last=False)
+
+        return np.vstack((start, interior, goal))
+
+    def route_cost(self, waypoints: ArrayLike) -> float:
+        """Compute the cost of a route.
+
+        Args:
+            waypoints (ArrayLike): Route waypoints on the local plane, with
+                shape (K, 2).
+
+        Returns:
+            float: Route cost.
+        """
+        waypoints = np.asarray(waypoints, dtype=float)
+        return sum(
+            self.grid.segment_cost(waypoints[index], waypoints[index + 1])
+            for index in range(len(waypoints) - 1)
+        )
+
+    def _search(
+        self,
+        start: tuple[float, float],
+        goal: tuple[float, float],
+        start_cell: tuple[int, int],
+        goal_cell: tuple[int, int],
+        shared: bool = False
+    ) -> np.ndarray:
+        path = (
+            self.field(goal_cell).path(start_cell) if shared else None
+        )
+        if path is None:
+            # Blocked start cells are left out of distance fields:
+            mask = self._corridor(start_cell, goal_cell)
+            path = shortest_path(self.grid, start_cell, goal_cell, mask)
+            if path is None and mask is not None:
+                path = shortest_path(self.grid, start_cell, goal_cell)
+
+        if path is None:
+            raise ValueError("there is no route to the goal")
+
+        east, north = self.grid.centers(path[:, 0], path[:, 1])
+        points = np.column_stack((east, north))
+        points[0], points[-1] = start, goal
+
+        return self._smooth(points, path)[1:-1]
+
+    def _corridor(
+        self,
+        start_cell: tuple[int, int],
+        goal_cell: tuple[int, int]
+    ) -> Optional[np.ndarray]:
+        factor = self.coarse_factor
+        span = max(abs(start_cell[0] - goal_cell[0]),
+                   abs(start_cell[1] - goal_cell[1]))
+
+        coarse_mask = np.zeros(self.coarse.shape, dtype=bool)
+        if span <= 2 * factor:
+            # Short routes are searched within their bounding box:
+            low = np.minimum(start_cell, goal_cell) // factor - self.corridor
+            high = np.maximum(start_cell, goal_cell) // factor + self.corridor
+            coarse_mask[max(low[0], 0):high[0] + 1,
+                        max(low[1], 0):high[1] + 1] = True
+        else:
+            coarse_path = astar(
+                self.coarse.cost,
+                (start_cell[0] // factor, start_cell[1] // factor),
+                (goal_cell[0] // factor, goal_cell[1] // factor)
+            )
+            if coarse_path is None:
+                return None
+
+            coarse_mask[tuple(np.transpose(coarse_path))] = True
+            coarse_mask = _dilate(coarse_mask, self.corridor)
+
+        mask = np.repeat(np.repeat(coarse_mask, factor, axis=0),
+                         factor, axis=1)
+        return mask[:self.grid.shape[0], :self.grid.shape[1]]
+
+    def _smooth(self, points: np.ndarray, path: np.ndarray) -> np.ndarray:
+        # Cumulative cost of the grid path, for comparison with shortcuts:
+        costs = self.grid.cost[path[:, 0], path[:, 1]]
+        steps = (
+            np.hypot(*np.diff(points, axis=0).T)
+            * (costs[:-1] + costs[1:]) / 2
+        )
+        cumulative = np.concatenate(([0.0], np.cumsum(steps)))
+
+        # Greedy string pulling, testing batches of shortcuts from the last
+        # waypoint at once:
+        waypoints = [points[0]]
+        anchor = 0
+        index = 2
+        while index < len(points):
+            candidates = np.arange(index, min(index + 16, len(points)))
+            shortcuts = self.grid.segment_costs(
+                points[anchor:anchor + 1],
+                points[candidates]
+            )
+            failed = np.flatnonzero(
+                shortcuts > (cumulative[candidates] - cumulative[anchor])
+                * (1 + self.tolerance)
+            )
+            if not len(failed):
+                index = candidates[-1] + 1
+                continue
+
+            anchor = int(candidates[failed[0]]) - 1
+            waypoints.append(points[anchor])
+            index = anchor + 2
+
+        waypoints.append(points[-1])
+
+        return np.array(waypoints)
+
+
+class DistanceField:
+    """Cost-to-go field of a destination cell.
+
+    Attributes:
+        grid (CostGrid): Cost grid.
+        goal (tuple[int, int]): Row and column of the destination.
+        cost_to_go (np.ndarray): Cost of the cheapest path from every cell to
+            the destination, infinite for blocked or unreachable cells.
+    """
+
+    def __init__(
+        self,
+        grid: CostGrid,
+        goal: tuple[int, int],
+        graph: Optional[tuple[Any, np.ndarray]] = None
+    ) -> None:
+        """Initialize a DistanceField instance.
+
+        Args:
+            grid (CostGrid): Cost grid.
+            goal (tuple[int, int]): Row and column of the destination, which
+                must be a free cell.
+            graph (tuple[scipy.sparse.csr_matrix, np.ndarray] | None): Graph
+                of the grid, as returned by `grid_graph`, shared between the
+                fields of a grid. Built if None.
+        """
+        # pylint: disable=import-outside-toplevel
+        from scipy.sparse.csgraph import dijkstra
+
+        self.grid = grid
+        self.goal = goal
+
+        graph, self._nodes = graph if graph is not None else grid_graph(grid)
+        self._goal_node = int(self._nodes[goal])
+        if self._goal_node < 0:
+            raise ValueError("goal is in a blocked cell")
+
+        distances, predecessors = dijkstra(
+            graph, directed=False, indices=self._goal_node,
+            return_predecessors=True
+        )
+        self._next = predecessors.astype(np.intp)
+        self._cells = np.flatnonzero(self._nodes.ravel() >= 0)
+
+        self.cost_to_go = np.full(grid.shape, np.inf)
+        self.cost_to_go[self._nodes >= 0] = distances
+
+    def path(self, start: tuple[int, int]) -> Optional[np.ndarray]:
+        """Follow the field downhill from a cell to the destination.
+
+        Args:
+            start (tuple[int, int]): Row and column of the start.
+
+        Returns:
+            np.ndarray | None: Rows and columns of the path with shape
+                (K, 2), or None if the start is blocked or cannot reach the
+                destination.
+        """
+        node = int(self._nodes[start])
+        if node < 0 or not np.isfinite(self.cost_to_go[start]):
+            return None
+
+        nodes = [node]
+        following = self._next
+        while node != self._goal_node:
+            node = following[node]
+            nodes.append(node)
+
+        return np.column_stack(
+            np.divmod(self._cells[nodes], self.grid.shape[1])
+        )
+
+
+def astar(
+    cost: np.ndarray,
+    start: tuple[int, int],
+    goal: tuple[int, int]
+) -> Optional[list[tuple[int, int]]]:
+    """Find the cheapest 8-connected path on a cost raster with A*.
+
+    Moving between adjacent cells costs the distance between their centers
+    (in cells) times the mean cost of both cells. The start and goal cells
+    are always traversable.
+
+    Args:
+        cost (np.ndarray): Cost per cell side of every cell, at least 1.
+            Blocked cells are infinite.
+        start (tuple[int, int]): Row and column of the start.
+        goal (tuple[int, int]): Row and column of the goal.
+
+    Returns:
+        list[tuple[int, int]] | None: Rows and columns of the path from the
+            start to the goal, or None if there is no path.
+    """
+    rows, columns = cost.shape
+    costs = cost.ravel().tolist()
+    start_index = start[0] * columns + start[1]
+    goal_index = goal[0] * columns + goal[1]
+    costs[start_index] = costs[goal_index] = min(
+        costs[start_index], costs[goal_index], 1.0
+    )
+    floor = min(float(np.min(cost)), 1.0)
+    diagonal = math.sqrt(2)
+    goal_row, goal_column = goal
+
+    distances = {start_index: 0.0}
+    parents = {start_index: -1}
+    queue = [(0.0, 0.0, start_index)]
+
+    while queue:
+        _, distance, index = heapq.heappop(queue)
+        if index == goal_index:
+            path = []
+            while index != -1:
+                path.append(divmod(index, columns))
+                index = parents[index]
+            return path[::-1]
+
+        if distance > distances[index]:
+            continue  # Stale entry
+
+        row, column = divmod(index, columns)
+        for delta_row, delta_column in _NEIGHBORS:
+            next_row = row + delta_row
+            next_column = column + delta_column
+            if not (0 <= next_row < rows and 0 <= next_column < columns):
+                continue
+
+            next_index = next_row * columns + next_column
+            next_distance = distance + (
+                (costs[index] + costs[next_index]) / 2
+                * (diagonal if delta_row and delta_column else 1.0)
+            )
+            if next_distance < distances.get(next_index, math.inf):
+                distances[next_index] = next_distance
+                parents[next_index] = index
+
+                # Octile distance at the minimum cost, which is admissible:
+                span_row = abs(next_row - goal_row)
+                span_column = abs(next_column - goal_column)
+                heapq.heappush(queue, (
+                    next_distance + floor * (
+                        max(span_row, span_column)
+                        + (diagonal - 1) * min(span_row, span_column)
+                    ),
+                    next_distance,
+                    next_index
+                ))
+
+    return None
+
+
+def grid_graph(
+    grid: CostGrid,
+    mask: Optional[np.ndarray] = None
+) -> tuple[Any, np.ndarray]:
+    """Build the 8-connected graph of the free cells of a grid.
+
+    Edges between adjacent cells weigh the distance between their centers
+    times the mean cost of both cells. Diagonal edges are left out when they
+    would cut the corner of a blocked cell.
+
+    Args:
+        grid (CostGrid): Cost grid.
+        mask (np.ndarray | None): Cells to include. Every cell if None.
+
+    Returns:
+        tuple[scipy.sparse.csr_matrix, np.ndarray]: Symmetric adjacency
+            matrix over the included free cells, and the node index of every
+            cell (-1 for excluded cells).
+    """
+    # pylint: disable=import-outside-toplevel
+    from scipy.sparse import coo_matrix
+
+    free = np.isfinite(grid.cost)
+    if mask is not None:
+        free &= mask
+
+    nodes = np.full(grid.shape, -1, dtype=np.intp)
+    nodes[free] = np.arange(np.count_nonzero(free))
+    rows, columns = grid.shape
+
+    sources, targets, weights = [], [], []
+    for delta_row, delta_column in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        # Cells and their neighbors at the given offset:
+        row_slice = slice(0, rows - delta_row)
+        next_row_slice = slice(delta_row, rows)
+        column_slice = slice(max(-delta_column, 0),
+                             columns - max(delta_column, 0))
+        next_column_slice = slice(max(delta_column, 0),
+                                  columns - max(-delta_column, 0))
+
+        valid = free[row_slice, column_slice] & free[next_row_slice,
+                                                     next_column_slice]
+        if delta_row and delta_column:
+            valid &= (
+                free[row_slice, next_column_slice]
+                & free[next_row_slice, column_slice]
+            )
+
+        length = grid.cell_size * math.hypot(delta_row, delta_column)
+        sources.append(nodes[row_slice, column_slice][valid])
+        targets.append(nodes[next_row_slice, next_column_slice][valid])
+        weights.append(length * (
+            grid.cost[row_slice, column_slice][valid]
+            + grid.cost[next_row_slice, next_column_slice][valid]
+        ) / 2)
+
+    count = int(nodes.max()) + 1
+    graph = coo_matrix(
+        (np.concatenate(weights),
+         (np.concatenate(sources), np.concatenate(targets))),
+        shape=(count, count)
+    ).tocsr()
+
+    return graph, nodes
+
+
+def shortest_path(
+    grid: CostGrid,
+    start: tuple[int, int],
+    goal: tuple[int, int],
+    mask: Optional[np.ndarray] = None
+) -> Optional[np.ndarray]:
+    """Find the cheapest path between two cells of a grid.
+
+    Args:
+        grid (CostGrid): Cost grid.
+        start (tuple[int, int]): Row and column of the start.
+        goal (tuple[int, int]): Row and column of the goal.
+        mask (np.ndarray | None): Cells the path may cross. Every cell if
+            None.
+
+    Returns:
+        np.ndarray | None: Rows and columns of the path with shape (K, 2),
+            or None if there is no path.
+    """
+    # pylint: disable=import-outside-toplevel
+    from scipy.sparse.csgraph import dijkstra
+
+    # The start cell is always traversable, e.g. when a drone is over a
+    # blocked cell:
+    cost = grid.cost
+    if not np.isfinite(cost[start]):
+        grid = CostGrid(cost.copy(), grid.origin, grid.cell_size,
+                        grid.projection)
+        grid.cost[start] = np.nanmax(np.where(np.isfinite(cost), cost, 1.0))
+
+    if mask is not None:
+        mask = mask.copy()
+        mask[start] = mask[goal] = True
+
+    graph, nodes = grid_graph(grid, mask)
+    source, target = nodes[start], nodes[goal]
+    if source < 0 or target < 0:
+        return None
+
+    _, predecessors = dijkstra(graph, directed=False, indices=source,
+                               return_predecessors=True)
+    if source != target and predecessors[target] < 0:
+        return None
+
+    path = [target]
+    while path[-1] != source:
+        path.append(predecessors[path[-1]])
+
+    cells = np.flatnonzero(nodes.ravel() >= 0)[np.array(path[::-1])]
+    return np.column_stack(np.divmod(cells, grid.shape[1]))
+
+
+@functools.lru_cache(maxsize=1)
+def get_default_planner() -> RoutePlanner:
+    """Get the shared planner of the operating area.
+
+    Returns:
+        RoutePlanner: Planner over the default population cost grid.
+    """
+    # pylint: disable=import-outside-toplevel
+    from .population import PopulationService
+
+    return RoutePlanner(CostGrid.from_services(PopulationService()))
+
+
+def _dilate(mask: np.ndarray, iterations: int) -> np.ndarray:
+    # 8-connected binary dilation:
+    for _ in range(iterations):
+        padded = np.pad(mask, 1)
+        mask = np.zeros_like(mask)
+        for delta_row in range(3):
+            for delta_column in range(3):
+                mask |= padded[delta_row:delta_row + mask.shape[0],
+                               delta_column:delta_column + mask.shape[1]]
+
+    return mask
+
+
+if __name__ == "__main__":
+    start_time = time.perf_counter()
+    planner = get_default_planner()
+    print(f"{planner.grid.shape} cost grid built in "
+          + f"{(time.perf_counter() - start_time) * 1e3:.0f} ms")
+
+    start_time = time.perf_counter()
+    planner.warm_up()
+    print("Planner warmed up in "
+          + f"{(time.perf_counter() - start_time) * 1e3:.0f} ms")
+
+    rng = np.random.default_rng(0)
+    half_size = np.array(planner.grid.shape[::-1]) * planner.grid.cell_size / 2
+    routes = 20
+    lengths, costs, elapsed = [], [], []
+    for _ in range(routes):
+        angle = rng.uniform(0, 2 * np.pi)
+        middle = rng.uniform(-2_000, 2_000, 2)
+        offset = 10_000 * np.array([np.cos(angle), np.sin(angle)])
+        origin, destination = middle - offset, middle + offset
+        if np.any(np.abs(np.vstack((origin, destination))) >= half_size):
+            continue
+
+        start_time = time.perf_counter()
+        route = planner.plan_enu(origin, destination)
+        elapsed.append(time.perf_counter() - start_time)
+        lengths.append(np.hypot(*np.diff(route, axis=0).T).sum())
+        costs.append(planner.route_cost(route) / planner.route_cost(
+            np.vstack((origin, destination))
+        ))
+
+    print(f"{len(elapsed)} routes of 20 km: "
+          + f"{np.mean(elapsed) * 1e3:.1f} ms mean, "
+          + f"{np.max(elapsed) * 1e3:.1f} ms max")
+    print(f"  mean length: {np.mean(lengths) / 1000:.1f} km, mean cost "
+          + f"relative to the straight line: {np.mean(costs):.2f}")
+
+    start_time = time.perf_counter()
+    planner.plan_enu(origin, destination)
+    print(f"  cached: {(time.perf_counter() - start_time) * 1e6:.0f} us")
+
+    # Fleet-wide reroute to a shared destination:
+    fleet_size = 500
+    positions = rng.uniform(-0.8, 0.8, (fleet_size, 2)) * half_size
+    destination = np.array([3_000.0, -2_000.0])
+    for shared in (False, True):
+        planner = RoutePlanner(planner.grid)
+        start_time = time.perf_counter()
+        for position in positions:
+            planner.plan_enu(position, destination, shared)
+        elapsed_fleet = time.perf_counter() - start_time
+        print(f"{fleet_size} drones to one destination "
+              + f"({'shared field' if shared else 'one search each'}): "
+              + f"{elapsed_fleet * 1e3:.0f} ms")
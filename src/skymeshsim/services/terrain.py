@@ -3,6 +3,283 @@
 This module provides the Terrain service, which is responsible for providing
 information about the terrain of an area.
 
+Elevations are read from the bundled digital elevation model (DEM) by tiles
+that follow the internal block layout of the GeoTIFF. Each tile is decoded
+once, with a one-pixel halo on its east and south edges so that bilinear
+interpolation never needs a neighbouring tile, and kept in an LRU cache.
+Batch queries group points by tile and interpolate every group with a few
+vectorized gathers.
+
 Author:
     Paulo Sanchez (@erlete)
 """
+
+
+from __future__ import annotations
+
+import time
+from typing import Optional
+
+import numpy as np
+
+from ..network.raster_cache import DEM_PATH
+from ..network.raster_view import TileCache
+from ..network.utils import ArrayLike, LocalProjection
+
+
+class TerrainService:
+    """Terrain service class.
+
+    Attributes:
+        path (str): DEM path. The DEM must be north-up in EPSG:4326.
+        projection (LocalProjection | None): Projection of ENU queries.
+        tile_cache (TileCache): Cache of decoded DEM tiles.
+        tile_size (int): Tile width and height in pixels.
+        bounds (tuple[float, float, float, float]): Left, right, bottom and
+            top of the DEM.
+        resolution (tuple[float, float]): Pixel width and height in degrees.
+        valid_range (tuple[float, float]): Elevations outside of this range
+            are treated as missing data. The bundled DEM marks the sea with
+            -32767 instead of its declared nodata value (-32768).
+    """
+
+    def __init__(
+        self,
+        path: str = DEM_PATH,
+        projection: Optional[LocalProjection] = None,
+        tile_cache: Optional[TileCache] = None,
+        tile_size: Optional[int] = None,
+        valid_range: tuple[float, float] = (-500.0, 9000.0)
+    ) -> None:
+        """Initialize a TerrainService instance.
+
+        Args:
+            path (str): DEM path.
+            projection (LocalProjection | None): Projection of ENU queries.
+            tile_cache (TileCache | None): Cache of decoded tiles. Defaults to
+                a 32 MB cache.
+            tile_size (int | None): Tile width and height in pixels. Defaults
+                to the DEM block size.
+            valid_range (tuple[float, float]): Minimum and maximum valid
+                elevations in meters.
+        """
+        import rasterio  # pylint: disable=import-outside-toplevel
+
+        self.path = path
+        self.projection = projection
+        self.valid_range = valid_range
+        self.tile_cache = (
+            tile_cache if tile_cache is not None
+            else TileCache(32 * 1024 * 1024)
+        )
+
+        self._dataset = rasterio.open(path)
+        transform = self._dataset.transform
+        if transform.b or transform.d:
+            raise ValueError(f"{path} is not a north-up raster")
+
+        self.tile_size = tile_size or self._dataset.block_shapes[0][0]
+        self.bounds = (
+            self._dataset.bounds.left,
+            self._dataset.bounds.right,
+            self._dataset.bounds.bottom,
+            self._dataset.bounds.top
+        )
+
+        self.resolution = (transform.a, -transform.e)
+
+        self._width = self._dataset.width
+        self._height = self._dataset.height
+        self._nodata = self._dataset.nodata
+        self._origin = (transform.c, transform.f)
+        self._resolution = (transform.a, transform.e)
+
+    def elevation(self, longitude: float, latitude: float) -> float:
+        """Get the elevation of a point.
+
+        Args:
+            longitude (float): Longitude.
+            latitude (float): Latitude.
+
+        Returns:
+            float: Elevation in meters, or NaN outside of the DEM or over
+                missing data.
+        """
+        return float(self.elevations(
+            np.array([longitude], dtype=float),
+            np.array([latitude], dtype=float)
+        )[0])
+
+    def elevations(
+        self,
+        longitude: ArrayLike,
+        latitude: ArrayLike
+    ) -> np.ndarray:
+        """Get the elevations of many points.
+
+        Args:
+            longitude (ArrayLike): Longitudes.
+            latitude (ArrayLike): Latitudes.
+
+        Returns:
+            np.ndarray: Elevations in meters, NaN outside of the DEM or over
+                missing data.
+        """
+        longitude = np.asarray(longitude, dtype=float)
+        latitude = np.asarray(latitude, dtype=float)
+        shape = np.broadcast_shapes(longitude.shape, latitude.shape)
+        longitude = np.broadcast_to(longitude, shape).ravel()
+        latitude = np.broadcast_to(latitude, shape).ravel()
+
+        # Fractional pixel coordinates, relative to pixel centers:
+        column = (longitude - self._origin[0]) / self._resolution[0] - 0.5
+        row = (latitude - self._origin[1]) / self._resolution[1] - 0.5
+
+        result = np.full(column.shape, np.nan)
+        inside = (
+            (column >= -0.5) & (column <= self._width - 0.5)
+            & (row >= -0.5) & (row <= self._height - 0.5)
+        )
+        if not inside.any():
+            return result.reshape(shape)
+
+        index = np.flatnonzero(inside)
+        column = np.clip(column[index], 0, self._width - 1)
+        row = np.clip(row[index], 0, self._height - 1)
+
+        # Top-left corner of the interpolation cell, kept one pixel away from
+        # the last column and row so that the cell is always complete:
+        column_0 = np.minimum(column.astype(np.intp), max(self._width - 2, 0))
+        row_0 = np.minimum(row.astype(np.intp), max(self._height - 2, 0))
+        column_weight = column - column_0
+        row_weight = row - row_0
+
+        tiles_per_row = -(-self._width // self.tile_size)
+        tile_ids = (
+            (row_0 // self.tile_size) * tiles_per_row
+            + column_0 // self.tile_size
+        )
+
+        for tile_id in np.unique(tile_ids):
+            members = np.flatnonzero(tile_ids == tile_id)
+            tile_row, tile_column = divmod(int(tile_id), tiles_per_row)
+            tile = self._tile(tile_row, tile_column)
+
+            local_row = row_0[members] - tile_row * self.tile_size
+            local_column = column_0[members] - tile_column * self.tile_size
+            weight_x = column_weight[members]
+            weight_y = row_weight[members]
+
+            top = (
+                tile[local_row, local_column] * (1 - weight_x)
+                + tile[local_row, local_column + 1] * weight_x
+            )
+            bottom = (
+                tile[local_row + 1, local_column] * (1 - weight_x)
+                + tile[local_row + 1, local_column + 1] * weight_x
+            )
+            result[index[members]] = top * (1 - weight_y) + bottom * weight_y
+
+        return result.reshape(shape)
+
+    def elevations_enu(self, east: ArrayLike, north: ArrayLike) -> np.ndarray:
+        """Get the elevations of many points in local plane coordinates.
+
+        Args:
+            east (ArrayLike): East coordinates in meters.
+            north (ArrayLike): North coordinates in meters.
+
+        Returns:
+            np.ndarray: Elevations in meters, NaN outside of the DEM or over
+                missing data.
+        """
+        if self.projection is None:
+            raise ValueError("ENU queries require a projection")
+
+        return self.elevations(*self.projection.to_geodetic(east, north))
+
+    def clearances(
+        self,
+        longitude: ArrayLike,
+        latitude: ArrayLike,
+        altitude: ArrayLike
+    ) -> np.ndarray:
+        """Get the heights of many points above the terrain.
+
+        Args:
+            longitude (ArrayLike): Longitudes.
+            latitude (ArrayLike): Latitudes.
+            altitude (ArrayLike): Altitudes above sea level in meters.
+
+        Returns:
+            np.ndarray: Heights above the terrain in meters (negative below
+                ground), NaN where the elevation is unknown.
+        """
+        return np.asarray(altitude) - self.elevations(longitude, latitude)
+
+    def close(self) -> None:
+        """Close the DEM dataset."""
+        self._dataset.close()
+
+    def _tile(self, tile_row: int, tile_column: int) -> np.ndarray:
+        def load() -> np.ndarray:
+            # pylint: disable=import-outside-toplevel
+            from rasterio.windows import Window
+
+            column_off = tile_column * self.tile_size
+            row_off = tile_row * self.tile_size
+
+            # One-pixel halo on the east and south edges:
+            data = self._dataset.read(1, window=Window(
+                column_off,
+                row_off,
+                min(self.tile_size + 1, self._width - column_off),
+                min(self.tile_size + 1, self._height - row_off)
+            )).astype(np.float32)
+
+            invalid = (
+                (data < self.valid_range[0]) | (data > self.valid_range[1])
+            )
+            if self._nodata is not None:
+                invalid |= data == self._nodata
+
+            data[invalid] = np.nan
+
+            return data
+
+        return self.tile_cache.get((self.path, 0, tile_row, tile_column), load)
+
+
+if __name__ == "__main__":
+    terrain = TerrainService()
+    rng = np.random.default_rng(0)
+    batch_size = 10_000
+
+    for name, (left, right, bottom, top) in {
+        "operating area": (-0.5, -0.3, 39.38, 39.58),
+        "peninsula": (-9.0, 3.0, 36.5, 43.5)
+    }.items():
+        lon = rng.uniform(left, right, batch_size)
+        lat = rng.uniform(bottom, top, batch_size)
+
+        start = time.perf_counter()
+        terrain.elevations(lon, lat)  # Cold tile cache
+        cold = time.perf_counter() - start
+
+        repeats = 50
+        start = time.perf_counter()
+        for _ in range(repeats):
+            heights = terrain.elevations(lon, lat)
+        warm = (time.perf_counter() - start) / repeats
+
+        print(f"{name}: {batch_size} points")
+        print(f"  cold: {cold * 1e3:.2f} ms")
+        print(
+            f"  warm: {warm * 1e3:.2f} ms "
+            + f"({batch_size / warm / 1e6:.2f} M points/s)"
+        )
+        print(f"  elevation range: {np.nanmin(heights):.0f} to "
+              + f"{np.nanmax(heights):.0f} m")
+
+    print(f"Cached tiles: {len(terrain.tile_cache)} "
+          + f"({terrain.tile_cache.size / 1024:.0f} KB)")
@@ -2,25 +2,435 @@
 
 A module to fetch weather data from OpenWeatherMap API.
 
+Weather is served by a `WeatherProvider`, which can be shared by every drone
+of a simulation. Requests are quantized to grid cells and cached for a
+time-to-live, concurrent refreshes of a cell (from threads or coroutines) are
+merged into a single backend request, and HTTP connections are reused. The
+`FixtureBackend` serves recorded data from local files, so that simulations
+can run offline and deterministically.
+
+The OpenWeatherMap API key is read from the `OPENWEATHER_API_KEY` environment
+variable (or a `.env` file) on the first request. Setting the
+`SKYMESHSIM_WEATHER_FIXTURE` environment variable to a fixture file makes the
+default provider use it instead of the API.
+
 Author:
     Paulo Sanchez (@erlete)
 """
 
 
+from __future__ import annotations
+
+import asyncio
+import json
+import math
 import os
-from time import time
-from typing import Any
+import threading
+from concurrent.futures import Future
+from time import monotonic
+from typing import TYPE_CHECKING, Any, Iterable, Optional, Protocol
+
+from ..network.logger import Logger
+
+if TYPE_CHECKING:
+    import requests
+
+WeatherData = dict[str, Any]
+CellKey = tuple[float, float]
+
+_logger = Logger(1, "[Weather]")
+
+
+def get_api_key() -> str:
+    """Get the OpenWeatherMap API key.
+
+    Returns:
+        str: API key.
+
+    Raises:
+        ValueError: If no API key is set.
+    """
+    from dotenv import load_dotenv  # pylint: disable=import-outside-toplevel
+
+    load_dotenv()
+
+    api_key = os.getenv("OPENWEATHER_API_KEY")
+    if not api_key:
+        raise ValueError(
+            "No API key found. Set the OPENWEATHER_API_KEY environment "
+            + "variable."
+        )
+
+    return api_key
+
+
+class WeatherBackend(Protocol):
+    """Source of weather data for a location."""
+
+    def fetch(self, latitude: float, longitude: float) -> WeatherData:
+        """Fetch the current weather at a location.
+
+        Args:
+            latitude (float): Latitude of the location.
+            longitude (float): Longitude of the location.
+
+        Returns:
+            WeatherData: Weather data in the OpenWeatherMap format.
+        """
+
+
+class OpenWeatherBackend:
+    """OpenWeatherMap API backend.
+
+    Every request goes through a single `requests.Session`, which keeps
+    connections to the API alive between requests.
+
+    Attributes:
+        api_key (str | None): API key. Read from the environment on the
+            first request if None.
+        timeout (float): Request timeout in seconds.
+        BASE_URL (str): Base URL of the OpenWeatherMap API.
+    """
+
+    BASE_URL = "http://api.openweathermap.org/data/2.5/weather"
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        timeout: float = 5.0,
+        session: Optional[requests.Session] = None
+    ) -> None:
+        """Initialize an OpenWeatherBackend instance.
+
+        Args:
+            api_key (str | None): API key. Read from the environment on the
+                first request if None.
+            timeout (float): Request timeout in seconds.
+            session (requests.Session | None): HTTP session to use.
+        """
+        # pylint: disable=import-outside-toplevel,redefined-outer-name
+        import requests
+
+        self.api_key = api_key
+        self.timeout = timeout
+        self._session = session or requests.Session()
+
+    def fetch(self, latitude: float, longitude: float) -> WeatherData:
+        """Fetch the current weather at a location.
+
+        Args:
+            latitude (float): Latitude of the location.
+            longitude (float): Longitude of the location.
+
+        Returns:
+            WeatherData: Weather data.
+
+        Raises:
+            ValueError: If the API returns an error.
+        """
+        if self.api_key is None:
+            self.api_key = get_api_key()
+
+        params: dict[str, str | float] = {
+            "lat": latitude,
+            "lon": longitude,
+            "units": "metric",
+            "appid": self.api_key
+        }
+        response = self._session.get(
+            self.BASE_URL, params=params, timeout=self.timeout
+        )
+        data = response.json()
+
+        if response.status_code != 200:
+            raise ValueError(f"Error while fetching wheater data: {data}")
+
+        return data
+
+    def close(self) -> None:
+        """Close the HTTP session."""
+        self._session.close()
+
+
+class FixtureBackend:
+    """Offline backend serving recorded weather data.
+
+    Fixtures are OpenWeatherMap responses. A single response is served for
+    every location; with several responses, the one recorded closest to the
+    requested location (from its `coord` field) is served.
+
+    Attributes:
+        records (list[WeatherData]): Recorded responses.
+        fetches (int): Number of requests served.
+    """
+
+    def __init__(self, records: WeatherData | Iterable[WeatherData]) -> None:
+        """Initialize a FixtureBackend instance.
+
+        Args:
+            records (WeatherData | Iterable[WeatherData]): Recorded response
+                or responses.
+        """
+        self.records = (
+            [records] if isinstance(records, dict) else list(records)
+        )
+        self.fetches = 0
+        self._lock = threading.Lock()
+
+        if not self.records:
+            raise ValueError("at least one weather record is required")
+
+    @classmethod
+    def from_file(cls, path: str) -> FixtureBackend:
+        """Load recorded responses from a JSON file.
+
+        Args:
+            path (str): JSON file with a response or a list of responses.
+
+        Returns:
+            FixtureBackend: Backend serving the file contents.
+        """
+        with open(path, encoding="utf-8") as file:
+            return cls(json.load(file))
+
+    def fetch(self, latitude: float, longitude: float) -> WeatherData:
+        """Get the recorded weather closest to a location.
+
+        Args:
+            latitude (float): Latitude of the location.
+            longitude (float): Longitude of the location.
 
-import requests
-from dotenv import load_dotenv
+        Returns:
+            WeatherData: Recorded weather data.
+        """
+        with self._lock:
+            self.fetches += 1
+
+        def distance(record: WeatherData) -> float:
+            coord = record.get("coord", {})
+            return math.hypot(
+                coord.get("lat", latitude) - latitude,
+                coord.get("lon", longitude) - longitude
+            )
+
+        return min(self.records, key=distance)
+
+
+class WeatherProvider:
+    """Cached weather provider for many locations.
 
-load_dotenv()
+    Locations are snapped to the center of grid cells of `cell_size`
+    degrees, and the weather of every cell is cached for `ttl` seconds.
+    Concurrent requests for a stale cell wait for a single backend request,
+    whether they come from threads (`get`) or coroutines (`get_async`).
 
-API_KEY = os.getenv("OPENWEATHER_API_KEY")
-if not API_KEY:
-    raise ValueError(
-        "No API key found. Set the OPENWEATHER_API_KEY environment variable."
-    )
+    Attributes:
+        backend (WeatherBackend): Source of weather data.
+        ttl (float): Time-to-live of cached data in seconds.
+        cell_size (float): Cell size in degrees. Locations are not quantized
+            if 0.
+        fetches (int): Number of backend requests.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[WeatherBackend] = None,
+        ttl: float = 600.0,
+        cell_size: float = 0.1
+    ) -> None:
+        """Initialize a WeatherProvider instance.
+
+        Args:
+            backend (WeatherBackend | None): Source of weather data. Defaults
+                to the OpenWeatherMap API.
+            ttl (float): Time-to-live of cached data in seconds.
+            cell_size (float): Cell size in degrees.
+        """
+        self.backend = backend or OpenWeatherBackend()
+        self.ttl = ttl
+        self.cell_size = cell_size
+        self.fetches = 0
+
+        self._cache: dict[CellKey, tuple[float, WeatherData]] = {}
+        self._inflight: dict[CellKey, Future] = {}
+        self._lock = threading.Lock()
+
+    def cell(self, latitude: float, longitude: float) -> CellKey:
+        """Get the cell of a location.
+
+        Args:
+            latitude (float): Latitude of the location.
+            longitude (float): Longitude of the location.
+
+        Returns:
+            CellKey: Latitude and longitude of the cell center.
+        """
+        if not self.cell_size:
+            return float(latitude), float(longitude)
+
+        return (
+            (math.floor(latitude / self.cell_size) + 0.5) * self.cell_size,
+            (math.floor(longitude / self.cell_size) + 0.5) * self.cell_size
+        )
+
+    def get(self, latitude: float, longitude: float) -> WeatherData:
+        """Get the weather at a location.
+
+        Args:
+            latitude (float): Latitude of the location.
+            longitude (float): Longitude of the location.
+
+        Returns:
+            WeatherData: Weather data of the location cell.
+        """
+        key = self.cell(latitude, longitude)
+        data = self._fresh(key)
+        if data is not None:
+            return data
+
+        future, owner = self._claim(key)
+        if owner:
+            self._resolve(key, future, self.backend.fetch, *key)
+
+        return self._result(key, future)
+
+    async def get_async(
+        self,
+        latitude: float,
+        longitude: float
+    ) -> WeatherData:
+        """Get the weather at a location without blocking the event loop.
+
+        Backend requests run in a worker thread.
+
+        Args:
+            latitude (float): Latitude of the location.
+            longitude (float): Longitude of the location.
+
+        Returns:
+            WeatherData: Weather data of the location cell.
+        """
+        key = self.cell(latitude, longitude)
+        data = self._fresh(key)
+        if data is not None:
+            return data
+
+        future, owner = self._claim(key)
+        if owner:
+            await asyncio.to_thread(
+                self._resolve, key, future, self.backend.fetch, *key
+            )
+        else:
+            try:
+                await asyncio.wrap_future(future)
+            except Exception:  # pylint: disable=broad-except
+                pass  # Handled by `_result`
+
+        return self._result(key, future)
+
+    def get_many(
+        self,
+        latitudes: Iterable[float],
+        longitudes: Iterable[float]
+    ) -> list[WeatherData]:
+        """Get the weather at many locations (e.g. one per drone).
+
+        Every cell is requested once, however many locations it contains.
+
+        Args:
+            latitudes (Iterable[float]): Latitudes of the locations.
+            longitudes (Iterable[float]): Longitudes of the locations.
+
+        Returns:
+            list[WeatherData]: Weather data of every location.
+        """
+        keys = [
+            self.cell(latitude, longitude)
+            for latitude, longitude in zip(latitudes, longitudes)
+        ]
+        cells = {key: self.get(*key) for key in dict.fromkeys(keys)}
+
+        return [cells[key] for key in keys]
+
+    def invalidate(self) -> None:
+        """Discard every cached cell."""
+        with self._lock:
+            self._cache.clear()
+
+    def _fresh(self, key: CellKey) -> Optional[WeatherData]:
+        entry = self._cache.get(key)
+        if entry is not None and monotonic() - entry[0] < self.ttl:
+            return entry[1]
+
+        return None
+
+    def _claim(self, key: CellKey) -> tuple[Future, bool]:
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future, False
+
+            future = Future()
+            self._inflight[key] = future
+            return future, True
+
+    def _resolve(
+        self,
+        key: CellKey,
+        future: Future,
+        fetch: Any,
+        *args: Any
+    ) -> None:
+        try:
+            data = fetch(*args)
+        except Exception as exc:  # pylint: disable=broad-except
+            future.set_exception(exc)
+        else:
+            with self._lock:
+                self._cache[key] = (monotonic(), data)
+            future.set_result(data)
+        finally:
+            with self._lock:
+                self.fetches += 1
+                self._inflight.pop(key, None)
+
+    def _result(self, key: CellKey, future: Future) -> WeatherData:
+        try:
+            return future.result()
+        except Exception as exc:
+            # Serve stale data rather than failing, if there is any:
+            entry = self._cache.get(key)
+            if entry is None:
+                raise
+
+            _logger.log("Serving stale weather for %s: %r", 2, key, exc)
+            return entry[1]
+
+
+_default_provider: Optional[WeatherProvider] = None
+_default_provider_lock = threading.Lock()
+
+
+def get_default_provider() -> WeatherProvider:
+    """Get the weather provider shared by the whole process.
+
+    The provider uses the fixture file named by the
+    `SKYMESHSIM_WEATHER_FIXTURE` environment variable if it is set, and the
+    OpenWeatherMap API otherwise.
+
+    Returns:
+        WeatherProvider: Shared provider.
+    """
+    global _default_provider  # pylint: disable=global-statement
+
+    with _default_provider_lock:
+        if _default_provider is None:
+            fixture = os.getenv("SKYMESHSIM_WEATHER_FIXTURE")
+            _default_provider = WeatherProvider(
+                FixtureBackend.from_file(fixture) if fixture else None
+            )
+
+        return _default_provider
 
 
 class WheaterService:
@@ -32,6 +442,7 @@ class WheaterService:
         latitude (float): Latitude of the location.
         longitude (float): Longitude of the location.
         revalidation_period (int): Revalidation period of the data in seconds.
+        provider (WeatherProvider): Provider serving the weather data.
         BASE_URL (str): Base URL of the OpenWeatherMap API.
 
     Properties:
@@ -53,13 +464,14 @@ class WheaterService:
         wind_speed (float): Get wind speed in m/s.
     """
 
-    BASE_URL = "http://api.openweathermap.org/data/2.5/weather"
+    BASE_URL = OpenWeatherBackend.BASE_URL
 
     def __init__(
         self,
         latitude: float,
         longitude: float,
-        revalidation_period: int = 60
+        revalidation_period: int = 60,
+        provider: Optional[WeatherProvider] = None
     ) -> None:
         """Initialize Weather object.
 
@@ -67,20 +479,32 @@ class WheaterService:
             latitude (float): Latitude of the location.
             longitude (float): Longitude of the location.
             revalidation_period (int): Revalidation period of the data in
-                seconds.
+                seconds. Only used if `provider` is None.
+            provider (WeatherProvider | None): Shared provider. Defaults to a
+                provider of the exact location backed by the OpenWeatherMap
+                API, or by the default fixture if one is configured.
         """
         self.latitude = latitude
         self.longitude = longitude
         self.revalidation_period = revalidation_period
 
-        # Internal attributes and first data fetch:
-        self._timestamp = 0.0
-        self._data = self._fetch_weather_data()
+        if provider is None:
+            fixture = os.getenv("SKYMESHSIM_WEATHER_FIXTURE")
+            provider = WeatherProvider(
+                FixtureBackend.from_file(fixture) if fixture else None,
+                ttl=revalidation_period,
+                cell_size=0
+            )
+        self.provider = provider
+
+        # First data fetch:
+        self._data = self.data
 
     @property
     def data(self) -> Any:
         """Get weather data."""
-        return self._fetch_weather_data()
+        self._data = self.provider.get(self.latitude, self.longitude)
+        return self._data
 
     @property
     def clouds_data(self) -> dict[str, int | float]:
@@ -161,28 +585,6 @@ class WheaterService:
         """Get wind speed in m/s."""
         return self.data["wind"]["speed"]
 
-    def _fetch_weather_data(self) -> dict[str, Any]:
-        if time() - self._timestamp > self.revalidation_period:
-            response = requests.get(
-                f"{self.BASE_URL}?"
-                + "&".join((
-                    f"lat={self.latitude}&&&",
-                    f"lon={self.longitude}",
-                    "units=metric",
-                    f"appid={API_KEY}"
-                )),
-                timeout=5
-            )
-            data = response.json()
-
-            if response.status_code == 200:
-                self._timestamp = time()
-                self._data = data
-            else:
-                raise ValueError(f"Error while fetching wheater data: {data}")
-
-        return self._data
-
 
 if __name__ == "__main__":
     weather = WheaterService(42.341362, -7.862555)
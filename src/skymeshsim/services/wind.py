@@ -0,0 +1,395 @@
+"""Wind service module.
+
+This module provides gridded, time-varying wind fields. Wind components
+(`u` towards the east, `v` towards the north and, optionally, `w` upwards, in
+m/s) are stored on a rectilinear grid over time, optional altitude levels and
+two horizontal axes, and interpolated multilinearly for a whole fleet in one
+vectorized call.
+
+`WindSampler` keeps the grid cell and the corner values of every drone
+between calls, so drones that stay in the same cell (and time interval) only
+recompute their interpolation weights instead of gathering corner values from
+the grid again.
+
+Author:
+    Paulo Sanchez (@erlete)
+"""
+
+
+from __future__ import annotations
+
+import itertools
+import math
+import time
+from typing import Optional
+
+import numpy as np
+
+from ..network.utils import ArrayLike
+
+_AXES = ("t", "z", "y", "x")
+
+
+class WindField:
+    """Gridded wind field.
+
+    Horizontal axes can be longitudes and latitudes or local plane
+    coordinates in meters, as long as queries use the same units. Queries
+    outside of the grid are clamped to its edges.
+
+    Attributes:
+        axes (dict[str, np.ndarray]): Increasing coordinates of the `t`
+            (seconds), `z` (meters), `y` and `x` axes. Missing axes have a
+            single coordinate.
+        components (np.ndarray): Wind components with shape (3, T, Z, Y, X).
+    """
+
+    def __init__(
+        self,
+        x: ArrayLike,
+        y: ArrayLike,
+        u: ArrayLike,
+        v: ArrayLike,
+        w: Optional[ArrayLike] = None,
+        z: Optional[ArrayLike] = None,
+        t: Optional[ArrayLike] = None
+    ) -> None:
+        """Initialize a WindField instance.
+
+        Args:
+            x (ArrayLike): Increasing x (east) coordinates.
+            y (ArrayLike): Increasing y (north) coordinates.
+            u (ArrayLike): East components, with shape ([T,] [Z,] Y, X).
+            v (ArrayLike): North components, with the shape of `u`.
+            w (ArrayLike | None): Up components, with the shape of `u`. Zero
+                if None.
+            z (ArrayLike | None): Increasing altitude levels in meters.
+            t (ArrayLike | None): Increasing times in seconds.
+        """
+        self.axes = {
+            "t": np.atleast_1d(np.asarray(
+                t if t is not None else [0.0], dtype=float
+            )),
+            "z": np.atleast_1d(np.asarray(
+                z if z is not None else [0.0], dtype=float
+            )),
+            "y": np.asarray(y, dtype=float),
+            "x": np.asarray(x, dtype=float)
+        }
+        for name, axis in self.axes.items():
+            if axis.ndim != 1 or np.any(np.diff(axis) <= 0):
+                raise ValueError(f"{name} axis must be 1D and increasing")
+
+        shape = tuple(len(self.axes[name]) for name in _AXES)
+        u = np.asarray(u, dtype=float)
+        w = np.zeros_like(u) if w is None else w
+        self.components = np.stack([
+            np.asarray(component, dtype=float).reshape(shape)
+            for component in (u, v, w)
+        ])
+
+    @classmethod
+    def from_npz(cls, path: str) -> WindField:
+        """Load a wind field from a NumPy `.npz` archive.
+
+        The archive holds `x`, `y`, `u` and `v` arrays, and optionally `w`,
+        `z` and `t` arrays, with the meaning of the constructor arguments.
+
+        Args:
+            path (str): Archive path.
+
+        Returns:
+            WindField: Loaded wind field.
+        """
+        with np.load(path) as archive:
+            return cls(**{
+                name: archive[name]
+                for name in ("x", "y", "u", "v", "w", "z", "t")
+                if name in archive
+            })
+
+    @classmethod
+    def uniform(
+        cls,
+        speed: float,
+        direction: float,
+        vertical: float = 0.0
+    ) -> WindField:
+        """Create a constant wind field.
+
+        Args:
+            speed (float): Horizontal wind speed in m/s.
+            direction (float): Meteorological direction in degrees, i.e. the
+                direction the wind blows from (as in `WheaterService`).
+            vertical (float): Vertical wind speed in m/s.
+
+        Returns:
+            WindField: Constant wind field.
+        """
+        heading = math.radians(direction + 180)
+        return cls(
+            x=np.zeros(1),
+            y=np.zeros(1),
+            u=np.array([[speed * math.sin(heading)]]),
+            v=np.array([[speed * math.cos(heading)]]),
+            w=np.array([[vertical]])
+        )
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        """Get grid shape.
+
+        Returns:
+            tuple[int, ...]: Number of times, levels, rows and columns.
+        """
+        return self.components.shape[1:]
+
+    def locate(
+        self,
+        x: ArrayLike,
+        y: ArrayLike,
+        z: Optional[ArrayLike] = None,
+        t: float | ArrayLike = 0.0
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Locate points in the grid.
+
+        Args:
+            x (ArrayLike): X coordinates.
+            y (ArrayLike): Y coordinates.
+            z (ArrayLike | None): Altitudes in meters.
+            t (float | ArrayLike): Times in seconds.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Lower cell indices and fractional
+                positions within the cells, both with shape (N, 4) in
+                (t, z, y, x) order.
+        """
+        x = np.atleast_1d(np.asarray(x, dtype=float))
+        coordinates = np.broadcast_arrays(
+            np.asarray(t, dtype=float),
+            np.asarray(0.0 if z is None else z, dtype=float),
+            np.asarray(y, dtype=float),
+            x
+        )
+
+        indices = np.empty((x.size, 4), dtype=np.intp)
+        fractions = np.empty((x.size, 4))
+        for column, (name, values) in enumerate(zip(_AXES, coordinates)):
+            axis = self.axes[name]
+            values = values.reshape(-1)
+
+            if len(axis) == 1:
+                indices[:, column] = 0
+                fractions[:, column] = 0.0
+                continue
+
+            index = np.clip(
+                np.searchsorted(axis, values, side="right") - 1,
+                0,
+                len(axis) - 2
+            )
+            indices[:, column] = index
+            fractions[:, column] = np.clip(
+                (values - axis[index]) / (axis[index + 1] - axis[index]),
+                0.0,
+                1.0
+            )
+
+        return indices, fractions
+
+    def corners(self, indices: np.ndarray) -> np.ndarray:
+        """Gather the components at the corners of grid cells.
+
+        Args:
+            indices (np.ndarray): Lower cell indices with shape (N, 4).
+
+        Returns:
+            np.ndarray: Components with shape (N, corners, 3), where corners
+                is 2 to the number of axes with more than one coordinate.
+        """
+        active = self._active_axes()
+        strides = (
+            np.array(self.components.strides[1:]) // self.components.itemsize
+        )
+
+        offsets = np.zeros((1, 2 ** len(active)), dtype=np.intp)
+        for corner, bits in enumerate(
+            itertools.product((0, 1), repeat=len(active))
+        ):
+            offsets[0, corner] = sum(
+                bit * strides[axis] for bit, axis in zip(bits, active)
+            )
+
+        flat = (indices @ strides)[:, np.newaxis] + offsets
+        values = self.components.reshape(3, -1)[:, flat]
+
+        return values.transpose(1, 2, 0)
+
+    def weights(self, fractions: np.ndarray) -> np.ndarray:
+        """Compute the multilinear weights of the cell corners.
+
+        Args:
+            fractions (np.ndarray): Fractional positions with shape (N, 4).
+
+        Returns:
+            np.ndarray: Weights with shape (N, corners), in the corner order
+                of `corners`.
+        """
+        weights = np.ones((len(fractions), 1))
+        for axis in self._active_axes():
+            fraction = fractions[:, axis:axis + 1]
+            weights = np.concatenate(
+                (weights * (1 - fraction), weights * fraction),
+                axis=1
+            ).reshape(len(fractions), 2, -1).transpose(0, 2, 1).reshape(
+                len(fractions), -1
+            )
+
+        return weights
+
+    def sample(
+        self,
+        x: ArrayLike,
+        y: ArrayLike,
+        z: Optional[ArrayLike] = None,
+        t: float | ArrayLike = 0.0
+    ) -> np.ndarray:
+        """Interpolate the wind at many points.
+
+        Args:
+            x (ArrayLike): X coordinates.
+            y (ArrayLike): Y coordinates.
+            z (ArrayLike | None): Altitudes in meters.
+            t (float | ArrayLike): Times in seconds.
+
+        Returns:
+            np.ndarray: Wind velocities (u, v, w) with shape (N, 3).
+        """
+        indices, fractions = self.locate(x, y, z, t)
+        return np.einsum(
+            "nc,nck->nk",
+            self.weights(fractions),
+            self.corners(indices)
+        )
+
+    def _active_axes(self) -> list[int]:
+        return [axis for axis, size in enumerate(self.shape) if size > 1]
+
+
+class WindSampler:
+    """Wind interpolation with per-drone caching of cell corner values.
+
+    Drones are identified by their index in the arrays given to `sample`.
+
+    Attributes:
+        field (WindField): Wind field.
+        hits (int): Number of drone samples that reused cached corners.
+        misses (int): Number of drone samples that gathered corners.
+    """
+
+    def __init__(self, field: WindField) -> None:
+        """Initialize a WindSampler instance.
+
+        Args:
+            field (WindField): Wind field.
+        """
+        self.field = field
+        self.hits = 0
+        self.misses = 0
+
+        self._cells = np.empty((0, 4), dtype=np.intp)
+        self._corners = np.empty((0, 1, 3))
+
+    def sample(
+        self,
+        x: ArrayLike,
+        y: ArrayLike,
+        z: Optional[ArrayLike] = None,
+        t: float | ArrayLike = 0.0
+    ) -> np.ndarray:
+        """Interpolate the wind at the current drone positions.
+
+        Args:
+            x (ArrayLike): Drone x coordinates.
+            y (ArrayLike): Drone y coordinates.
+            z (ArrayLike | None): Drone altitudes in meters.
+            t (float | ArrayLike): Current time in seconds.
+
+        Returns:
+            np.ndarray: Wind velocities (u, v, w) with shape (N, 3).
+        """
+        indices, fractions = self.field.locate(x, y, z, t)
+        count = len(indices)
+
+        if len(self._cells) != count:
+            cells = np.full((count, 4), -1, dtype=np.intp)
+            kept = min(count, len(self._cells))
+            cells[:kept] = self._cells[:kept]
+            corners = np.empty((count,) + self._corners.shape[1:])
+            corners[:kept] = self._corners[:kept]
+            self._cells, self._corners = cells, corners
+
+        stale = np.flatnonzero(np.any(indices != self._cells, axis=1))
+        if len(stale):
+            fresh = self.field.corners(indices[stale])
+            if fresh.shape[1:] != self._corners.shape[1:]:
+                self._corners = np.empty((count,) + fresh.shape[1:])
+                stale = np.arange(count)
+                fresh = self.field.corners(indices)
+
+            self._corners[stale] = fresh
+            self._cells[stale] = indices[stale]
+
+        self.hits += count - len(stale)
+        self.misses += len(stale)
+
+        return np.einsum(
+            "nc,nck->nk",
+            self.field.weights(fractions),
+            self._corners
+        )
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+
+    # Synthetic 20 x 20 km field with 10 levels and 24 hourly steps:
+    grid_x = np.linspace(-10_000, 10_000, 81)
+    grid_y = np.linspace(-10_000, 10_000, 81)
+    grid_z = np.linspace(0, 1_000, 10)
+    grid_t = np.arange(24) * 3600.0
+    grid_shape = (len(grid_t), len(grid_z), len(grid_y), len(grid_x))
+    wind = WindField(
+        grid_x, grid_y,
+        u=rng.normal(5, 2, grid_shape),
+        v=rng.normal(0, 2, grid_shape),
+        w=rng.normal(0, 0.2, grid_shape),
+        z=grid_z,
+        t=grid_t
+    )
+    sampler = WindSampler(wind)
+
+    fleet_size = 10_000
+    tick = 0.1
+    east = rng.uniform(-9_000, 9_000, fleet_size)
+    north = rng.uniform(-9_000, 9_000, fleet_size)
+    up = rng.uniform(50, 500, fleet_size)
+
+    ticks = 100
+    start = time.perf_counter()
+    for step in range(ticks):
+        drift = sampler.sample(east, north, up, step * tick) * tick
+        east += 50 * tick + drift[:, 0]
+        north += drift[:, 1]
+        up += drift[:, 2]
+    cached = (time.perf_counter() - start) / ticks
+
+    start = time.perf_counter()
+    for step in range(ticks):
+        wind.sample(east, north, up, step * tick)
+    uncached = (time.perf_counter() - start) / ticks
+
+    print(f"{fleet_size} drones on a {wind.shape} grid:")
+    print(f"  cached: {cached * 1e3:.2f} ms per tick "
+          + f"({sampler.hits / (sampler.hits + sampler.misses):.1%} hits)")
+    print(f"  uncached: {uncached * 1e3:.2f} ms per tick")
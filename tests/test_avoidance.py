@@ -0,0 +1,132 @@
+"""Collision avoidance tests.
+
+Author:
+    Paulo Sanchez (@erlete)
+"""
+
+
+from __future__ import annotations
+
+import numpy as np
+
+from skymeshsim.modules.core.avoidance import CollisionAvoidance, separation
+
+SAFETY_RADIUS = 5.0  # [m]
+CRUISE = 15.0  # [m/s]
+TICK = 0.1  # [s]
+
+
+def crossing_fleet(
+    columns: int,
+    spacing: float,
+    seed: int = 0
+) -> tuple[np.ndarray, np.ndarray]:
+    """Build a jittered grid of drones flying to their mirrored positions.
+
+    Both halves of the fleet cross each other head-on along shared lanes.
+
+    Args:
+        columns (int): Number of drones per grid side.
+        spacing (float): Grid spacing in meters.
+        seed (int): Jitter seed.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Start and goal positions.
+    """
+    rng = np.random.default_rng(seed)
+    grid = np.indices((columns, columns)).reshape(2, -1).T
+    start = (grid - columns / 2) * spacing + rng.uniform(
+        -spacing / 3, spacing / 3, grid.shape
+    )
+    return start, start * (-1, 1)
+
+
+def fly(
+    avoidance: CollisionAvoidance | None,
+    start: np.ndarray,
+    goals: np.ndarray,
+    ticks: int
+) -> tuple[float, np.ndarray]:
+    """Fly a fleet toward its goals.
+
+    Args:
+        avoidance (CollisionAvoidance | None): Collision avoidance, if any.
+        start (np.ndarray): Start positions.
+        goals (np.ndarray): Goal positions.
+        ticks (int): Number of ticks.
+
+    Returns:
+        tuple[float, np.ndarray]: Closest approach in meters and final
+            positions.
+    """
+    positions = start.copy()
+    velocities = np.zeros_like(positions)
+    closest = separation(positions)
+    for _ in range(ticks):
+        to_goal = goals - positions
+        distance = np.hypot(*to_goal.T)[:, None]
+        preferred = to_goal * np.minimum(
+            CRUISE, distance / TICK
+        ) / np.maximum(distance, 1e-9)
+
+        if avoidance is not None:
+            preferred = avoidance.adjust(positions, velocities, preferred)
+
+        velocities = preferred
+        positions = positions + velocities * TICK
+        closest = min(closest, separation(positions))
+
+    return closest, positions
+
+
+def test_dense_crossing_keeps_separation() -> None:
+    """Keep drones apart while two dense halves of a fleet cross."""
+    start, goals = crossing_fleet(20, 30.0)
+    assert separation(start) >= 2 * SAFETY_RADIUS
+
+    # Without avoidance, the crossing lanes bring drones together:
+    closest, _ = fly(None, start, goals, 300)
+    assert closest < SAFETY_RADIUS
+
+    avoidance = CollisionAvoidance(SAFETY_RADIUS, 5.0, CRUISE)
+    closest, positions = fly(avoidance, start, goals, 300)
+    assert closest >= 0.9 * 2 * SAFETY_RADIUS
+
+    # Avoidance delays the drones, but does not stop them:
+    progress = np.hypot(*(positions - start).T)
+    assert np.median(progress / np.hypot(*(goals - start).T)) > 0.5
+
+
+def test_velocities_respect_speed_limit() -> None:
+    """Keep adjusted velocities within the maximum speed."""
+    rng = np.random.default_rng(1)
+    positions = rng.uniform(0, 200, (500, 2))
+    velocities = rng.normal(0, 10, (500, 2))
+
+    avoidance = CollisionAvoidance(SAFETY_RADIUS, 5.0, CRUISE)
+    result = avoidance.adjust(positions, velocities, 3 * velocities)
+
+    assert np.all(np.hypot(*result.T) <= CRUISE * (1 + 1e-9))
+
+
+def test_neighbors_are_horizontal_within_altitude_band() -> None:
+    """Pick neighbors in the horizontal plane and filter them by altitude."""
+    positions = np.array([
+        [0.0, 0.0, 100.0],
+        [0.0, 0.0, 300.0],  # Right above the first drone
+        [30.0, 0.0, 105.0],
+        [60.0, 0.0, 100.0]
+    ])
+    avoidance = CollisionAvoidance(SAFETY_RADIUS, 5.0, CRUISE,
+                                   max_neighbors=2)
+
+    neighbors = avoidance.neighbors(positions)
+
+    assert neighbors[0].tolist() == [2, 3]
+    assert neighbors[1].tolist() == [4, 4]
+
+    # Head-on drones far apart in altitude keep their velocities:
+    velocities = np.array([[10.0, 0, 0], [-10.0, 0, 0]])
+    result = avoidance.adjust(positions[:2] + [[-50, 0, 0], [50, 0, 0]],
+                              velocities)
+    np.testing.assert_allclose(result, velocities)
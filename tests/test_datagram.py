@@ -0,0 +1,121 @@
+"""Datagram telemetry channel tests.
+
+Author:
+    Paulo Sanchez (@erlete)
+"""
+
+
+from __future__ import annotations
+
+import asyncio
+import json
+import struct
+
+from skymeshsim.network.datagram import (TelemetryReceiver,
+                                         open_datagram_writer)
+
+MESSAGES = 500
+LOSS_RATE = 0.2
+
+
+async def wait_for(condition, timeout: float = 5.0) -> None:
+    """Wait until a condition holds.
+
+    Args:
+        condition (Callable[[], bool]): Condition to wait for.
+        timeout (float): Maximum waiting time in seconds.
+    """
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+def status(component: str, tick: int) -> bytes:
+    """Encode a drone status message.
+
+    Args:
+        component (str): Sender component name.
+        tick (int): Tick of the status.
+
+    Returns:
+        bytes: Encoded message.
+    """
+    return json.dumps(
+        {"type": "dstat", "component": component, "tick": tick}
+    ).encode() + b"\n"
+
+
+def test_synthetic_loss_is_counted() -> None:
+    """Count the datagrams dropped by a seeded synthetic loss."""
+    async def main() -> None:
+        latest: dict[str, int] = {}
+        receiver = TelemetryReceiver(
+            "127.0.0.1", 0,
+            lambda message, _: latest.update(
+                {message["component"]: message["tick"]}
+            )
+        )
+        await receiver.start()
+        writer = await open_datagram_writer("127.0.0.1", receiver.port,
+                                            LOSS_RATE, seed=3)
+        try:
+            # The receiver is given a turn after every datagram, so that the
+            # socket buffer never overflows:
+            for tick in range(1, MESSAGES):
+                writer.write(status("Drone-1", tick))
+                await asyncio.sleep(0)
+
+            # Losses are only noticed once a later datagram arrives:
+            writer.loss_rate = 0.0
+            writer.write(status("Drone-1", MESSAGES))
+            await wait_for(lambda: receiver.received == writer.sent)
+        finally:
+            writer.close()
+            receiver.close()
+
+        assert 0 < writer.lost < MESSAGES
+        assert writer.sent + writer.lost == MESSAGES
+        assert receiver.lost == writer.lost
+        assert receiver.stale == receiver.invalid == 0
+        assert latest == {"Drone-1": MESSAGES}
+
+    asyncio.run(main())
+
+
+def test_latest_state_wins() -> None:
+    """Discard updates older than the latest one of each sender."""
+    async def main() -> None:
+        latest: dict[str, int] = {}
+        receiver = TelemetryReceiver(
+            "127.0.0.1", 0,
+            lambda message, _: latest.update(
+                {message["component"]: message["tick"]}
+            )
+        )
+        await receiver.start()
+
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(
+            asyncio.DatagramProtocol,
+            remote_addr=("127.0.0.1", receiver.port)
+        )
+        try:
+            # Sequence numbers out of order, as reordered by the network:
+            for sequence in (1, 3, 2, 5, 4):
+                transport.sendto(struct.pack("!Q", sequence)
+                                 + status("Drone-1", sequence).rstrip())
+            transport.sendto(b"\x00" * 4)
+            await wait_for(
+                lambda: receiver.received + receiver.stale
+                + receiver.invalid == 6
+            )
+        finally:
+            transport.close()
+            receiver.close()
+
+        assert latest == {"Drone-1": 5}
+        assert (receiver.received, receiver.stale) == (3, 2)
+        assert receiver.lost == 2
+        assert receiver.invalid == 1
+
+    asyncio.run(main())
@@ -0,0 +1,40 @@
+"""Entry point import time tests.
+
+Author:
+    Paulo Sanchez (@erlete)
+"""
+
+
+from __future__ import annotations
+
+import pytest
+
+from skymeshsim.importtime import ENTRY_POINTS, main, profile_import
+
+BUDGET = 250.0  # [ms]
+
+
+@pytest.mark.parametrize("name", ["server", "drone", "control_system"])
+def test_entry_point_import_budget(name: str) -> None:
+    """Import an entry point in fresh interpreters within the budget.
+
+    Args:
+        name (str): Entry point name.
+    """
+    profile = profile_import(ENTRY_POINTS[name])
+
+    assert profile.entries
+    assert 0 < profile.total <= BUDGET, (
+        f"expected {profile.module} to import in {BUDGET:.0f} ms but got"
+        + f" {profile.total:.1f} ms instead"
+    )
+
+
+def test_exceeded_budget_fails(capsys: pytest.CaptureFixture[str]) -> None:
+    """Exit with a non-zero status when an entry point is over budget.
+
+    Args:
+        capsys (pytest.CaptureFixture[str]): Output capture.
+    """
+    assert main(["--budget", "0.001", "--repeats", "1", "server"]) == 1
+    assert "over budget" in capsys.readouterr().out
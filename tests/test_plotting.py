@@ -0,0 +1,74 @@
+"""Fleet overlay and blitting tests.
+
+Author:
+    Paulo Sanchez (@erlete)
+"""
+
+
+from __future__ import annotations
+
+import time
+
+import matplotlib
+import numpy as np
+
+matplotlib.use("Agg")
+
+# pylint: disable=wrong-import-position
+from matplotlib.backends.backend_agg import FigureCanvasAgg  # noqa: E402
+from matplotlib.figure import Figure  # noqa: E402
+
+from skymeshsim.network.plotting import BlitManager, FleetOverlay  # noqa: E402
+
+FRAMES = 2000
+PERIOD = 400  # Frames per grow and shrink cycle
+MIN_DRONES = 10
+MAX_DRONES = 1000
+
+
+def fleet_size(frame: int) -> int:
+    """Get the fleet size of a frame, growing and shrinking periodically.
+
+    Args:
+        frame (int): Frame index.
+
+    Returns:
+        int: Number of drones.
+    """
+    phase = abs((frame % PERIOD) / PERIOD * 2 - 1)
+    return int(MIN_DRONES + (MAX_DRONES - MIN_DRONES) * (1 - phase))
+
+
+def test_blitting_keeps_artists_and_frame_time_bounded() -> None:
+    """Render a growing and shrinking fleet for thousands of frames."""
+    figure = Figure(figsize=(4, 4), dpi=50)
+    ax = figure.add_subplot()
+    ax.set_xlim(-0.5, -0.3)
+    ax.set_ylim(39.4, 39.6)
+
+    overlay = FleetOverlay(ax)
+    blit_manager = BlitManager(FigureCanvasAgg(figure), overlay.artists)
+    rng = np.random.default_rng(0)
+
+    children = len(ax.get_children())
+    frame_times = np.empty(FRAMES)
+    for frame in range(FRAMES):
+        drones = fleet_size(frame)
+        longitude = rng.uniform(-0.5, -0.3, drones)
+        latitude = rng.uniform(39.4, 39.6, drones)
+        links = rng.integers(0, drones, (drones, 2))
+
+        start = time.perf_counter()
+        overlay.update(longitude, latitude, links=links)
+        blit_manager.update()
+        frame_times[frame] = time.perf_counter() - start
+
+        assert len(ax.get_children()) == children
+
+    assert blit_manager.frames == FRAMES
+
+    # Same fleet sizes in the first and last cycles (the first frame is
+    # a full draw and is left out):
+    first = np.median(frame_times[1:PERIOD])
+    last = np.median(frame_times[-PERIOD + 1:])
+    assert last < 1.5 * first + 1e-3
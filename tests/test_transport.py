@@ -0,0 +1,81 @@
+"""Shared memory transport tests.
+
+Author:
+    Paulo Sanchez (@erlete)
+"""
+
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import uuid
+
+import pytest
+
+from skymeshsim.network.transport import ShmRingBuffer
+
+
+@pytest.fixture(name="consumer")
+def consumer_fixture():
+    """Create a ring buffer with a unique name.
+
+    Yields:
+        ShmRingBuffer: Consumer side of the ring.
+    """
+    ring = ShmRingBuffer(f"skymesh-test-{uuid.uuid4().hex[:8]}", 4096,
+                         create=True)
+    yield ring
+    ring.close()
+
+
+def test_records_round_trip(consumer: ShmRingBuffer) -> None:
+    """Pop the records pushed by the producer, wrapping around the ring.
+
+    Args:
+        consumer (ShmRingBuffer): Consumer side of the ring.
+    """
+    producer = ShmRingBuffer(consumer.name)
+    try:
+        for batch in range(10):
+            payloads = [f"{batch}-{index}".encode() * 20 for index in range(8)]
+            assert all(producer.push(payload) for payload in payloads)
+            assert consumer.pop_all() == payloads
+    finally:
+        producer.close()
+
+
+def test_second_producer_is_rejected(consumer: ShmRingBuffer) -> None:
+    """Reject a second producer until the first one detaches.
+
+    Args:
+        consumer (ShmRingBuffer): Consumer side of the ring.
+    """
+    producer = ShmRingBuffer(consumer.name)
+    with pytest.raises(RuntimeError, match=str(os.getpid())):
+        ShmRingBuffer(consumer.name)
+
+    producer.close()
+    ShmRingBuffer(consumer.name).close()
+
+
+@pytest.mark.skipif(os.name != "posix", reason="liveness checks need POSIX")
+def test_dead_producer_is_replaced(consumer: ShmRingBuffer) -> None:
+    """Let a producer attach to a ring claimed by a process that exited.
+
+    Args:
+        consumer (ShmRingBuffer): Consumer side of the ring.
+    """
+    subprocess.run(
+        [sys.executable, "-c",
+         "from skymeshsim.network.transport import ShmRingBuffer;"
+         + f"ShmRingBuffer({consumer.name!r}).push(b'last words')"],
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+        check=True
+    )
+
+    producer = ShmRingBuffer(consumer.name)
+    assert producer.push(b"hello")
+    assert consumer.pop_all() == [b"last words", b"hello"]
+    producer.close()